@@ -1,8 +1,20 @@
 # app.py
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 from extensions import db, socketio
 from config import Config
+from utils.schema import upgrade_schema
+from commands import register_commands
+from utils.passwords import HashingBusy
+from utils.download_counter import download_counter
+from utils.chat_expiry import chat_expiry
+from utils.chunked_upload import upload_cleanup
+from utils.platform_counters import platform_counters
+from utils.leaderboard import leaderboard
+from utils.file_utils import send_upload, is_product_file
+from utils.storage import storage
+from utils import search_index, typeahead, catalog, content_store, images, inbox, dashboard, analytics, http_cache, timeline
+from models import Produto, ProductTag, User, UserStats, AnalyticsBucket, PlatformCounter, Post, TimelineEntry
 import os
 import importlib
 
@@ -13,8 +25,10 @@ def create_app():
 
     # inicializa db e socketio
     db.init_app(app)
+    storage.init_app(app)
     if socketio:
-        socketio.init_app(app, cors_allowed_origins="*")
+        socketio.init_app(app, cors_allowed_origins="*",
+                          message_queue=app.config["SOCKETIO_MESSAGE_QUEUE"] or None)
 
     # cria uploads folder se não existir
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -43,10 +57,62 @@ def create_app():
 
     @app.route("/uploads/<filename>")
     def uploaded_file(filename):
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+        # arquivos de produto só pelo link assinado de /api/produtos/download
+        if is_product_file(filename) or not storage.exists(filename):
+            return jsonify({"error": "Arquivo não encontrado"}), 404
+        if request.args.get("w"):
+            # versão reduzida (?w=160 ou ?w=thumb|card|full)
+            return images.send_variant(filename, request.args["w"])
+        return send_upload(filename)
 
     with app.app_context():
         db.create_all()
+        added = upgrade_schema()
+        http_cache.seed()
+        if ("posts", "likes_count") in added:
+            # banco anterior aos contadores: preenche a partir de likes/comments
+            from utils.counters import recount_post_counters
+            recount_post_counters()
+            db.session.commit()
+        if ("chats", "last_message_id") in added:
+            # banco anterior à caixa de entrada do chat
+            inbox.backfill()
+            db.session.commit()
+        if not UserStats.query.first() and User.query.first():
+            # banco anterior aos agregados do dashboard
+            dashboard.rebuild()
+            db.session.commit()
+        if not AnalyticsBucket.query.first() and User.query.first():
+            # banco anterior aos intervalos de analytics
+            analytics.backfill()
+            db.session.commit()
+        if not TimelineEntry.query.first() and Post.query.first():
+            # banco anterior à timeline materializada: monta a partir dos follows
+            timeline.rebuild()
+            db.session.commit()
+        if search_index.ensure_index():
+            search_index.rebuild()
+            db.session.commit()
+        if not ProductTag.query.first() and Produto.query.filter(Produto.tags.isnot(None)).first():
+            # tabela product_tags recém-criada: migra as tags existentes
+            catalog.migrate_tags()
+            db.session.commit()
+
+    typeahead.init_app(app)
+    download_counter.init_app(app)
+    chat_expiry.init_app(app)
+    upload_cleanup.init_app(app)
+    platform_counters.init_app(app)
+    with app.app_context():
+        if not PlatformCounter.query.first():
+            # primeira execução com os contadores: parte do COUNT(*) atual
+            platform_counters.reconcile()
+    leaderboard.init_app(app)
+    register_commands(app)
+
+    @app.errorhandler(HashingBusy)
+    def hashing_busy(e):
+        return jsonify({"error": "Servidor ocupado, tente novamente"}), 503, {"Retry-After": "1"}
 
     @app.route("/api/ping")
     def ping():
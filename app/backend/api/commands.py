@@ -0,0 +1,142 @@
+# commands.py - comandos de manutenção (flask --app app <comando>)
+import click
+from extensions import db
+
+
+def register_commands(app):
+
+    @app.cli.command("repair-counters")
+    def repair_counters():
+        """Recalcula likes_count/comments_count dos posts."""
+        from utils.counters import recount_post_counters
+        updated = recount_post_counters()
+        db.session.commit()
+        click.echo(f"{updated} posts atualizados")
+
+    @app.cli.command("migrate-product-tags")
+    def migrate_product_tags():
+        """Copia as strings Produto.tags para a tabela product_tags."""
+        from utils.catalog import migrate_tags
+        migrated = migrate_tags()
+        db.session.commit()
+        click.echo(f"{migrated} produtos migrados")
+
+    @app.cli.command("gc-uploads")
+    def gc_uploads():
+        """Remove sessões de upload em partes abandonadas."""
+        from utils.chunked_upload import cleanup_abandoned
+        click.echo(f"{cleanup_abandoned()} sessões removidas")
+
+    @app.cli.command("dedupe-uploads")
+    def dedupe_uploads():
+        """Renomeia os uploads para nomes sha256, remove duplicados e reescreve referências."""
+        from utils.content_store import migrate_names
+        migrated, duplicates = migrate_names()
+        click.echo(f"{migrated} arquivos migrados, {duplicates} duplicados removidos")
+
+    @app.cli.command("gc-files")
+    def gc_files():
+        """Apaga uploads sem referência há mais de UPLOAD_GC_GRACE segundos."""
+        from utils.content_store import gc
+        from utils.images import purge_orphans
+        removed = gc(app.config["UPLOAD_GC_GRACE"])
+        variants = purge_orphans(app.config["UPLOAD_FOLDER"])
+        click.echo(f"{removed} arquivos removidos, {variants} variantes removidas")
+
+    @app.cli.command("backfill-image-variants")
+    def backfill_image_variants():
+        """Gera as variantes thumb/card/full das imagens já enviadas."""
+        from utils import images
+        if not images.Image:
+            click.echo("Pillow não instalado")
+            return
+        done, failed = images.backfill(app.config["UPLOAD_FOLDER"])
+        click.echo(f"{done} imagens processadas, {failed} falhas")
+
+    @app.cli.command("migrate-storage")
+    def migrate_storage():
+        """Move os uploads para o layout/backend configurado (pode rodar com a aplicação no ar)."""
+        from utils.storage import storage
+        moved, skipped = storage.migrate()
+        click.echo(f"{moved} arquivos movidos, {skipped} já estavam no destino")
+
+    @app.cli.command("expire-temp-chats")
+    def expire_temp_chats():
+        """Apaga agora os chats temporários expirados (CHAT_TEMP_TTL)."""
+        from utils.chat_expiry import chat_expiry
+        run = chat_expiry.purge()
+        click.echo(f"{run['chats']} chats e {run['messages']} mensagens removidos em {run['seconds']}s")
+
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index():
+        """Reconstrói o índice de busca textual."""
+        from utils import search_index
+        if not search_index.ensure_index():
+            if not search_index.is_enabled():
+                click.echo("FTS5 indisponível neste banco; a busca usa LIKE")
+                return
+        total = search_index.rebuild()
+        db.session.commit()
+        click.echo(f"{total} documentos indexados")
+
+    @app.cli.command("rebuild-timelines")
+    def rebuild_timelines():
+        """Refaz as timelines materializadas a partir dos follows."""
+        from utils import timeline
+        total = timeline.rebuild()
+        db.session.commit()
+        click.echo(f"{total} entradas de timeline")
+
+    @app.cli.command("rebuild-dashboard-rollups")
+    def rebuild_dashboard_rollups():
+        """Recalcula os agregados do dashboard (user_stats, vendas por mês, likes por dia)."""
+        from utils import dashboard
+        total = dashboard.rebuild()
+        db.session.commit()
+        click.echo(f"Agregados de {total} usuários recalculados")
+
+    @app.cli.command("check-dashboard-rollups")
+    def check_dashboard_rollups():
+        """Compara os agregados do dashboard com as tabelas; lista as divergências."""
+        from utils import dashboard
+        problems = dashboard.check()
+        for table, key, stored, expected in problems:
+            click.echo(f"{table} {key}: gravado {stored}, esperado {expected}")
+        click.echo(f"{len(problems)} divergências")
+
+    @app.cli.command("backfill-analytics")
+    def backfill_analytics():
+        """Recalcula os intervalos por hora/dia de /api/admin/analytics a partir das tabelas."""
+        from utils import analytics
+        total = analytics.backfill()
+        db.session.commit()
+        click.echo(f"{total} intervalos gravados")
+
+    @app.cli.command("reconcile-counters")
+    def reconcile_counters():
+        """Confere os contadores de /api/admin/stats com COUNT(*) e corrige as diferenças."""
+        from utils.platform_counters import platform_counters
+        run = platform_counters.reconcile()
+        click.echo(f"Diferenças corrigidas: {run['drift'] or 'nenhuma'}")
+
+    @app.cli.command("rebuild-leaderboard")
+    def rebuild_leaderboard():
+        """Refaz a cópia do ranking lendo users inteira (após alterar pontos fora do ORM)."""
+        from utils.leaderboard import leaderboard
+        total = leaderboard.rebuild()
+        click.echo(f"Ranking com {total} usuários gravado")
+
+    @app.cli.command("set-admin")
+    @click.argument("username")
+    @click.option("--revoke", is_flag=True, help="Remove o acesso em vez de conceder.")
+    def set_admin(username, revoke):
+        """Concede (ou com --revoke remove) o acesso às rotas restritas de /api/admin."""
+        from models import User
+        from utils.auth import invalidate_user
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            raise click.ClickException(f"Usuário {username} não encontrado")
+        user.is_admin = not revoke
+        db.session.commit()
+        invalidate_user(user.id)
+        click.echo(f"{username}: is_admin={user.is_admin}")
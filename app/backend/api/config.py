@@ -8,3 +8,82 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
     MAX_CONTENT_LENGTH = 10 * 1024 * 1024
+    # timeline da home: entradas guardadas por usuário e limite de seguidores
+    # acima do qual o post não é distribuído na escrita (lido na hora)
+    TIMELINE_MAX_ENTRIES = int(os.getenv("TIMELINE_MAX_ENTRIES", 800))
+    TIMELINE_FANOUT_LIMIT = int(os.getenv("TIMELINE_FANOUT_LIMIT", 5000))
+    # cache de tokens/usuários autenticados (por processo; o TTL é quanto
+    # outro worker demora a ver uma conta alterada ou apagada)
+    AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+    AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", 60))
+    # hash de senha: método/custo do werkzeug (o padrão é o scrypt que os
+    # hashes existentes já usam; só se regrava hash para um método mais forte)
+    # e pool de processos (PASSWORD_HASH_WORKERS=0 roda na própria thread)
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 32))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", 2))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 10))
+    # contador de downloads: grava a cada N downloads ou N segundos
+    # (intervalo 0: sem thread, o lote cheio é gravado na própria requisição)
+    DOWNLOAD_FLUSH_EVENTS = int(os.getenv("DOWNLOAD_FLUSH_EVENTS", 100))
+    DOWNLOAD_FLUSH_INTERVAL = float(os.getenv("DOWNLOAD_FLUSH_INTERVAL", 10))
+    # downloads: links assinados e envio delegado ao proxy
+    # UPLOAD_OFFLOAD: "" (Flask envia), "x-accel" (nginx) ou "x-sendfile" (apache/lighttpd)
+    DOWNLOAD_LINK_TTL = int(os.getenv("DOWNLOAD_LINK_TTL", 15 * 60))
+    DOWNLOAD_REQUIRE_SIGNATURE = os.getenv("DOWNLOAD_REQUIRE_SIGNATURE", "1") == "1"
+    UPLOAD_OFFLOAD = os.getenv("UPLOAD_OFFLOAD", "")
+    X_ACCEL_PREFIX = os.getenv("X_ACCEL_PREFIX", "/protected-uploads/")
+    USE_X_SENDFILE = UPLOAD_OFFLOAD == "x-sendfile"
+    # upload em partes: pasta das sessões, tamanho máximo, sessões abertas
+    # por usuário e abandono (limpeza a cada UPLOAD_CLEANUP_INTERVAL
+    # segundos; 0 desliga a thread)
+    UPLOAD_TMP_FOLDER = os.path.join(BASE_DIR, "uploads_tmp")
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 5 * 1024 * 1024))
+    UPLOAD_MAX_FILE_SIZE = int(os.getenv("UPLOAD_MAX_FILE_SIZE", 100 * 1024 * 1024))
+    UPLOAD_MAX_SESSIONS = int(os.getenv("UPLOAD_MAX_SESSIONS", 3))
+    UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", 24 * 3600))
+    UPLOAD_CLEANUP_INTERVAL = float(os.getenv("UPLOAD_CLEANUP_INTERVAL", 3600))
+    # uploads sem nenhuma referência são apagados após este prazo (gc-files)
+    UPLOAD_GC_GRACE = int(os.getenv("UPLOAD_GC_GRACE", 24 * 3600))
+    # onde ficam os uploads (utils/storage.py): "local" (UPLOAD_FOLDER em
+    # shards) ou "s3"; S3_ENDPOINT_URL aponta para MinIO/moto_server e as
+    # credenciais vêm das variáveis AWS_* padrão. Com STORAGE_LOCAL_FALLBACK o
+    # S3 também lê UPLOAD_FOLDER até `flask --app app migrate-storage` terminar.
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+    S3_BUCKET = os.getenv("S3_BUCKET", "dropverse-uploads")
+    S3_PREFIX = os.getenv("S3_PREFIX", "uploads/")
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")
+    S3_REGION = os.getenv("S3_REGION", "")
+    S3_URL_TTL = int(os.getenv("S3_URL_TTL", 5 * 60))
+    STORAGE_LOCAL_FALLBACK = os.getenv("STORAGE_LOCAL_FALLBACK", "1") == "1"
+    # chat em tempo real: fila (ex.: redis://) para o Socket.IO difundir entre
+    # vários processos e máximo de mensagens devolvidas na ressincronização
+    SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE", "")
+    CHAT_RESYNC_LIMIT = int(os.getenv("CHAT_RESYNC_LIMIT", 200))
+    # chats temporários: apagados após CHAT_TEMP_TTL segundos sem atividade,
+    # verificados a cada CHAT_EXPIRY_INTERVAL segundos (0 desliga a thread)
+    CHAT_TEMP_TTL = int(os.getenv("CHAT_TEMP_TTL", 48 * 3600))
+    CHAT_EXPIRY_INTERVAL = float(os.getenv("CHAT_EXPIRY_INTERVAL", 600))
+    CHAT_EXPIRY_BATCH = int(os.getenv("CHAT_EXPIRY_BATCH", 500))
+    # variantes de imagem (thumb/card/full): threads de geração e qualidade
+    # (IMAGE_WORKERS=0 gera só sob demanda, na primeira requisição ?w=)
+    IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+    IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", 80))
+    # contadores de /api/admin/stats: conferidos com COUNT(*) a cada
+    # COUNTERS_RECONCILE_INTERVAL segundos (0 desliga a thread)
+    COUNTERS_RECONCILE_INTERVAL = float(os.getenv("COUNTERS_RECONCILE_INTERVAL", 3600))
+    # /api/admin/analytics: máximo de intervalos devolvidos por consulta
+    ANALYTICS_MAX_BUCKETS = int(os.getenv("ANALYTICS_MAX_BUCKETS", 1000))
+    # exportações NDJSON/CSV: linhas buscadas do banco por lote
+    EXPORT_BATCH = int(os.getenv("EXPORT_BATCH", 1000))
+    # ranking em memória: sincroniza com o banco (alterações de outros
+    # processos) a cada LEADERBOARD_SYNC_INTERVAL segundos e grava a cópia
+    # usada no próximo start a cada LEADERBOARD_SNAPSHOT_INTERVAL segundos
+    LEADERBOARD_SYNC_INTERVAL = float(os.getenv("LEADERBOARD_SYNC_INTERVAL", 60))
+    LEADERBOARD_SNAPSHOT_INTERVAL = float(os.getenv("LEADERBOARD_SNAPSHOT_INTERVAL", 600))
+    # sugestões por prefixo: releitura do banco (downloads e pontos de
+    # outros processos, itens apagados); 0 desliga
+    TYPEAHEAD_REFRESH_INTERVAL = float(os.getenv("TYPEAHEAD_REFRESH_INTERVAL", 300))
+    # Cache-Control das rotas com ETag (0 = sempre revalidar)
+    HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", 0))
@@ -1,5 +1,4 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 try:
     from flask_socketio import SocketIO
@@ -8,6 +7,5 @@ except ImportError:
     SocketIO = None
 
 db = SQLAlchemy()
-bcrypt = Bcrypt()
 jwt = JWTManager()
 socketio = SocketIO() if SocketIO else None
@@ -1,7 +1,7 @@
 # models.py
 from datetime import datetime
 from extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from utils.passwords import hash_password, verify_password
 
 user_badges = db.Table(
     'user_badges',
@@ -20,8 +20,12 @@ class User(db.Model):
     avatar = db.Column(db.String(250), nullable=True)
     parental_email = db.Column(db.String(150), nullable=True)
     is_verified = db.Column(db.Boolean, default=False)
+    # acesso às rotas de /api/admin que expõem dados de usuários (utils/auth.admin_required)
+    is_admin = db.Column(db.Boolean, nullable=False, default=False, server_default="0")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     points = db.Column(db.Integer, default=0)
+    # última alteração de points (utils/leaderboard.py sincroniza a partir daqui)
+    points_updated_at = db.Column(db.DateTime, nullable=True, index=True)
 
     produtos = db.relationship('Produto', backref='autor', lazy=True)
     posts = db.relationship('Post', backref='autor', lazy=True)
@@ -29,10 +33,10 @@ class User(db.Model):
     badges = db.relationship('Badge', secondary=user_badges, backref='users')
 
     def set_password(self, senha):
-        self.senha_hash = generate_password_hash(senha)
+        self.senha_hash = hash_password(senha)
 
     def check_password(self, senha):
-        return check_password_hash(self.senha_hash, senha)
+        return verify_password(self.senha_hash, senha)
 
     def to_dict(self):
         return {
@@ -61,13 +65,22 @@ class Produto(db.Model):
     tags = db.Column(db.String(250), nullable=True)
     categoria = db.Column(db.String(80), nullable=True)
 
+    tag_rows = db.relationship('ProductTag', backref='produto', lazy=True, cascade="all, delete-orphan")
+
+    __table_args__ = (
+        db.Index('ix_produtos_created_id', 'created_at', 'id'),
+        db.Index('ix_produtos_categoria_created_id', 'categoria', 'created_at', 'id'),
+        db.Index('ix_produtos_preco_id', 'preco', 'id'),
+        db.Index('ix_produtos_downloads_id', 'downloads', 'id'),
+        db.Index('ix_produtos_file_path', 'file_path'),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
             "titulo": self.titulo,
             "descricao": self.descricao,
             "preco": self.preco,
-            "file_path": self.file_path,
             "autor_id": self.autor_id,
             "created_at": self.created_at.isoformat(),
             "tags": self.tags,
@@ -75,6 +88,15 @@ class Produto(db.Model):
         }
 
 
+class ProductTag(db.Model):
+    # tags normalizadas de Produto (Produto.tags mantém a string original)
+    __tablename__ = "product_tags"
+    produto_id = db.Column(db.Integer, db.ForeignKey('produtos.id'), primary_key=True)
+    tag = db.Column(db.String(60), primary_key=True)
+
+    __table_args__ = (db.Index('ix_product_tags_tag', 'tag', 'produto_id'),)
+
+
 class Post(db.Model):
     __tablename__ = "posts"
     id = db.Column(db.Integer, primary_key=True)
@@ -91,19 +113,30 @@ class Post(db.Model):
     categoria = db.Column(db.String(80), nullable=True)
     file_path = db.Column(db.String(300), nullable=True)
 
+    # Contadores desnormalizados (ver utils/counters.py)
+    likes_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    comments_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # downloads pelo link assinado do post (utils/download_counter.py)
+    downloads = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
     comments = db.relationship('Comment', backref='post', lazy=True, cascade="all, delete-orphan")
     likes_rel = db.relationship('Like', backref='post', lazy=True, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        db.Index('ix_posts_created_id', 'created_at', 'id'),
+        db.Index('ix_posts_autor_created_id', 'autor_id', 'created_at', 'id'),
+        db.Index('ix_posts_file_path', 'file_path'),
+    )
+
     def to_dict(self):
-        likes_count = len(self.likes_rel) if self.likes_rel is not None else 0
         base = {
             "id": self.id,
             "tipo": self.tipo,
             "content": self.conteudo,
             "image": self.imagem,
             "autor_id": self.autor_id,
-            "likes": likes_count,
-            "comments_count": len(self.comments) if self.comments is not None else 0,
+            "likes": self.likes_count or 0,
+            "comments_count": self.comments_count or 0,
             "created_at": self.created_at.isoformat()
         }
         if self.tipo == "product":
@@ -112,7 +145,8 @@ class Post(db.Model):
                 "descricao": self.descricao,
                 "preco": self.preco,
                 "categoria": self.categoria,
-                "file_path": self.file_path
+                "has_file": bool(self.file_path),
+                "downloads": self.downloads or 0
             })
         return base
 
@@ -125,8 +159,23 @@ class Chat(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     participant_a = db.Column(db.Integer, db.ForeignKey('users.id'))
     participant_b = db.Column(db.Integer, db.ForeignKey('users.id'))
+    # caixa de entrada (utils/inbox.py): última mensagem e, por participante,
+    # a última mensagem lida e quantas chegaram depois dela
+    last_message_id = db.Column(db.Integer, nullable=True)
+    last_read_a = db.Column(db.Integer, nullable=True)
+    last_read_b = db.Column(db.Integer, nullable=True)
+    unread_a = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    unread_b = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     messages = db.relationship('Message', backref='chat', lazy=True, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # expiração dos chats temporários (utils/chat_expiry.py)
+        db.Index('ix_chats_temp_activity', 'is_temp', 'last_activity'),
+        # caixa de entrada: chats de cada participante por atividade
+        db.Index('ix_chats_a_activity', 'participant_a', 'last_activity', 'id'),
+        db.Index('ix_chats_b_activity', 'participant_b', 'last_activity', 'id'),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -144,14 +193,22 @@ class Message(db.Model):
     imagem = db.Column(db.String(250), nullable=True)
     data_envio = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
-        return {
+    # histórico paginado por chat (routes/chat.py)
+    __table_args__ = (db.Index('ix_messages_chat_sent_id', 'chat_id', 'data_envio', 'id'),)
+
+    def to_dict(self, compact=False):
+        data = {
             "id": self.id,
             "chat_id": self.chat_id,
             "remetente_id": self.remetente_id,
             "conteudo": self.conteudo,
             "data_envio": self.data_envio.isoformat()
         }
+        if compact:
+            # chat_id já vai uma vez na página; campos vazios são omitidos
+            del data["chat_id"]
+            data = {k: v for k, v in data.items() if v is not None}
+        return data
 
 
 class Purchase(db.Model):
@@ -162,6 +219,12 @@ class Purchase(db.Model):
     price_paid = db.Column(db.Float, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_purchases_comprador_created', 'comprador_id', 'created_at'),
+        db.Index('ix_purchases_produto_created', 'produto_id', 'created_at'),
+        db.Index('ix_purchases_created_id', 'created_at', 'id'),
+    )
+
 
 class Like(db.Model):
     __tablename__ = "likes"
@@ -170,7 +233,10 @@ class Like(db.Model):
     post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    __table_args__ = (db.UniqueConstraint('user_id', 'post_id', name='_user_post_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'post_id', name='_user_post_uc'),
+        db.Index('ix_likes_user_created', 'user_id', 'created_at'),
+    )
 
 
 class Comment(db.Model):
@@ -183,8 +249,9 @@ class Comment(db.Model):
     
     user = db.relationship('User', backref='comments', lazy=True)
 
-    def to_dict(self):
-        username = getattr(self.user, "username", None)
+    def to_dict(self, user=None):
+        # serializers.serialize_comments passa o usuário já carregado em lote
+        username = getattr(user or self.user, "username", None)
         return {
             "id": self.id,
             "user_id": self.user_id,
@@ -220,14 +287,112 @@ class Follow(db.Model):
     followed_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    __table_args__ = (db.UniqueConstraint('follower_id', 'followed_id', name='_follower_followed_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('follower_id', 'followed_id', name='_follower_followed_uc'),
+        db.Index('ix_follows_followed', 'followed_id'),
+    )
 
     follower = db.relationship('User', foreign_keys=[follower_id], backref='following_rel')
     followed = db.relationship('User', foreign_keys=[followed_id], backref='followers_rel')
 
+class TimelineEntry(db.Model):
+    # timeline materializada: um registro por (dono da timeline, post)
+    __tablename__ = "timeline_entries"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), nullable=False)
+    autor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)  # created_at do post
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'post_id', name='_timeline_user_post_uc'),
+        db.Index('ix_timeline_user_created_post', 'user_id', 'created_at', 'post_id'),
+        db.Index('ix_timeline_post', 'post_id'),
+    )
+
 class Badge(db.Model):
     __tablename__ = "badges"
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(80), nullable=False)
     descricao = db.Column(db.String(200), nullable=True)
     icon = db.Column(db.String(200), nullable=True)
+
+class StoredFile(db.Model):
+    # arquivo de upload endereçado por conteúdo (utils/content_store.py)
+    __tablename__ = "stored_files"
+    filename = db.Column(db.String(80), primary_key=True)  # <sha256>.<ext>
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    size = db.Column(db.Integer, nullable=False, default=0)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # último upload que resultou neste arquivo (inclusive deduplicado): o prazo do gc conta daqui
+    last_adopted_at = db.Column(db.DateTime, nullable=True)
+
+class CacheVersion(db.Model):
+    # versão por escopo ("posts", "produtos", "users"), usada nos ETags
+    __tablename__ = "cache_versions"
+    scope = db.Column(db.String(80), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# ---- agregados do dashboard (utils/dashboard.py) ----
+
+class UserStats(db.Model):
+    # totais por usuário, mantidos pelos eventos de Post/Purchase/Like/Follow
+    __tablename__ = "user_stats"
+    user_id = db.Column(db.Integer, primary_key=True)
+    posts_count = db.Column(db.Integer, nullable=False, default=0)
+    products_count = db.Column(db.Integer, nullable=False, default=0)
+    sales_count = db.Column(db.Integer, nullable=False, default=0)
+    earned = db.Column(db.Float, nullable=False, default=0.0)
+    purchases_count = db.Column(db.Integer, nullable=False, default=0)
+    likes_received = db.Column(db.Integer, nullable=False, default=0)
+    followers_count = db.Column(db.Integer, nullable=False, default=0)
+    following_count = db.Column(db.Integer, nullable=False, default=0)
+
+class UserMonthlySales(db.Model):
+    # vendas/ganhos do vendedor por ano+mês
+    __tablename__ = "user_monthly_sales"
+    user_id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    sales = db.Column(db.Integer, nullable=False, default=0)
+    earned = db.Column(db.Float, nullable=False, default=0.0)
+
+class UserDailyLikes(db.Model):
+    # likes recebidos nos posts do usuário por dia (curtidas da semana)
+    __tablename__ = "user_daily_likes"
+    user_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    likes = db.Column(db.Integer, nullable=False, default=0)
+
+class AnalyticsBucket(db.Model):
+    # totais da plataforma por hora e por dia (utils/analytics.py)
+    __tablename__ = "analytics_buckets"
+    period = db.Column(db.String(5), primary_key=True)    # "hour" ou "day"
+    start = db.Column(db.DateTime, primary_key=True)
+    metric = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.Float, nullable=False, default=0.0)
+
+class PlatformCounter(db.Model):
+    # totais da plataforma para /api/admin/stats (utils/platform_counters.py)
+    __tablename__ = "platform_counters"
+    name = db.Column(db.String(40), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class UserWeeklyPoints(db.Model):
+    # pontos ganhos por usuário em cada semana (segunda-feira) para o ranking semanal
+    __tablename__ = "user_weekly_points"
+    user_id = db.Column(db.Integer, primary_key=True)
+    week = db.Column(db.Date, primary_key=True)
+    points = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_user_weekly_points_week', 'week', 'points'),
+    )
+
+class LeaderboardSnapshot(db.Model):
+    # cópia do ranking em memória, para o próximo start não ler users inteira
+    __tablename__ = "leaderboard_snapshots"
+    board = db.Column(db.String(20), primary_key=True)
+    taken_at = db.Column(db.DateTime, nullable=False)
+    data = db.Column(db.Text, nullable=False)   # JSON [[user_id, points], ...]
@@ -1,50 +1,87 @@
 # admin.py - estatísticas simples e ferramentas de moderação
-from flask import Blueprint, jsonify
-from models import User, Produto, Post, Purchase
-from extensions import db
-from sqlalchemy import func
+from flask import Blueprint, jsonify, request, current_app
+from datetime import datetime, timedelta
+from utils.auth import cache_stats, admin_required
+from utils.chat_expiry import chat_expiry
+from utils.platform_counters import platform_counters
+from utils.leaderboard import leaderboard
+from utils import analytics, export
+from utils.export import parse_when
 
 bp = Blueprint("admin", __name__)
 
 @bp.route("/admin/stats", methods=["GET"])
 def stats():
-    return jsonify({
-        "usuarios": User.query.count(),
-        "produtos": Produto.query.count(),
-        "posts": Post.query.count()
-    })
-
-@bp.route("/admin/analytics", methods=["GET"])
-def analytics():
-    # RFA1: Módulo de Análise Simples
-    # Total de vendas
-    total_vendas = Purchase.query.count()
+    # usuarios/produtos/posts vêm de platform_counters, sem COUNT(*)
+    return jsonify(platform_counters.values())
 
-    # Total de produtos
-    total_produtos = Produto.query.count()
+@bp.route("/admin/auth-cache", methods=["GET"])
+def auth_cache():
+    # hits/misses do cache de autenticação (utils/auth.py)
+    return jsonify(cache_stats())
 
-    # Total de curtidas na semana (simulação)
-    from datetime import datetime, timedelta
-    from models import Like
+@bp.route("/admin/chat-expiry", methods=["GET"])
+def chat_expiry_stats():
+    # execuções e linhas apagadas pela expiração de chats temporários
+    return jsonify(chat_expiry.stats())
 
-    semana_passada = datetime.utcnow() - timedelta(days=7)
-    curtidas_semana = Like.query.filter(Like.created_at >= semana_passada).count()
+@bp.route("/admin/counters", methods=["GET"])
+def counters_stats():
+    # execuções e correções da conferência dos contadores de /admin/stats
+    return jsonify(platform_counters.stats())
 
-    # Produtos mais vistos (simulação: top 3 por downloads)
-    produtos_mais_vistos = Produto.query.order_by(Produto.downloads.desc()).limit(3).all()
+@bp.route("/admin/leaderboard", methods=["GET"])
+def leaderboard_stats():
+    # tamanho, última sincronização e última cópia do ranking em memória
+    return jsonify(leaderboard.stats())
 
-    # Vendas por mês
-    vendas_por_mes = db.session.query(
-        func.extract('month', Purchase.created_at).label('mes'),
-        func.count(Purchase.id).label('vendas')
-    ).group_by(func.extract('month', Purchase.created_at)).all()
+@bp.route("/admin/analytics", methods=["GET"])
+def analytics_view():
+    """
+    RFA1: Módulo de Análise. ?from=&to= (ISO; padrão: últimos 30 dias),
+    ?granularity=hour|day|week|month e ?metrics=purchases,revenue,likes,posts,registrations.
+    """
+    granularity = request.args.get("granularity", "day")
+    if granularity not in analytics.GRANULARITIES:
+        return jsonify({"error": f"granularity deve ser um de {', '.join(analytics.GRANULARITIES)}"}), 400
+    metrics = [m for m in request.args.get("metrics", "").split(",") if m] or list(analytics.METRICS)
+    unknown = [m for m in metrics if m not in analytics.METRICS]
+    if unknown:
+        return jsonify({"error": f"Métricas desconhecidas: {', '.join(unknown)}"}), 400
+    try:
+        end = parse_when(request.args["to"], end=True) if request.args.get("to") else datetime.utcnow()
+        start = parse_when(request.args["from"]) if request.args.get("from") else end - timedelta(days=30)
+    except ValueError:
+        return jsonify({"error": "Datas devem estar no formato ISO (YYYY-MM-DD)"}), 400
+    if start >= end:
+        return jsonify({"error": "from deve ser anterior a to"}), 400
 
-    vendas_por_mes_list = [{"mes": int(v.mes), "vendas": v.vendas} for v in vendas_por_mes]
+    try:
+        series, totals = analytics.series(start, end, granularity, metrics,
+                                          max_buckets=current_app.config["ANALYTICS_MAX_BUCKETS"])
+    except analytics.TooManyBuckets as e:
+        return jsonify({"error": f"Intervalo grande demais: máximo de {e} pontos nesta granularidade"}), 400
 
     return jsonify({
-        "total_vendas": total_vendas,
-        "total_produtos": total_produtos,
-        "curtidas_semana": curtidas_semana,
-        "produtos_mais_vistos": [p.to_dict() for p in produtos_mais_vistos],
-        "vendas_por_mes": vendas_por_mes_list
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "granularity": granularity,
+        "totals": totals,
+        "series": series
     })
+
+@bp.route("/admin/export/<dataset>", methods=["GET"])
+@admin_required
+def export_dataset(dataset):
+    """purchases, products ou users em streaming: ?format=ndjson|csv&from=&to=."""
+    if dataset not in export.DATASETS:
+        return jsonify({"error": f"Exportações disponíveis: {', '.join(export.DATASETS)}"}), 404
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in export.FORMATS:
+        return jsonify({"error": "format deve ser ndjson ou csv"}), 400
+    query, date_column = export.DATASETS[dataset]
+    try:
+        where = export.date_range(date_column, request.args)
+    except ValueError:
+        return jsonify({"error": "Datas devem estar no formato ISO (YYYY-MM-DD)"}), 400
+    return export.stream(query(*where), dataset, fmt)
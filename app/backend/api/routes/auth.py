@@ -4,6 +4,9 @@ from extensions import db
 from models import User
 from utils.jwt_utils import create_token
 from utils.email_utils import send_email
+from utils import http_cache, typeahead
+from utils.auth import invalidate_user
+from utils.passwords import needs_rehash
 from config import Config
 from datetime import datetime
 
@@ -34,7 +37,9 @@ def register():
     user = User(nome=nome, username=username, email=email, parental_email=parental)
     user.set_password(password)
     db.session.add(user)
+    http_cache.bump(http_cache.USERS)
     db.session.commit()
+    typeahead.put_user(user)
 
     # se parental email fornecido, enviar link de consentimento
     if parental:
@@ -59,6 +64,12 @@ def login():
     if not user or not user.check_password(senha):
         return jsonify({"error": "Credenciais inválidas"}), 401
 
+    # hash antigo (método/custo diferente do Config): regrava com o atual
+    if needs_rehash(user.senha_hash):
+        user.set_password(senha)
+        db.session.commit()
+        invalidate_user(user.id)
+
     # optional: bloqueio se parental not consent and age < 18 (omitir aqui)
     token = create_token(user.id)
     return jsonify({"token": token, "user": user.to_dict()})
@@ -76,6 +87,8 @@ def parental_consent():
     if not u:
         return "Usuário não encontrado", 404
     u.is_verified = True
+    http_cache.bump(http_cache.USERS)
     db.session.commit()
+    invalidate_user(u.id)
     # registra data/hora se desejar
     return "Consentimento registrado. Conta liberada."
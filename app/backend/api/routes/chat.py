@@ -1,11 +1,58 @@
 # chat.py - chat simples com mensagens persistentes e temporárias
-from flask import Blueprint, request, jsonify
-from extensions import db
+# Além das rotas HTTP, com Flask-SocketIO disponível cada chat é uma sala
+# ("chat:<id>"): o cliente conecta com o JWT (auth={"token": ...}), entra na
+# sala com "entrar" e recebe as mensagens novas pelo evento "mensagem". Ao
+# reconectar, "entrar" com since_id devolve o que foi perdido.
+from flask import Blueprint, request, jsonify, current_app
+from extensions import db, socketio
 from models import Chat, Message
-from datetime import datetime, timedelta
+from utils.pagination import keyset_page, encode_cursor, parse_limit, InvalidCursor
+from utils.chat_expiry import chat_expiry
+from utils.auth import get_current_user_from_header
+from utils import inbox
+from datetime import datetime
 
 bp = Blueprint("chat", __name__)
 
+
+def room(chat_id):
+    return f"chat:{chat_id}"
+
+
+def salvar_mensagem(chat, remetente_id, conteudo, imagem=None):
+    """Grava a mensagem, atualiza a atividade do chat e difunde para a sala."""
+    msg = Message(chat_id=chat.id, remetente_id=remetente_id, conteudo=conteudo, imagem=imagem)
+    chat.last_activity = datetime.utcnow()
+    db.session.add(msg)
+    db.session.flush()
+    inbox.on_message(chat, msg)
+    db.session.commit()
+    if socketio:
+        socketio.emit("mensagem", msg.to_dict(), to=room(chat.id))
+    return msg
+
+
+def pagina_mensagens(chat_id, before=None, after=None, limit=50):
+    """
+    Uma página do histórico por (data_envio, id), usando o índice
+    ix_messages_chat_sent_id: sem `after`, das mais novas para as mais
+    antigas (antes de `before`); com `after`, as posteriores em ordem
+    crescente (after=0: desde o início). Retorna (mensagens, id para a próxima página ou None).
+    """
+    cursor = None
+    anchor_id = after if after is not None else before
+    if anchor_id:
+        anchor = db.session.get(Message, anchor_id)
+        if not anchor or anchor.chat_id != chat_id:
+            raise InvalidCursor(anchor_id)
+        cursor = encode_cursor(anchor.data_envio, anchor.id)
+    msgs, next_cursor = keyset_page(
+        Message.query.filter(Message.chat_id == chat_id),
+        Message.data_envio, Message.id,
+        cursor=cursor, limit=limit, descending=after is None,
+    )
+    return msgs, (msgs[-1].id if next_cursor else None)
+
 @bp.route("/chat/iniciar", methods=["POST"])
 def iniciar_chat():
     data = request.get_json() or {}
@@ -25,24 +72,135 @@ def enviar_mensagem():
     conteudo = data.get("conteudo")
     imagem = data.get("imagem")
 
-    msg = Message(chat_id=chat_id, remetente_id=remetente_id, conteudo=conteudo, imagem=imagem)
     chat = Chat.query.get(chat_id)
-    chat.last_activity = datetime.utcnow()
-    db.session.add(msg)
-    db.session.commit()
+    if not chat:
+        return jsonify({"error": "Chat não encontrado"}), 404
+    salvar_mensagem(chat, remetente_id, conteudo, imagem)
     return jsonify({"msg": "Mensagem enviada"})
 
+@bp.route("/chat/inbox", methods=["GET"])
+def caixa_de_entrada():
+    """Conversas do usuário, mais recentes primeiro (?limit=&cursor=)."""
+    user = get_current_user_from_header(request)
+    if not user:
+        return jsonify({"error": "not authenticated"}), 401
+    try:
+        items, next_cursor = inbox.inbox_page(
+            user.id, request.args.get("cursor"),
+            limit=parse_limit(request.args.get("limit")),
+        )
+    except InvalidCursor:
+        return jsonify({"error": "Cursor inválido"}), 400
+    return jsonify({"chats": items, "next_cursor": next_cursor})
+
 @bp.route("/chat/<int:chat_id>", methods=["GET"])
 def listar_mensagens(chat_id):
-    msgs = Message.query.filter_by(chat_id=chat_id).order_by(Message.data_envio.asc()).all()
-    return jsonify([m.to_dict() for m in msgs])
+    """
+    ?limit=&before=<id> para rolar para trás (mais novas primeiro) ou
+    ?after=<id> para buscar as que chegaram depois; ?compact=1 omite campos
+    repetidos. next_cursor é o id a passar no mesmo parâmetro.
+    """
+    before = request.args.get("before", type=int)
+    after = request.args.get("after", type=int)
+    if before is not None and after is not None:
+        return jsonify({"error": "Use before ou after, não ambos"}), 400
+    try:
+        msgs, next_cursor = pagina_mensagens(
+            chat_id, before=before, after=after,
+            limit=parse_limit(request.args.get("limit"), default=50, maximum=200),
+        )
+    except InvalidCursor:
+        return jsonify({"error": "Cursor inválido"}), 400
+    user = get_current_user_from_header(request)
+    chat = db.session.get(Chat, chat_id) if user else None
+    if chat and inbox.mark_read(chat, user.id, msgs):
+        db.session.commit()
+    compact = request.args.get("compact") in ("1", "true")
+    return jsonify({
+        "chat_id": chat_id,
+        "messages": [m.to_dict(compact=compact) for m in msgs],
+        "next_cursor": next_cursor,
+    })
 
 @bp.route("/chat/limpar_temporarios", methods=["DELETE"])
 def limpar_chats_temporarios():
-    limite = datetime.utcnow() - timedelta(hours=48)
-    antigos = Chat.query.filter(Chat.is_temp == True, Chat.last_activity < limite).all()
-    for c in antigos:
-        Message.query.filter_by(chat_id=c.id).delete()
-        db.session.delete(c)
-    db.session.commit()
-    return jsonify({"msg": "Chats temporários removidos"})
+    # normalmente feito pela thread de utils/chat_expiry.py; aqui força uma execução
+    return jsonify({"msg": "Chats temporários removidos", **chat_expiry.purge()})
+
+
+# ---- tempo real (Socket.IO) ----
+
+if socketio:
+    from flask_socketio import join_room, leave_room
+    from utils.auth import user_from_token
+
+    _online = {}   # sid -> user_id
+
+    def _chat_do_usuario(data):
+        """Chat de data["chat_id"] se o usuário da conexão participa dele."""
+        user_id = _online.get(request.sid)
+        chat = db.session.get(Chat, (data or {}).get("chat_id") or 0)
+        if user_id is None or not chat or user_id not in (chat.participant_a, chat.participant_b):
+            return None, user_id
+        return chat, user_id
+
+    @socketio.on("connect")
+    def conectar(auth=None):
+        token = (auth or {}).get("token") or request.args.get("token") \
+            or request.headers.get("Authorization", "").replace("Bearer ", "").strip()
+        user = user_from_token(token)
+        if not user:
+            # recusa a conexão (o cliente recebe connect_error)
+            return False
+        _online[request.sid] = user.id
+
+    @socketio.on("disconnect")
+    def desconectar(*args):
+        _online.pop(request.sid, None)
+
+    @socketio.on("entrar")
+    def entrar(data):
+        """
+        {"chat_id": N, "since_id": M?} -> entra na sala. Com since_id, a
+        resposta (ack) traz as mensagens com id > since_id, em ordem, até
+        CHAT_RESYNC_LIMIT; "has_more" indica que o resto deve vir do histórico HTTP.
+        """
+        chat, user_id = _chat_do_usuario(data)
+        if not chat:
+            return {"error": "Chat não encontrado"}
+        join_room(room(chat.id))
+        resposta = {"ok": True, "chat_id": chat.id}
+        since_id = data.get("since_id")
+        if since_id is not None:
+            try:
+                msgs, next_cursor = pagina_mensagens(chat.id, after=int(since_id),
+                                                     limit=current_app.config["CHAT_RESYNC_LIMIT"])
+            except (InvalidCursor, ValueError):
+                return {"error": "Cursor inválido"}
+            resposta["messages"] = [m.to_dict() for m in msgs]
+            resposta["has_more"] = next_cursor is not None
+            if inbox.mark_read(chat, user_id, msgs):
+                db.session.commit()
+        return resposta
+
+    @socketio.on("sair")
+    def sair(data):
+        leave_room(room((data or {}).get("chat_id")))
+        return {"ok": True}
+
+    @socketio.on("enviar")
+    def enviar(data):
+        """
+        {"chat_id", "conteudo", "imagem"?, "client_id"?} -> grava e difunde
+        "mensagem" para a sala. O ack confirma a entrega ao servidor com o id
+        definitivo; client_id volta igual para o cliente casar com a mensagem
+        pendente (e ignorar o próprio eco).
+        """
+        chat, user_id = _chat_do_usuario(data)
+        if not chat:
+            return {"error": "Chat não encontrado"}
+        if not data.get("conteudo") and not data.get("imagem"):
+            return {"error": "Mensagem vazia"}
+        msg = salvar_mensagem(chat, user_id, data.get("conteudo"), data.get("imagem"))
+        return {"ok": True, "id": msg.id, "client_id": data.get("client_id"),
+                "data_envio": msg.data_envio.isoformat()}
@@ -1,13 +1,80 @@
 # gamification.py - ranking, pontos e badges
-from flask import Blueprint, jsonify
+from datetime import datetime, date
+from flask import Blueprint, jsonify, request
 from models import User, Badge
+from utils import http_cache
+from utils.auth import get_current_user_from_header
+from utils.leaderboard import leaderboard, serialize
+from utils.pagination import parse_limit
 
 bp = Blueprint("gamification", __name__)
 
+
+def _board():
+    """
+    Ranking pedido em ?period=all|week ou ?week=YYYY-MM-DD (semana que
+    contém a data). ValueError se os parâmetros forem inválidos.
+    """
+    if request.args.get("week"):
+        return leaderboard.board(date.fromisoformat(request.args["week"]))
+    period = request.args.get("period", "all")
+    if period == "week":
+        return leaderboard.board(datetime.utcnow())
+    if period != "all":
+        raise ValueError(period)
+    return leaderboard.all
+
+
+def _ranking_key():
+    """
+    Parte do ETag do ranking que vem deste processo: semana, token e versão
+    do Board. USERS sozinho não basta, o conteúdo é o ranking em memória.
+    """
+    try:
+        board = _board()
+    except ValueError:
+        return "invalid"
+    return f"{leaderboard.week}|{board.token}:{board.version}"
+
 @bp.route("/gamification/ranking", methods=["GET"])
+@http_cache.conditional(http_cache.USERS, key=_ranking_key)
 def ranking():
-    top = User.query.order_by(User.points.desc()).limit(10).all()
-    return jsonify([{"username": u.username, "points": u.points} for u in top])
+    """Top do ranking (utils/leaderboard.py): ?limit=&offset=&period=all|week&week=."""
+    try:
+        board = _board()
+    except ValueError:
+        return jsonify({"error": "Use period=all|week ou week=YYYY-MM-DD"}), 400
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    entries = board.top(parse_limit(request.args.get("limit"), default=10), offset)
+    return jsonify(serialize(board, entries))
+
+@bp.route("/gamification/rank", methods=["GET"])
+@bp.route("/gamification/rank/<int:user_id>", methods=["GET"])
+def rank(user_id=None):
+    """
+    Posição de um usuário (sem id, o autenticado) e os ?around= (padrão 5)
+    acima e abaixo dele; mesmos period/week de /gamification/ranking.
+    """
+    if user_id is None:
+        user = get_current_user_from_header(request)
+        if not user:
+            return jsonify({"error": "not authenticated"}), 401
+        user_id = user.id
+    try:
+        board = _board()
+    except ValueError:
+        return jsonify({"error": "Use period=all|week ou week=YYYY-MM-DD"}), 400
+    position = board.rank(user_id)
+    if position is None:
+        return jsonify({"error": "Usuário fora do ranking"}), 404
+    around = min(max(request.args.get("around", 5, type=int), 0), 50)
+    return jsonify({
+        "user_id": user_id,
+        "rank": position[0],
+        "points": position[1],
+        "total": len(board),
+        "around": serialize(board, board.around(user_id, around))
+    })
 
 @bp.route("/gamification/badges/<int:user_id>", methods=["GET"])
 def badges(user_id):
@@ -2,25 +2,17 @@
 from flask import Blueprint, jsonify, request
 from extensions import db
 from models import Post, User, Like, Comment, Report
-from utils.jwt_utils import decode_jwt
+from utils.auth import get_current_user_from_header
 from utils.moderation import conteudo_aprovado
+from utils.pagination import keyset_page, parse_limit, InvalidCursor
+from utils.counters import bump_post_counter
+from utils.serializers import author_dict, serialize_posts, serialize_comments
+from utils import timeline, http_cache
+from sqlalchemy import func, or_
 from sqlalchemy.exc import SQLAlchemyError
 
 bp = Blueprint("posts", __name__)
 
-def get_current_user_from_header(req):
-    auth = req.headers.get("Authorization", "")
-    token = auth.replace("Bearer ", "").strip()
-    if not token:
-        return None
-    try:
-        payload = decode_jwt(token)
-    except Exception:
-        return None
-    if not payload:
-        return None
-    return User.query.get(payload.get("user_id"))
-
 @bp.route("/posts", methods=["POST"])
 def create_post():
     user = get_current_user_from_header(request)
@@ -70,6 +62,9 @@ def create_post():
 
     try:
         db.session.add(post)
+        db.session.flush()
+        timeline.fan_out_post(post)
+        http_cache.bump(http_cache.POSTS)
         db.session.commit()
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -78,64 +73,58 @@ def create_post():
     return jsonify({
         "msg": "Post criado com sucesso",
         "post": post.to_dict(),
-        "author": {
-            "id": user.id,
-            "username": user.username,
-            "name": user.nome,
-            "avatar": user.avatar
-        }
+        "author": author_dict(user)
     }), 201
 
-@bp.route("/posts", methods=["GET"])
-def get_posts():
-    posts = Post.query.order_by(Post.created_at.desc()).all()
-    # Filter out posts where content is the author's real name
-    posts = [p for p in posts if not (p.conteudo and p.conteudo.strip() == p.autor.nome)]
-    result = []
-
-    for post in posts:
-        post_dict = post.to_dict()
-
-        if post.autor:
-            post_dict["author"] = {
-                "id": post.autor.id,
-                "username": post.autor.username,
-                "name": post.autor.nome,
-                "avatar": post.autor.avatar
-            }
-        else:
-            post_dict["author"] = None
-
-        result.append(post_dict)
-
-    return jsonify(result)
-
+def feed_query():
+    # Esconde posts cujo conteúdo é só o nome real do autor (filtro feito no SQL
+    # para que as páginas venham sempre completas)
+    return Post.query.join(User, Post.autor_id == User.id).filter(
+        or_(Post.conteudo.is_(None), func.trim(Post.conteudo) != User.nome)
+    )
 
+def paginate_posts(query):
+    return keyset_page(
+        query,
+        Post.created_at,
+        Post.id,
+        cursor=request.args.get("cursor"),
+        limit=parse_limit(request.args.get("limit")),
+    )
 
+@bp.route("/posts", methods=["GET"])
+@http_cache.conditional(http_cache.POSTS, http_cache.USERS)
+def get_posts():
+    try:
+        posts, next_cursor = paginate_posts(feed_query())
+    except InvalidCursor:
+        return jsonify({"error": "cursor inválido"}), 400
+    return jsonify({"posts": serialize_posts(posts), "next_cursor": next_cursor})
 
 @bp.route("/posts/user/<int:user_id>", methods=["GET"])
+@http_cache.conditional(http_cache.POSTS, http_cache.USERS)
 def get_posts_by_user(user_id):
-    posts = Post.query.filter_by(autor_id=user_id).order_by(Post.created_at.desc()).all()
-    # Filter out posts where content is the author's real name
-    posts = [p for p in posts if not (p.conteudo and p.conteudo.strip() == p.autor.nome)]
-    result = []
-
-    for post in posts:
-        post_dict = post.to_dict()
-
-        if post.autor:
-            post_dict["author"] = {
-                "id": post.autor.id,
-                "username": post.autor.username,
-                "name": post.autor.nome,
-                "avatar": post.autor.avatar
-            }
-        else:
-            post_dict["author"] = None
+    try:
+        posts, next_cursor = paginate_posts(feed_query().filter(Post.autor_id == user_id))
+    except InvalidCursor:
+        return jsonify({"error": "cursor inválido"}), 400
+    return jsonify({"posts": serialize_posts(posts), "next_cursor": next_cursor})
 
-        result.append(post_dict)
+@bp.route("/posts/timeline", methods=["GET"])
+def get_timeline():
+    user = get_current_user_from_header(request)
+    if not user:
+        return jsonify({"error": "not authenticated"}), 401
 
-    return jsonify(result)
+    try:
+        posts, next_cursor = timeline.timeline_page(
+            user.id,
+            cursor=request.args.get("cursor"),
+            limit=parse_limit(request.args.get("limit")),
+        )
+    except InvalidCursor:
+        return jsonify({"error": "cursor inválido"}), 400
+    return jsonify({"posts": serialize_posts(posts), "next_cursor": next_cursor})
 
 @bp.route("/posts/<int:post_id>", methods=["DELETE"])
 def delete_post(post_id):
@@ -150,7 +139,9 @@ def delete_post(post_id):
         return jsonify({"error": "not authorized"}), 403
 
     try:
+        timeline.remove_posts([post.id])
         db.session.delete(post)
+        http_cache.bump(http_cache.POSTS)
         db.session.commit()
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -174,20 +165,21 @@ def like_post(post_id):
     like = Like(user_id=user.id, post_id=post_id)
     try:
         db.session.add(like)
+        bump_post_counter(post_id, "likes", 1)
+        http_cache.bump(http_cache.POSTS)
         db.session.commit()
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({"error": "Erro ao registrar like", "detail": str(e)}), 500
 
-    # Conta likes atuais
-    likes_count = Like.query.filter_by(post_id=post_id).count()
-    return jsonify({"msg": "Post liked", "likes": likes_count}), 200
+    return jsonify({"msg": "Post liked", "likes": post.likes_count}), 200
 
 @bp.route("/posts/<int:post_id>/comments", methods=["GET"])
+@http_cache.conditional(http_cache.POSTS, http_cache.USERS)
 def get_comments(post_id):
     post = Post.query.get_or_404(post_id)
     comments = Comment.query.filter_by(post_id=post_id).order_by(Comment.created_at.asc()).all()
-    return jsonify([c.to_dict() for c in comments])
+    return jsonify(serialize_comments(comments))
 
 @bp.route("/posts/<int:post_id>/comments", methods=["POST"])
 def create_comment(post_id):
@@ -208,6 +200,8 @@ def create_comment(post_id):
     comment = Comment(user_id=user.id, post_id=post_id, conteudo=conteudo)
     try:
         db.session.add(comment)
+        bump_post_counter(post_id, "comments", 1)
+        http_cache.bump(http_cache.POSTS)
         db.session.commit()
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -215,7 +209,7 @@ def create_comment(post_id):
 
     return jsonify({
         "msg": "Comentário criado com sucesso",
-        "comment": comment.to_dict()
+        "comment": comment.to_dict(user)
     }), 201
 
 @bp.route("/posts/<int:post_id>/comments/<int:comment_id>", methods=["DELETE"])
@@ -236,6 +230,8 @@ def delete_comment(post_id, comment_id):
 
     try:
         db.session.delete(comment)
+        bump_post_counter(post_id, "comments", -1)
+        http_cache.bump(http_cache.POSTS)
         db.session.commit()
     except SQLAlchemyError as e:
         db.session.rollback()
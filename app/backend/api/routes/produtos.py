@@ -2,8 +2,13 @@
 from flask import Blueprint, request, jsonify, current_app, send_from_directory, url_for
 from extensions import db
 from models import Produto, User, Purchase
-from utils.file_utils import save_upload
+from utils.file_utils import save_upload, sign_download, verify_download, send_upload
+from utils.storage import storage
 from utils.jwt_utils import decode_token
+from utils.auth import get_current_user_from_header
+from utils import http_cache, catalog
+from utils.pagination import keyset_page, parse_limit, InvalidCursor
+from utils.download_counter import download_counter
 import os
 from datetime import datetime, timedelta
 from config import Config
@@ -11,11 +16,37 @@ from config import Config
 bp = Blueprint("produtos", __name__)
 
 @bp.route("/produtos/", methods=["GET"])
+@http_cache.conditional(http_cache.PRODUTOS)
 def listar_produtos():
-    produtos = Produto.query.order_by(Produto.created_at.desc()).all()
-    return jsonify([p.to_dict() for p in produtos])
+    """
+    Filtros: categoria, tag (repetível ou separada por vírgula; exige todas),
+    preco_min, preco_max. sort: newest | price | price_desc | downloads.
+    Paginação por cursor: limit + cursor (next_cursor da página anterior).
+    """
+    sort = request.args.get("sort", "newest")
+    if sort not in catalog.SORTS:
+        return jsonify({"error": "sort inválido"}), 400
+    tags = catalog.split_tags(",".join(request.args.getlist("tag")))
+    query = catalog.filtered_query(
+        categoria=request.args.get("categoria"),
+        tags=tags,
+        preco_min=request.args.get("preco_min", type=float),
+        preco_max=request.args.get("preco_max", type=float),
+    )
+    sort_col, descending = catalog.SORTS[sort]
+    try:
+        produtos, next_cursor = keyset_page(
+            query, sort_col, Produto.id,
+            cursor=request.args.get("cursor"),
+            limit=parse_limit(request.args.get("limit")),
+            descending=descending,
+        )
+    except InvalidCursor:
+        return jsonify({"error": "cursor inválido"}), 400
+    return jsonify({"produtos": [p.to_dict() for p in produtos], "next_cursor": next_cursor})
 
 @bp.route("/produtos/<int:id>", methods=["GET"])
+@http_cache.conditional(http_cache.PRODUTOS)
 def obter_produto(id):
     p = Produto.query.get_or_404(id)
     return jsonify(p.to_dict())
@@ -28,6 +59,7 @@ def upload_produto():
     file = request.files['arquivo']
     titulo = request.form.get("titulo")
     descricao = request.form.get("descricao")
+    categoria = request.form.get("categoria")
     preco = float(request.form.get("preco") or 0)
     autor_id = int(request.form.get("autor_id") or 0)
 
@@ -50,8 +82,11 @@ def upload_produto():
         preco=preco,
         file_path=filename,
         file_mime=mimetype,
-        autor_id=autor_id
+        autor_id=autor_id,
+        categoria=categoria,
+        downloads=0
     )
+    catalog.set_tags(produto, request.form.get("tags"))
     db.session.add(produto)
     db.session.commit()
     return jsonify({"msg": "Produto enviado", "id": produto.id}), 201
@@ -59,38 +94,61 @@ def upload_produto():
 @bp.route("/produtos/download/<path:filename>", methods=["GET"])
 def download_produto(filename):
     """
-    Serve arquivo via send_from_directory. Em produção, servir via CDN ou storage com links temporários.
+    Serve arquivo por link temporário (?expires=&sig=, ver file_utils.sign_download).
+    Suporta Range para retomar downloads; com UPLOAD_OFFLOAD o proxy envia os bytes.
     """
-    uploads_dir = current_app.config['UPLOAD_FOLDER']
-    # verificar se o arquivo existe:
-    path = os.path.join(uploads_dir, filename)
-    if not os.path.exists(path):
+    sig = request.args.get("sig")
+    produto_id = request.args.get("produto", type=int)
+    post_id = request.args.get("post", type=int)
+    if sig or current_app.config["DOWNLOAD_REQUIRE_SIGNATURE"]:
+        if not verify_download(filename, request.args.get("expires"), sig, produto_id, post_id):
+            return jsonify({"error": "Link inválido ou expirado"}), 403
+    else:
+        # link sem assinatura não escolhe a quem creditar o download
+        produto_id = post_id = None
+    if not storage.exists(filename):
         return jsonify({"error": "Arquivo não encontrado"}), 404
-    # incrementa contador (opcional)
-    produto = Produto.query.filter_by(file_path=filename).first()
-    if produto:
-        produto.downloads = (produto.downloads or 0) + 1
-        db.session.commit()
-    return send_from_directory(uploads_dir, filename, as_attachment=True)
+    # incrementa o contador do produto ou post do link (gravado em lote, ver
+    # utils/download_counter.py); continuação de download por Range não conta de novo
+    if not request.range or request.range.ranges[0][0] == 0:
+        if produto_id:
+            download_counter.incr(produto_id)
+        elif post_id:
+            download_counter.incr(post_id, kind="post")
+    return send_upload(filename, as_attachment=True)
+
+@bp.route("/produtos/<int:id>/download-link", methods=["GET"])
+def link_produto(id):
+    user = get_current_user_from_header(request)
+    if not user:
+        return jsonify({"error":"not authenticated"}), 401
+    p = Produto.query.get_or_404(id)
+    if p.autor_id != user.id and not Purchase.query.filter_by(comprador_id=user.id, produto_id=p.id).first():
+        return jsonify({"error":"not purchased"}), 403
+    return jsonify(sign_download(p.file_path, produto_id=p.id))
 
-@bp.route("/produtos/purchase/<int:post_id>", methods=["POST"])
-def purchase_product(post_id):
-    from utils.jwt_utils import decode_jwt
+@bp.route("/produtos/purchase/<int:post_id>/download-link", methods=["GET"])
+def link_compra(post_id):
     from models import Post
 
-    auth = request.headers.get("Authorization","")
-    token = auth.replace("Bearer ","")
-    if not token:
+    user = get_current_user_from_header(request)
+    if not user:
         return jsonify({"error":"not authenticated"}), 401
+    post = Post.query.get_or_404(post_id)
+    if not post.file_path:
+        return jsonify({"error":"product has no file"}), 404
+    if post.autor_id != user.id and not Purchase.query.filter_by(comprador_id=user.id, produto_id=post.id).first():
+        return jsonify({"error":"not purchased"}), 403
+    return jsonify(sign_download(post.file_path, post_id=post.id))
 
-    payload = decode_jwt(token)
-    if not payload:
-        return jsonify({"error":"invalid token"}), 401
+@bp.route("/produtos/purchase/<int:post_id>", methods=["POST"])
+def purchase_product(post_id):
+    from models import Post
 
-    user_id = payload.get("user_id")
-    user = User.query.get(user_id)
+    user = get_current_user_from_header(request)
     if not user:
-        return jsonify({"error":"user not found"}), 404
+        return jsonify({"error":"not authenticated"}), 401
+    user_id = user.id
 
     # Find the product post
     post = Post.query.get_or_404(post_id)
@@ -111,4 +169,8 @@ def purchase_product(post_id):
     db.session.add(purchase)
     db.session.commit()
 
-    return jsonify({"message":"Purchase successful", "purchase_id": purchase.id})
+    return jsonify({
+        "message":"Purchase successful",
+        "purchase_id": purchase.id,
+        "download": sign_download(post.file_path, post_id=post.id) if post.file_path else None
+    })
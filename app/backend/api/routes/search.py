@@ -1,6 +1,9 @@
 # search.py - busca unificada por produtos, usuários e posts
 from flask import Blueprint, request, jsonify
 from models import Produto, User, Post
+from utils.serializers import serialize_posts, serialize_produtos
+from utils.pagination import parse_limit
+from utils import search_index, typeahead
 
 bp = Blueprint("search", __name__)
 
@@ -9,11 +12,24 @@ def buscar():
     q = (request.args.get("q") or "").strip()
     if not q:
         return jsonify({"produtos": [], "usuarios": [], "posts": []})
-    produtos = Produto.query.filter(Produto.titulo.ilike(f"%{q}%")).all()
-    usuarios = User.query.filter(User.username.ilike(f"%{q}%")).all()
-    posts = Post.query.filter(Post.conteudo.ilike(f"%{q}%")).all()
+    # limite e página valem para cada tipo de resultado
+    limit = parse_limit(request.args.get("limit"), default=10, maximum=50)
+    page = max(request.args.get("page", 1, type=int), 1)
+    offset = (page - 1) * limit
+    produtos = search_index.search(Produto, q, limit, offset)
+    usuarios = search_index.search(User, q, limit, offset)
+    posts = search_index.search(Post, q, limit, offset)
     return jsonify({
-        "produtos": [p.to_dict() for p in produtos],
+        "produtos": serialize_produtos(produtos),
         "usuarios": [u.to_dict() for u in usuarios],
-        "posts": [p.to_dict() for p in posts]
+        "posts": serialize_posts(posts)
+    })
+
+@bp.route("/search/suggest", methods=["GET"])
+def sugerir():
+    q = (request.args.get("q") or "").strip()
+    limit = parse_limit(request.args.get("limit"), default=5, maximum=20)
+    return jsonify({
+        "usuarios": [{"id": i, "username": label, "points": score} for i, label, score in typeahead.users.search(q, limit)],
+        "produtos": [{"id": i, "titulo": label, "downloads": score} for i, label, score in typeahead.produtos.search(q, limit)]
     })
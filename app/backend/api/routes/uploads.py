@@ -1,9 +1,10 @@
 # routes/uploads.py
-from flask import Blueprint, request, jsonify, current_app
-import os
+from flask import Blueprint, request, jsonify
 from werkzeug.utils import secure_filename
-from config import Config
-import uuid
+from extensions import db
+from utils import chunked_upload, content_store, images
+from utils.auth import get_current_user_from_header, login_required
+from utils.chunked_upload import UploadError
 
 bp = Blueprint("uploads", __name__)
 
@@ -28,18 +29,90 @@ def upload_file():
         return jsonify({"error": "Extensão não permitida"}), 400
 
     ext = filename.rsplit(".", 1)[1].lower()
-    new_filename = f"{uuid.uuid4()}.{ext}"
-
-    save_folder = current_app.config.get('UPLOAD_FOLDER', Config.UPLOAD_FOLDER)
-    os.makedirs(save_folder, exist_ok=True)
-    save_path = os.path.join(save_folder, new_filename)
 
     try:
-        file.save(save_path)
+        # nome = sha256 do conteúdo; reenviar o mesmo arquivo não ocupa disco
+        new_filename = content_store.store(file, ext)
+        db.session.commit()
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": "Falha ao salvar arquivo", "detail": str(e)}), 500
 
+    images.schedule(new_filename)
+
     return jsonify({
         "success": True,
         "filename": new_filename
     }), 201
+
+# ---- upload em partes (arquivos maiores que MAX_CONTENT_LENGTH) ----
+
+def upload_error(e):
+    return jsonify({"error": e.message, **e.extra}), e.status
+
+@bp.post("/upload/chunked")
+@login_required
+def iniciar_upload():
+    """
+    Espera {"filename": "...", "size": bytes}. Depois: PUT /upload/chunked/<id>?offset=N
+    com os bytes da parte no corpo, e POST /upload/chunked/<id>/finalize.
+    """
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get("filename") or "")
+    if not filename:
+        return jsonify({"error": "Nome do arquivo vazio"}), 400
+    if not allowed(filename):
+        return jsonify({"error": "Extensão não permitida"}), 400
+    try:
+        size = int(data.get("size"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Tamanho inválido"}), 400
+    ext = filename.rsplit(".", 1)[1].lower()
+    try:
+        return jsonify(chunked_upload.start(get_current_user_from_header().id, filename, ext, size)), 201
+    except UploadError as e:
+        return upload_error(e)
+
+@bp.get("/upload/chunked/<upload_id>")
+@login_required
+def status_upload(upload_id):
+    try:
+        return jsonify(chunked_upload.status(get_current_user_from_header().id, upload_id))
+    except UploadError as e:
+        return upload_error(e)
+
+@bp.put("/upload/chunked/<upload_id>")
+@login_required
+def enviar_parte(upload_id):
+    offset = request.args.get("offset", type=int)
+    if offset is None:
+        return jsonify({"error": "offset é obrigatório"}), 400
+    try:
+        return jsonify(chunked_upload.append(get_current_user_from_header().id, upload_id, offset, request.stream))
+    except UploadError as e:
+        return upload_error(e)
+
+@bp.post("/upload/chunked/<upload_id>/finalize")
+@login_required
+def finalizar_upload(upload_id):
+    data = request.get_json(silent=True) or {}
+    try:
+        new_filename, digest = chunked_upload.finish(get_current_user_from_header().id, upload_id, data.get("sha256"))
+        db.session.commit()
+    except UploadError as e:
+        return upload_error(e)
+    images.schedule(new_filename)
+    return jsonify({
+        "success": True,
+        "filename": new_filename,
+        "sha256": digest
+    }), 201
+
+@bp.delete("/upload/chunked/<upload_id>")
+@login_required
+def cancelar_upload(upload_id):
+    try:
+        chunked_upload.abort(get_current_user_from_header().id, upload_id)
+    except UploadError as e:
+        return upload_error(e)
+    return "", 204
@@ -1,25 +1,16 @@
 # backend/api/routes/user.py
 from flask import Blueprint, request, jsonify
 from extensions import db
-from models import User, Follow, Produto, Purchase, Like, Post
-from utils.jwt_utils import decode_jwt
+from models import User, Follow, Purchase, Like, Post, Comment, TimelineEntry
+from utils.auth import get_current_user_from_header, invalidate_user
+from utils.counters import recount_post_counters
+from utils.serializers import serialize_follows
+from utils import timeline, http_cache, typeahead, dashboard, analytics, export
 from config import Config
-from sqlalchemy import func
-from datetime import datetime, timedelta
 import os
 
 bp = Blueprint("user", __name__)
 
-def get_current_user_from_header(req):
-    auth = req.headers.get("Authorization","")
-    token = auth.replace("Bearer ","")
-    if not token:
-        return None
-    payload = decode_jwt(token)
-    if not payload:
-        return None
-    return User.query.get(payload.get("user_id"))
-
 @bp.route("/user/profile", methods=["GET"])
 def get_profile():
     user = get_current_user_from_header(request)
@@ -55,7 +46,10 @@ def update_profile():
         
         user.username = new_username
     
+    http_cache.bump(http_cache.USERS)
     db.session.commit()
+    invalidate_user(user.id)
+    typeahead.put_user(user)
     return jsonify({"message":"updated","user": user.to_dict()})
 
 @bp.route("/user/change-username", methods=["PUT"])
@@ -82,7 +76,10 @@ def change_username():
         return jsonify({"error":"Username can only contain letters, numbers, underscores and hyphens"}), 400
     
     user.username = new_username
+    http_cache.bump(http_cache.USERS)
     db.session.commit()
+    invalidate_user(user.id)
+    typeahead.put_user(user)
     return jsonify({"message":"Username updated successfully","user": user.to_dict()})
 
 @bp.route("/user/delete-account", methods=["DELETE"])
@@ -105,8 +102,19 @@ def delete_account():
         # Delete user and all related data
         # The cascade relationships should handle most of this automatically
         
+        # Delete user's likes and comments on other posts, keeping counters in sync
+        touched_posts = {l.post_id for l in Like.query.filter_by(user_id=user.id).with_entities(Like.post_id)}
+        touched_posts |= {c.post_id for c in Comment.query.filter_by(user_id=user.id).with_entities(Comment.post_id)}
+        liked_authors = {p.autor_id for p in Post.query.filter(Post.id.in_(touched_posts)).with_entities(Post.autor_id)} if touched_posts else set()
+        analytics.release_bulk(Like, Like.user_id == user.id)
+        Like.query.filter_by(user_id=user.id).delete(synchronize_session=False)
+        Comment.query.filter_by(user_id=user.id).delete(synchronize_session=False)
+        recount_post_counters(touched_posts)
+
         # Delete user's posts (which will cascade to likes, comments, etc.)
         posts = Post.query.filter_by(autor_id=user.id).all()
+        timeline.remove_posts([p.id for p in posts])
+        TimelineEntry.query.filter_by(user_id=user.id).delete(synchronize_session=False)
         for post in posts:
             db.session.delete(post)
         
@@ -121,8 +129,16 @@ def delete_account():
             db.session.delete(follow)
         
         # Delete the user
+        user_id = user.id
         db.session.delete(user)
+        db.session.flush()
+        # o delete em massa de likes não passa pelos eventos dos agregados
+        dashboard.rebuild(liked_authors | {user_id})
+        # produtos do usuário invalidam PRODUTOS pelo evento do http_cache
+        http_cache.bump(http_cache.USERS, http_cache.POSTS, http_cache.PRODUTOS)
         db.session.commit()
+        invalidate_user(user_id)
+        typeahead.users.remove(user_id)
         
         return jsonify({"message":"Account deleted successfully"})
         
@@ -146,6 +162,7 @@ def follow_user(username):
 
     follow = Follow(follower_id=user.id, followed_id=target_user.id)
     db.session.add(follow)
+    timeline.backfill(user.id, target_user.id)
     db.session.commit()
     return jsonify({"message":"followed successfully"})
 
@@ -161,15 +178,18 @@ def unfollow_user(username):
         return jsonify({"error":"not following"}), 400
 
     db.session.delete(follow)
+    timeline.remove_author(user.id, target_user.id)
     db.session.commit()
     return jsonify({"message":"unfollowed successfully"})
 
 @bp.route("/user/<int:user_id>", methods=["GET"])
+@http_cache.conditional(http_cache.USERS)
 def get_user_profile(user_id):
     user = User.query.get_or_404(user_id)
     return jsonify({"user": user.to_dict()})
 
 @bp.route("/user/<username>", methods=["GET"])
+@http_cache.conditional(http_cache.USERS)
 def get_user_profile_by_username(username):
     user = User.query.filter_by(username=username).first_or_404()
     return jsonify({"user": user.to_dict()})
@@ -185,7 +205,7 @@ def get_following():
         target_user_id = user.id
 
     following = Follow.query.filter_by(follower_id=target_user_id).all()
-    following_users = [User.query.get(f.followed_id).to_dict() for f in following]
+    following_users = serialize_follows(following, side="followed")
     return jsonify({"following": following_users})
 
 @bp.route("/user/followers", methods=["GET"])
@@ -199,7 +219,7 @@ def get_followers():
         target_user_id = user.id
 
     followers = Follow.query.filter_by(followed_id=target_user_id).all()
-    follower_users = [User.query.get(f.follower_id).to_dict() for f in followers]
+    follower_users = serialize_follows(followers, side="follower")
     return jsonify({"followers": follower_users})
 
 @bp.route("/user/dashboard", methods=["GET"])
@@ -208,9 +228,10 @@ def get_dashboard():
     if not user:
         return jsonify({"error": "not authenticated"}), 401
 
-    # Determine user type
-    has_products = Post.query.filter_by(autor_id=user.id, tipo="product").count() > 0
-    has_purchases = Purchase.query.filter_by(comprador_id=user.id).count() > 0
+    # totais vêm dos agregados (utils/dashboard.py); listas recentes são um JOIN cada
+    stats = dashboard.stats_for(user.id)
+    has_products = stats["products_count"] > 0
+    has_purchases = stats["purchases_count"] > 0
 
     dashboard_data = {
         "user_type": "seller" if has_products else "buyer" if has_purchases else "general",
@@ -218,170 +239,142 @@ def get_dashboard():
     }
 
     if has_products:  # Seller dashboard
-        # Total sales
-        total_vendas = Purchase.query.join(Post, Purchase.produto_id == Post.id).filter(Post.autor_id == user.id, Post.tipo == "product").count()
-
-        # Total products
-        total_produtos = Post.query.filter_by(autor_id=user.id, tipo="product").count()
-
-        # Likes on posts this week
-        semana_passada = datetime.utcnow() - timedelta(days=7)
-        curtidas_semana = Like.query.join(Post, Like.post_id == Post.id).filter(Post.autor_id == user.id, Like.created_at >= semana_passada).count()
-
         # Top products by downloads
         produtos_mais_vistos = Post.query.filter_by(autor_id=user.id, tipo="product").order_by(Post.created_at.desc()).limit(5).all()
 
         # Sales by month (last 12 months)
-        last_year = datetime.utcnow() - timedelta(days=365)
-        vendas_por_mes = db.session.query(
-            func.extract('month', Purchase.created_at).label('mes'),
-            func.count(Purchase.id).label('vendas')
-        ).join(Post, Purchase.produto_id == Post.id).filter(Post.autor_id == user.id, Post.tipo == "product", Purchase.created_at >= last_year).group_by(func.extract('month', Purchase.created_at)).all()
-
-        vendas_por_mes_dict = {int(v.mes): v.vendas for v in vendas_por_mes}
-        vendas_por_mes_list = [{"mes": month, "vendas": vendas_por_mes_dict.get(month, 0)} for month in range(1, 13)]
+        por_mes = dashboard.monthly_sales(user.id)
 
         # Recent sales history
-        recent_sales = Purchase.query.join(Post, Purchase.produto_id == Post.id).filter(Post.autor_id == user.id, Post.tipo == "product").order_by(Purchase.created_at.desc()).limit(10).all()
-        sales_history = []
-        for sale in recent_sales:
-            produto = Post.query.get(sale.produto_id)
-            comprador = User.query.get(sale.comprador_id)
-            if produto and comprador:
-                sales_history.append({
-                    "produto_titulo": produto.titulo,
-                    "comprador_nome": comprador.nome,
-                    "comprador_username": comprador.username,
-                    "price_paid": sale.price_paid,
-                    "created_at": sale.created_at.isoformat()
-                })
-
-        # Total earned from sales
-        total_earned = db.session.query(func.sum(Purchase.price_paid)).join(Post, Purchase.produto_id == Post.id).filter(Post.autor_id == user.id, Post.tipo == "product").scalar() or 0.0
+        recent_sales = (
+            db.session.query(Purchase, Post.titulo, User.nome, User.username)
+            .join(Post, Purchase.produto_id == Post.id)
+            .join(User, Purchase.comprador_id == User.id)
+            .filter(Post.autor_id == user.id, Post.tipo == "product")
+            .order_by(Purchase.created_at.desc())
+            .limit(10)
+            .all()
+        )
+        sales_history = [{
+            "produto_titulo": titulo,
+            "comprador_nome": nome,
+            "comprador_username": username,
+            "price_paid": sale.price_paid,
+            "created_at": sale.created_at.isoformat()
+        } for sale, titulo, nome, username in recent_sales]
 
         dashboard_data.update({
-            "total_vendas": total_vendas,
-            "total_produtos": total_produtos,
-            "total_earned": total_earned,
-            "curtidas_semana": curtidas_semana,
+            "total_vendas": stats["sales_count"],
+            "total_produtos": stats["products_count"],
+            "total_earned": stats["earned"],
+            "curtidas_semana": dashboard.weekly_likes(user.id),
             "produtos_mais_vistos": [p.to_dict() for p in produtos_mais_vistos],
-            "vendas_por_mes": vendas_por_mes_list,
+            "vendas_por_mes": [{"ano": m["ano"], "mes": m["mes"], "vendas": m["vendas"]} for m in por_mes],
             "sales_history": sales_history
         })
 
     elif has_purchases:  # Buyer dashboard
-        # Total purchases
-        total_purchases = Purchase.query.filter_by(comprador_id=user.id).count()
-
-        # Total earned from sold products
-        total_earned = db.session.query(func.sum(Purchase.price_paid)).join(Post, Purchase.produto_id == Post.id).filter(Post.autor_id == user.id, Post.tipo == "product").scalar() or 0.0
-
-        # Likes received on user's posts/products
-        likes_received = Like.query.join(Post, Like.post_id == Post.id).filter(Post.autor_id == user.id).count()
-
         # Earnings by month (last 12 months)
-        last_year = datetime.utcnow() - timedelta(days=365)
-        earnings_por_mes = db.session.query(
-            func.extract('month', Purchase.created_at).label('mes'),
-            func.sum(Purchase.price_paid).label('ganho')
-        ).join(Produto, Purchase.produto_id == Produto.id).filter(Produto.autor_id == user.id, Purchase.created_at >= last_year).group_by(func.extract('month', Purchase.created_at)).all()
-
-        earnings_por_mes_dict = {int(e.mes): float(e.ganho) for e in earnings_por_mes}
-        earnings_por_mes_list = [{"mes": month, "ganho": earnings_por_mes_dict.get(month, 0.0)} for month in range(1, 13)]
-
-        # Recent purchases
-        recent_purchases = Purchase.query.filter_by(comprador_id=user.id).order_by(Purchase.created_at.desc()).limit(5).all()
-        recent_products = []
-        for p in recent_purchases:
-            produto = Produto.query.get(p.produto_id)
-            if produto:
-                recent_products.append({
-                    "titulo": produto.titulo,
-                    "price_paid": p.price_paid,
-                    "created_at": p.created_at.isoformat()
-                })
+        por_mes = dashboard.monthly_sales(user.id)
+
+        # Recent purchases (Purchase.produto_id aponta para o post do produto)
+        recent_purchases = (
+            db.session.query(Purchase, Post.titulo)
+            .join(Post, Purchase.produto_id == Post.id)
+            .filter(Purchase.comprador_id == user.id)
+            .order_by(Purchase.created_at.desc())
+            .limit(5)
+            .all()
+        )
+        recent_products = [{
+            "titulo": titulo,
+            "price_paid": p.price_paid,
+            "created_at": p.created_at.isoformat()
+        } for p, titulo in recent_purchases]
 
         # Liked products
-        liked_posts = Like.query.filter_by(user_id=user.id).join(Post, Like.post_id == Post.id).filter(Post.tipo == "product").all()
-        liked_products = []
-        for l in liked_posts:
-            post = Post.query.get(l.post_id)
-            if post:
-                liked_products.append({
-                    "titulo": post.titulo,
-                    "preco": post.preco,
-                    "created_at": l.created_at.isoformat()
-                })
+        liked_posts = (
+            db.session.query(Like, Post.titulo, Post.preco)
+            .join(Post, Like.post_id == Post.id)
+            .filter(Like.user_id == user.id, Post.tipo == "product")
+            .order_by(Like.created_at.desc())
+            .limit(5)
+            .all()
+        )
+        liked_products = [{
+            "titulo": titulo,
+            "preco": preco,
+            "created_at": l.created_at.isoformat()
+        } for l, titulo, preco in liked_posts]
 
         # Real purchase activities
-        purchase_activities = Purchase.query.filter_by(comprador_id=user.id).order_by(Purchase.created_at.desc()).limit(5).all()
-        like_activities = Like.query.filter_by(user_id=user.id).join(Post, Like.post_id == Post.id).filter(Post.tipo == "product").order_by(Like.created_at.desc()).limit(5).all()
-
-        activities = []
-        for p in purchase_activities:
-            produto = Produto.query.get(p.produto_id)
-            if produto:
-                activities.append({
-                    "type": "purchase",
-                    "titulo": produto.titulo,
-                    "price_paid": p.price_paid,
-                    "created_at": p.created_at.isoformat()
-                })
-
-        for l in like_activities:
-            post = Post.query.get(l.post_id)
-            if post:
-                activities.append({
-                    "type": "like",
-                    "titulo": post.titulo,
-                    "created_at": l.created_at.isoformat()
-                })
+        activities = [{"type": "purchase", **p} for p in recent_products]
+        activities += [{"type": "like", "titulo": l["titulo"], "created_at": l["created_at"]} for l in liked_products]
 
         # Sort activities by date and take top 5
         activities.sort(key=lambda x: x['created_at'], reverse=True)
         activities = activities[:5]
 
         dashboard_data.update({
-            "total_purchases": total_purchases,
-            "total_earned": total_earned,
-            "likes_received": likes_received,
-            "earnings_por_mes": earnings_por_mes_list,
+            "total_purchases": stats["purchases_count"],
+            "total_earned": stats["earned"],
+            "likes_received": stats["likes_received"],
+            "earnings_por_mes": [{"ano": m["ano"], "mes": m["mes"], "ganho": m["ganho"]} for m in por_mes],
             "recent_purchases": recent_products,
-            "liked_products": liked_products[:5],  # Top 5
+            "liked_products": liked_products,
             "purchase_activities": activities
         })
 
     else:  # General user dashboard
-        # Followers count
-        followers_count = Follow.query.filter_by(followed_id=user.id).count()
-
-        # Following count
-        following_count = Follow.query.filter_by(follower_id=user.id).count()
-
-        # Posts count
-        posts_count = Post.query.filter_by(autor_id=user.id).count()
-
         # Badges
         badges = [badge.to_dict() for badge in user.badges]
 
         # Recent activity (likes, comments, etc.)
-        recent_likes = Like.query.filter_by(user_id=user.id).order_by(Like.created_at.desc()).limit(3).all()
-        recent_activity = []
-        for l in recent_likes:
-            post = Post.query.get(l.post_id)
-            if post:
-                recent_activity.append({
-                    "type": "like",
-                    "post_title": post.titulo or post.conteudo[:50],
-                    "created_at": l.created_at.isoformat()
-                })
+        recent_likes = (
+            db.session.query(Like, Post.titulo, Post.conteudo)
+            .join(Post, Like.post_id == Post.id)
+            .filter(Like.user_id == user.id)
+            .order_by(Like.created_at.desc())
+            .limit(3)
+            .all()
+        )
+        recent_activity = [{
+            "type": "like",
+            "post_title": titulo or (conteudo or "")[:50],
+            "created_at": l.created_at.isoformat()
+        } for l, titulo, conteudo in recent_likes]
 
         dashboard_data.update({
-            "followers_count": followers_count,
-            "following_count": following_count,
-            "posts_count": posts_count,
+            "followers_count": stats["followers_count"],
+            "following_count": stats["following_count"],
+            "posts_count": stats["posts_count"],
             "badges": badges,
             "recent_activity": recent_activity
         })
 
     return jsonify(dashboard_data)
+
+@bp.route("/user/dashboard/export", methods=["GET"])
+def export_dashboard():
+    """
+    Vendas do usuário (?tipo=sales, padrão) ou compras (?tipo=purchases) em
+    streaming: ?format=ndjson|csv&from=&to=.
+    """
+    user = get_current_user_from_header(request)
+    if not user:
+        return jsonify({"error": "not authenticated"}), 401
+    tipo = request.args.get("tipo", "sales")
+    if tipo not in ("sales", "purchases"):
+        return jsonify({"error": "tipo deve ser sales ou purchases"}), 400
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in export.FORMATS:
+        return jsonify({"error": "format deve ser ndjson ou csv"}), 400
+    try:
+        where = export.date_range(Purchase.created_at, request.args)
+    except ValueError:
+        return jsonify({"error": "Datas devem estar no formato ISO (YYYY-MM-DD)"}), 400
+    if tipo == "sales":
+        where += [Post.autor_id == user.id, Post.tipo == "product"]
+    else:
+        where.append(Purchase.comprador_id == user.id)
+    return export.stream(export.purchases(*where), f"{user.username}-{tipo}", fmt)
@@ -0,0 +1,76 @@
+# conftest.py - app de teste com banco e uploads temporários
+# app.py cria a aplicação na importação, então o ambiente é ajustado antes:
+# banco SQLite novo, threads de fundo desligadas (os testes chamam as
+# rotinas diretamente) e hash de senha na própria thread.
+import os
+import sys
+import tempfile
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+_tmp = tempfile.mkdtemp(prefix="dropverse-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+for name in ("DOWNLOAD_FLUSH_INTERVAL", "CHAT_EXPIRY_INTERVAL", "COUNTERS_RECONCILE_INTERVAL",
+             "LEADERBOARD_SYNC_INTERVAL", "TYPEAHEAD_REFRESH_INTERVAL", "IMAGE_WORKERS",
+             "PASSWORD_HASH_WORKERS", "UPLOAD_CLEANUP_INTERVAL"):
+    os.environ[name] = "0"
+
+import config  # noqa: E402
+
+config.Config.UPLOAD_FOLDER = os.path.join(_tmp, "uploads")
+config.Config.UPLOAD_TMP_FOLDER = os.path.join(_tmp, "uploads_tmp")
+
+from app import app as flask_app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import User  # noqa: E402
+from utils.jwt_utils import create_token  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    return flask_app
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture()
+def make_user(app):
+    """make_user(**campos) -> (id, headers com o JWT do usuário)."""
+    def make(**fields):
+        with app.app_context():
+            name = fields.pop("username", None) or f"u{uuid.uuid4().hex[:10]}"
+            password = fields.pop("password", "senha")
+            user = User(nome=fields.pop("nome", name), username=name, email=f"{name}@test", **fields)
+            user.set_password(password)
+            db.session.add(user)
+            db.session.commit()
+            return user.id, {"Authorization": f"Bearer {create_token(user.id)}"}
+    return make
+
+
+@pytest.fixture()
+def sql_statements(app):
+    """with sql_statements() as statements: ... -> SQL executado no bloco."""
+    @contextmanager
+    def record():
+        with app.app_context():
+            engine = db.engine
+        statements = []
+
+        def before(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", before)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before)
+    return record
@@ -0,0 +1,58 @@
+# test_analytics.py - intervalos de analytics batem com as linhas de origem
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+
+from extensions import db
+from models import AnalyticsBucket, Like, Post, Purchase
+from utils import analytics
+
+# semana fora do alcance dos outros testes (que gravam em utcnow)
+BASE = datetime(2001, 3, 5, 9, 15)   # segunda-feira
+END = datetime(2001, 3, 12)
+
+
+def _buckets():
+    return {(r.period, r.start, r.metric): round(r.value, 6) for r in AnalyticsBucket.query.filter(
+        AnalyticsBucket.start >= BASE.replace(hour=0, minute=0), AnalyticsBucket.start < END)}
+
+
+def test_buckets_follow_writes_bulk_deletes_and_backfill(app, make_user):
+    autor_id, _ = make_user()
+    leitores = [make_user()[0] for _ in range(3)]
+    with app.app_context():
+        posts = [Post(tipo="product", titulo=f"P{i}", preco=5, autor_id=autor_id, created_at=BASE) for i in range(3)]
+        db.session.add_all(posts)
+        db.session.flush()
+        when = [BASE, BASE + timedelta(minutes=30), BASE + timedelta(hours=2), BASE + timedelta(days=3)]
+        for i, ts in enumerate(when):
+            db.session.add(Purchase(comprador_id=leitores[i % 3], produto_id=posts[i % 3].id,
+                                    price_paid=2.5 * (i + 1), created_at=ts))
+        likes = [Like(user_id=u, post_id=p.id, created_at=BASE + timedelta(hours=i))
+                 for i, (u, p) in enumerate((u, p) for u in leitores for p in posts)]
+        db.session.add_all(likes)
+        db.session.commit()
+
+        hourly, totals = analytics.series(BASE, BASE + timedelta(hours=2, minutes=30), "hour", ["purchases", "revenue", "likes"])
+        assert [h["purchases"] for h in hourly] == [2, 0, 1]
+        assert [h["revenue"] for h in hourly] == [7.5, 0, 7.5]
+        assert [h["likes"] for h in hourly] == [1, 1, 1]
+        daily, totals = analytics.series(BASE, END, "day", ["purchases", "revenue", "likes", "posts"])
+        assert totals == {"purchases": 4, "revenue": 25.0, "likes": 9, "posts": 3}
+        assert [d["purchases"] for d in daily] == [3, 0, 0, 1, 0, 0, 0]
+        weekly, _ = analytics.series(BASE, END, "week", ["likes"])
+        assert weekly == [{"start": "2001-03-05T00:00:00", "likes": 9}]
+
+        # delete em massa: release_bulk desconta antes, como no delete_account
+        gone = Like.user_id == leitores[0]
+        analytics.release_bulk(Like, gone)
+        db.session.execute(delete(Like).where(gone))
+        db.session.commit()
+        _, totals = analytics.series(BASE, END, "day", ["likes"])
+        assert totals == {"likes": 6}
+
+        incremental = _buckets()
+        analytics.backfill()
+        db.session.commit()
+        # zeros deixados pelos descontos não existem no backfill
+        assert {k: v for k, v in incremental.items() if v} == _buckets()
@@ -0,0 +1,28 @@
+# test_auth_cache.py - cache de usuários autenticados sem o hash da senha
+from extensions import db
+from models import User
+from utils import auth
+
+
+def test_cached_user_has_no_password_hash(app, client, make_user):
+    user_id, headers = make_user(password="certa")
+    assert client.get("/api/user/profile", headers=headers).status_code == 200
+    with app.app_context():
+        snapshot = auth._caches()[1].get(user_id)
+    assert snapshot is not None and "senha_hash" not in snapshot
+
+    # o usuário reconstruído do cache carrega o hash do banco ao conferir a senha
+    wrong = client.delete("/api/user/delete-account", json={"password": "errada"}, headers=headers)
+    assert wrong.status_code == 400
+    ok = client.delete("/api/user/delete-account", json={"password": "certa"}, headers=headers)
+    assert ok.status_code == 200
+    with app.app_context():
+        assert db.session.get(User, user_id) is None
+    assert client.get("/api/user/profile", headers=headers).status_code == 401
+
+
+def test_parental_consent_invalidates_cached_user(app, client, make_user):
+    user_id, headers = make_user()
+    assert client.get("/api/user/profile", headers=headers).json["user"]["is_verified"] is False
+    assert client.get(f"/api/auth/consent?user_id={user_id}").status_code == 200
+    assert client.get("/api/user/profile", headers=headers).json["user"]["is_verified"] is True
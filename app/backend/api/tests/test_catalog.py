@@ -0,0 +1,26 @@
+# test_catalog.py - tags normalizadas em product_tags, string original em Produto.tags
+import io
+
+from extensions import db
+from models import Produto
+from utils import catalog
+
+
+def test_tags_keep_original_string(app, client, make_user):
+    autor_id, _ = make_user()
+    data = {"arquivo": (io.BytesIO(b"beat"), "beat.mp3"), "titulo": "Beat", "preco": "1",
+            "autor_id": str(autor_id), "tags": "Trap, 808 ,trap"}
+    response = client.post("/api/produtos/upload", data=data, content_type="multipart/form-data")
+    produto_id = response.json["id"]
+
+    produto = client.get(f"/api/produtos/{produto_id}").json
+    assert produto["tags"] == "Trap, 808 ,trap"
+    ids = [p["id"] for p in client.get("/api/produtos/?tag=TRAP,808").json["produtos"]]
+    assert ids == [produto_id]
+
+    with app.app_context():
+        catalog.migrate_tags()
+        db.session.commit()
+        row = db.session.get(Produto, produto_id)
+        assert row.tags == "Trap, 808 ,trap"
+        assert sorted(t.tag for t in row.tag_rows) == ["808", "trap"]
@@ -0,0 +1,42 @@
+# test_chat_expiry.py - remoção em lotes dos chats temporários expirados
+from datetime import datetime, timedelta
+
+from extensions import db
+from models import Chat, Message
+from utils.chat_expiry import chat_expiry
+
+
+def _chat(a, b, is_temp, idle, messages=2):
+    chat = Chat(is_temp=is_temp, participant_a=a, participant_b=b,
+                last_activity=datetime.utcnow() - idle)
+    db.session.add(chat)
+    db.session.flush()
+    db.session.add_all(Message(chat_id=chat.id, remetente_id=a, conteudo=f"m{i}") for i in range(messages))
+    return chat
+
+
+def test_purge_removes_only_expired_temp_chats(app, make_user, monkeypatch):
+    a, _ = make_user()
+    b, _ = make_user()
+    monkeypatch.setattr(chat_expiry, "batch", 2)
+    old = timedelta(seconds=chat_expiry.ttl + 60)
+    with app.app_context():
+        expired = [_chat(a, b, True, old).id for _ in range(5)]
+        kept = [_chat(a, b, True, timedelta(seconds=10)).id,  # temporário ainda ativo
+                _chat(a, b, False, old).id]                     # antigo mas não temporário
+        db.session.commit()
+
+    total_chats, total_messages, runs = chat_expiry.total_chats, chat_expiry.total_messages, chat_expiry.runs
+    run = chat_expiry.purge()
+    assert (run["chats"], run["messages"], run["batches"]) == (5, 10, 3)
+    assert chat_expiry.total_chats == total_chats + 5
+    assert chat_expiry.total_messages == total_messages + 10
+    assert chat_expiry.runs == runs + 1
+
+    with app.app_context():
+        assert Chat.query.filter(Chat.id.in_(expired)).count() == 0
+        assert Message.query.filter(Message.chat_id.in_(expired)).count() == 0
+        assert Chat.query.filter(Chat.id.in_(kept)).count() == 2
+        assert Message.query.filter(Message.chat_id.in_(kept)).count() == 4
+
+    assert chat_expiry.purge()["chats"] == 0
@@ -0,0 +1,52 @@
+# test_chat_history.py - histórico do chat paginado por before/after
+from extensions import db
+from models import Chat, Message
+
+
+def _chat_with_messages(app, a, b, count):
+    with app.app_context():
+        chat = Chat(participant_a=a, participant_b=b)
+        db.session.add(chat)
+        db.session.flush()
+        msgs = [Message(chat_id=chat.id, remetente_id=a, conteudo=f"m{i}") for i in range(count)]
+        db.session.add_all(msgs)
+        db.session.commit()
+        return chat.id, [m.id for m in msgs]
+
+
+def _page(client, chat_id, **params):
+    response = client.get(f"/api/chat/{chat_id}", query_string=params)
+    assert response.status_code == 200
+    return [m["id"] for m in response.json["messages"]], response.json["next_cursor"]
+
+
+def test_before_pages_backwards_without_gaps(app, client, make_user):
+    a, _ = make_user()
+    b, _ = make_user()
+    chat_id, ids = _chat_with_messages(app, a, b, 7)
+
+    page, cursor = _page(client, chat_id, limit=3)
+    assert page == ids[:-4:-1] and cursor == ids[4]
+    page, cursor = _page(client, chat_id, limit=3, before=cursor)
+    assert page == [ids[3], ids[2], ids[1]] and cursor == ids[1]
+    page, cursor = _page(client, chat_id, limit=3, before=cursor)
+    # última página: só o que sobrou e sem cursor
+    assert page == [ids[0]] and cursor is None
+
+
+def test_after_pages_forward_and_ends_exactly(app, client, make_user):
+    a, _ = make_user()
+    b, _ = make_user()
+    chat_id, ids = _chat_with_messages(app, a, b, 6)
+
+    page, cursor = _page(client, chat_id, limit=3, after=0)
+    assert page == ids[:3] and cursor == ids[2]
+    page, cursor = _page(client, chat_id, limit=3, after=cursor)
+    # página exatamente no fim: não promete uma próxima vazia
+    assert page == ids[3:] and cursor is None
+    assert _page(client, chat_id, after=ids[-1]) == ([], None)
+
+    _, outros = _chat_with_messages(app, a, b, 1)
+    # cursor de outro chat ou inexistente
+    assert client.get(f"/api/chat/{chat_id}", query_string={"before": outros[0]}).status_code == 400
+    assert client.get(f"/api/chat/{chat_id}", query_string={"before": 1, "after": 2}).status_code == 400
@@ -0,0 +1,94 @@
+# test_chat_socket.py - salas do chat em tempo real sob carga (test_client do Flask-SocketIO)
+import time
+
+import pytest
+
+from extensions import socketio
+from models import Message
+from utils.jwt_utils import create_token
+
+pytestmark = pytest.mark.skipif(socketio is None, reason="Flask-SocketIO não instalado")
+
+CHATS = 25
+MESSAGES = 10   # por participante
+
+
+def _connect(app, user_id):
+    return socketio.test_client(app, auth={"token": create_token(user_id)})
+
+
+def _chat(client, a, b):
+    response = client.post("/api/chat/iniciar", json={"user1_id": a, "user2_id": b})
+    return response.json["chat_id"]
+
+
+def test_connect_requires_token_and_participant(app, client, make_user):
+    a, _ = make_user()
+    b, _ = make_user()
+    intruso, _ = make_user()
+    chat_id = _chat(client, a, b)
+
+    assert not socketio.test_client(app, auth={"token": "invalido"}).is_connected()
+    sock = _connect(app, intruso)
+    assert sock.is_connected()
+    assert sock.emit("entrar", {"chat_id": chat_id}, callback=True) == {"error": "Chat não encontrado"}
+    assert sock.emit("enviar", {"chat_id": chat_id, "conteudo": "oi"}, callback=True)["error"]
+    sock.disconnect()
+
+
+def test_broadcasts_under_load(app, client, make_user):
+    salas = []
+    for _ in range(CHATS):
+        a, _ = make_user()
+        b, _ = make_user()
+        chat_id = _chat(client, a, b)
+        socks = [_connect(app, a), _connect(app, b)]
+        for sock in socks:
+            assert sock.emit("entrar", {"chat_id": chat_id}, callback=True)["ok"]
+        salas.append((chat_id, socks))
+
+    inicio = time.monotonic()
+    acks = []
+    for i in range(MESSAGES):
+        for chat_id, socks in salas:
+            for n, sock in enumerate(socks):
+                ack = sock.emit("enviar", {"chat_id": chat_id, "conteudo": f"{n}:{i}", "client_id": f"{n}-{i}"},
+                                callback=True)
+                assert ack["ok"] and ack["client_id"] == f"{n}-{i}"
+                acks.append(ack["id"])
+    elapsed = time.monotonic() - inicio
+    total = CHATS * 2 * MESSAGES
+    assert len(set(acks)) == total
+
+    for chat_id, socks in salas:
+        for sock in socks:
+            recebidas = [e["args"][0] for e in sock.get_received() if e["name"] == "mensagem"]
+            # cada participante recebe as mensagens da sala (inclusive o próprio eco), em ordem, e só elas
+            assert len(recebidas) == 2 * MESSAGES
+            assert {m["chat_id"] for m in recebidas} == {chat_id}
+            ids = [m["id"] for m in recebidas]
+            assert ids == sorted(ids)
+            sock.disconnect()
+
+    with app.app_context():
+        assert Message.query.filter(Message.chat_id.in_([c for c, _ in salas])).count() == total
+    print(f"\n{total} mensagens, {2 * total} entregas em {elapsed:.2f}s ({total / elapsed:.0f} msg/s)")
+
+
+def test_resync_after_reconnect(app, client, make_user):
+    a, _ = make_user()
+    b, _ = make_user()
+    chat_id = _chat(client, a, b)
+    sock_a = _connect(app, a)
+    sock_a.emit("entrar", {"chat_id": chat_id}, callback=True)
+    primeira = sock_a.emit("enviar", {"chat_id": chat_id, "conteudo": "antes"}, callback=True)["id"]
+
+    # b estava desconectado: ao entrar com since_id recebe o que perdeu
+    for i in range(3):
+        sock_a.emit("enviar", {"chat_id": chat_id, "conteudo": f"perdida {i}"}, callback=True)
+    sock_b = _connect(app, b)
+    resposta = sock_b.emit("entrar", {"chat_id": chat_id, "since_id": primeira}, callback=True)
+    assert [m["conteudo"] for m in resposta["messages"]] == ["perdida 0", "perdida 1", "perdida 2"]
+    assert resposta["has_more"] is False
+    sock_a.disconnect()
+    sock_b.disconnect()
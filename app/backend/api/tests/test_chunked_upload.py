@@ -0,0 +1,70 @@
+# test_chunked_upload.py - upload em partes: login, dono da sessão e limites
+import fcntl
+import hashlib
+import os
+import time
+
+from utils import chunked_upload
+
+
+def _start(client, headers, size=10):
+    return client.post("/api/upload/chunked", json={"filename": "a.zip", "size": size}, headers=headers)
+
+
+def test_requires_login_and_owner(app, client, make_user):
+    _, dono = make_user()
+    _, outro = make_user()
+    assert _start(client, {}).status_code == 401
+
+    upload_id = _start(client, dono).json["upload_id"]
+    url = f"/api/upload/chunked/{upload_id}"
+    assert client.put(f"{url}?offset=0", data=b"0123456789").status_code == 401
+    assert client.put(f"{url}?offset=0", data=b"0123456789", headers=outro).status_code == 404
+    assert client.post(f"{url}/finalize", json={}, headers=outro).status_code == 404
+
+    assert client.put(f"{url}?offset=0", data=b"0123456789", headers=dono).json["offset"] == 10
+    response = client.post(f"{url}/finalize", json={}, headers=dono)
+    assert response.status_code == 201
+    assert response.json["sha256"] == hashlib.sha256(b"0123456789").hexdigest()
+
+
+def test_size_and_session_limits(app, client, make_user, monkeypatch):
+    _, headers = make_user()
+    monkeypatch.setitem(app.config, "UPLOAD_MAX_SESSIONS", 2)
+    assert _start(client, headers, size=app.config["UPLOAD_MAX_FILE_SIZE"] + 1).status_code == 413
+
+    ids = [_start(client, headers).json["upload_id"] for _ in range(2)]
+    assert _start(client, headers).status_code == 429
+    assert client.delete(f"/api/upload/chunked/{ids[0]}", headers=headers).status_code == 204
+    assert _start(client, headers).status_code == 201
+
+
+def test_unknown_ids_do_not_create_files(app, client, make_user):
+    _, headers = make_user()
+    before = sorted(os.listdir(app.config["UPLOAD_TMP_FOLDER"]))
+    for i in range(50):
+        response = client.put(f"/api/upload/chunked/{i:032x}?offset=0", data=b"x", headers=headers)
+        assert response.status_code == 404
+    assert sorted(os.listdir(app.config["UPLOAD_TMP_FOLDER"])) == before
+
+
+def test_cleanup_skips_locked_sessions(app, client, make_user, monkeypatch):
+    _, headers = make_user()
+    ids = [_start(client, headers).json["upload_id"] for _ in range(2)]
+    folder = app.config["UPLOAD_TMP_FOLDER"]
+    old = time.time() - app.config["UPLOAD_SESSION_TTL"] - 60
+    for upload_id in ids:
+        os.utime(os.path.join(folder, f"{upload_id}.json"), (old, old))
+
+    # outro worker no meio de um append segura o flock da primeira
+    with open(os.path.join(folder, f"{ids[0]}.json"), "rb") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        runs = chunked_upload.upload_cleanup.runs
+        assert chunked_upload.upload_cleanup.run() == 1
+        assert chunked_upload.upload_cleanup.runs == runs + 1
+    assert os.path.exists(os.path.join(folder, f"{ids[0]}.json"))
+    assert not os.path.exists(os.path.join(folder, f"{ids[1]}.part"))
+
+    with app.app_context():
+        assert chunked_upload.cleanup_abandoned() == 1
+    assert client.get(f"/api/upload/chunked/{ids[0]}", headers=headers).status_code == 404
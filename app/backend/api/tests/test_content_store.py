@@ -0,0 +1,81 @@
+# test_content_store.py - gc e migração de nomes dos uploads endereçados
+import io
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models import Produto, StoredFile
+from utils import content_store
+from utils.storage import storage
+
+
+def _upload(client, content):
+    response = client.post("/api/upload", data={"file": (io.BytesIO(content), "a.png")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 201
+    return response.json["filename"]
+
+
+def _age(app, name, hours):
+    with app.app_context():
+        stored = db.session.get(StoredFile, name)
+        stored.created_at = stored.last_adopted_at = datetime.utcnow() - timedelta(hours=hours)
+        db.session.commit()
+
+
+def test_dedupe_renews_gc_grace(app, client):
+    content = uuid.uuid4().bytes * 10
+    name = _upload(client, content)
+    _age(app, name, 2)
+    # mesmo conteúdo enviado de novo: ainda vai ganhar referência
+    assert _upload(client, content) == name
+    with app.app_context():
+        content_store.gc(3600)
+        assert db.session.get(StoredFile, name) is not None
+        assert storage.exists(name)
+
+    _age(app, name, 2)
+    with app.app_context():
+        assert content_store.gc(3600) >= 1
+        assert db.session.get(StoredFile, name) is None
+        assert not storage.exists(name)
+
+
+def _legacy_file(app, tmp_path, autor_id):
+    old_name = f"{uuid.uuid4()}.pdf"
+    local = tmp_path / old_name
+    local.write_bytes(uuid.uuid4().bytes * 100)
+    with app.app_context():
+        storage.put(str(local), old_name)
+        produto = Produto(titulo="P", preco=1, file_path=old_name, autor_id=autor_id)
+        db.session.add(produto)
+        db.session.commit()
+        return old_name, produto.id
+
+
+def test_migrate_names_keeps_old_files_until_commit(app, make_user, tmp_path, monkeypatch):
+    autor_id, _ = make_user()
+    old_name, produto_id = _legacy_file(app, tmp_path, autor_id)
+
+    def fail():
+        raise RuntimeError("falha no meio")
+
+    with app.app_context():
+        with monkeypatch.context() as m:
+            m.setattr(content_store, "recount_refs", fail)
+            with pytest.raises(RuntimeError):
+                content_store.migrate_names()
+        db.session.rollback()
+        assert db.session.get(Produto, produto_id).file_path == old_name
+        assert storage.exists(old_name)
+
+        migrated, _ = content_store.migrate_names()
+        assert migrated >= 1
+        new_name = db.session.get(Produto, produto_id).file_path
+        assert content_store.is_addressed(new_name)
+        assert storage.exists(new_name)
+        assert not storage.exists(old_name)
+        assert db.session.get(StoredFile, new_name).refcount == 1
@@ -0,0 +1,65 @@
+# test_counters.py - likes_count/comments_count nas escritas e na recontagem
+from sqlalchemy import update
+
+from extensions import db
+from models import Post
+from utils.counters import recount_post_counters
+
+
+def _post(client, headers):
+    response = client.post("/api/posts", json={"conteudo": "contado"}, headers=headers)
+    assert response.status_code == 201
+    return response.json["post"]["id"]
+
+
+def _counts(app, post_id):
+    with app.app_context():
+        post = db.session.get(Post, post_id)
+        return post.likes_count, post.comments_count
+
+
+def test_likes_and_comments_move_counters(app, client, make_user):
+    _, autor = make_user()
+    _, leitor = make_user(password="segredo")
+    post_id = _post(client, autor)
+
+    assert client.post(f"/api/posts/{post_id}/like", headers=leitor).json["likes"] == 1
+    assert client.post(f"/api/posts/{post_id}/like", headers=leitor).status_code == 400
+    client.post(f"/api/posts/{post_id}/like", headers=autor)
+    assert _counts(app, post_id) == (2, 0)
+
+    ids = [client.post(f"/api/posts/{post_id}/comments", json={"conteudo": f"c{i}"}, headers=leitor).json["comment"]["id"]
+           for i in range(3)]
+    assert _counts(app, post_id) == (2, 3)
+    assert client.delete(f"/api/posts/{post_id}/comments/{ids[0]}", headers=autor).status_code == 403
+    assert client.delete(f"/api/posts/{post_id}/comments/{ids[0]}", headers=leitor).status_code == 200
+    assert _counts(app, post_id) == (2, 2)
+
+    # apagar a conta tira o like e os comentários do leitor dos contadores
+    response = client.delete("/api/user/delete-account", json={"password": "segredo"}, headers=leitor)
+    assert response.status_code == 200
+    assert _counts(app, post_id) == (1, 0)
+
+
+def test_recount_fixes_drift(app, client, make_user):
+    _, autor = make_user()
+    post_id = _post(client, autor)
+    client.post(f"/api/posts/{post_id}/like", headers=autor)
+    client.post(f"/api/posts/{post_id}/comments", json={"conteudo": "oi"}, headers=autor)
+    with app.app_context():
+        db.session.execute(update(Post).where(Post.id == post_id).values(likes_count=40, comments_count=-3))
+        db.session.commit()
+    assert _counts(app, post_id) == (40, -3)
+
+    # o mesmo caminho do start (coluna nova) e de `flask repair-counters`
+    with app.app_context():
+        assert recount_post_counters([post_id]) == 1
+        db.session.commit()
+    assert _counts(app, post_id) == (1, 1)
+
+    with app.app_context():
+        db.session.execute(update(Post).where(Post.id == post_id).values(likes_count=7))
+        db.session.commit()
+    result = app.test_cli_runner().invoke(args=["repair-counters"])
+    assert result.exit_code == 0
+    assert _counts(app, post_id) == (1, 1)
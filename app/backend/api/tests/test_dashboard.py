@@ -0,0 +1,55 @@
+# test_dashboard.py - agregados do dashboard batem com as tabelas após escritas e deletes
+import uuid
+
+from extensions import db
+from models import Post
+from utils import dashboard
+
+
+def _product(app, autor_id, preco):
+    with app.app_context():
+        post = Post(tipo="product", titulo="Curso", preco=preco, autor_id=autor_id)
+        db.session.add(post)
+        db.session.commit()
+        return post.id
+
+
+def _post(client, headers):
+    return client.post("/api/posts", json={"conteudo": "oi"}, headers=headers).json["post"]["id"]
+
+
+def test_aggregates_match_sources_after_deletes(app, client, make_user):
+    with app.app_context():
+        # parte de agregados consistentes com o que outros testes deixaram
+        dashboard.rebuild()
+        db.session.commit()
+    nome = f"vendedor{uuid.uuid4().hex[:8]}"
+    vendedor_id, vendedor = make_user(username=nome)
+    _, comprador = make_user(password="segredo")
+    _, fa = make_user()
+
+    produtos = [_product(app, vendedor_id, preco) for preco in (10.0, 25.5)]
+    posts = [_post(client, vendedor) for _ in range(2)] + [_post(client, comprador)]
+    for post_id in produtos:
+        assert client.post(f"/api/produtos/purchase/{post_id}", headers=comprador).status_code == 200
+        client.post(f"/api/produtos/purchase/{post_id}", headers=fa)
+    for post_id in posts + produtos[:1]:
+        client.post(f"/api/posts/{post_id}/like", headers=comprador)
+        client.post(f"/api/posts/{post_id}/like", headers=fa)
+    for headers in (comprador, fa):
+        assert client.post(f"/api/user/follow/{nome}", headers=headers).status_code == 200
+    with app.app_context():
+        assert dashboard.check() == []
+        stats = dashboard.stats_for(vendedor_id)
+    assert (stats["sales_count"], stats["earned"], stats["followers_count"]) == (4, 71.0, 2)
+
+    # deletes: post com likes, produto vendido, unfollow e a conta do comprador
+    assert client.delete(f"/api/posts/{posts[0]}", headers=vendedor).status_code == 200
+    assert client.delete(f"/api/posts/{produtos[1]}", headers=vendedor).status_code == 200
+    assert client.post(f"/api/user/unfollow/{nome}", headers=fa).status_code == 200
+    response = client.delete("/api/user/delete-account", json={"password": "segredo"}, headers=comprador)
+    assert response.status_code == 200
+    with app.app_context():
+        assert dashboard.check() == []
+        stats = dashboard.stats_for(vendedor_id)
+    assert (stats["posts_count"], stats["followers_count"]) == (2, 0)
@@ -0,0 +1,75 @@
+# test_download_counter.py - contagem de downloads em lote e limite de perda
+import time
+
+from extensions import db
+from models import Produto
+from utils.download_counter import DownloadCounter
+
+
+def _produto(app, autor_id, file_path="mesmo-arquivo.pdf"):
+    with app.app_context():
+        produto = Produto(titulo="P", preco=1, file_path=file_path, autor_id=autor_id, downloads=0)
+        db.session.add(produto)
+        db.session.commit()
+        return produto.id
+
+
+def _downloads(app, produto_id):
+    with app.app_context():
+        return db.session.get(Produto, produto_id).downloads
+
+
+def _counter(app, monkeypatch, max_events, interval=0):
+    monkeypatch.setitem(app.config, "DOWNLOAD_FLUSH_EVENTS", max_events)
+    monkeypatch.setitem(app.config, "DOWNLOAD_FLUSH_INTERVAL", interval)
+    counter = DownloadCounter()
+    counter.init_app(app)
+    return counter
+
+
+def test_unflushed_counts_stay_below_batch(app, make_user, monkeypatch):
+    autor_id, _ = make_user()
+    produto_id = _produto(app, autor_id)
+    outro_id = _produto(app, autor_id)   # mesmo arquivo, outro produto
+    counter = _counter(app, monkeypatch, max_events=5)
+
+    for i in range(1, 13):
+        counter.incr(produto_id)
+        # o que uma queda perderia nunca chega a um lote inteiro
+        assert sum(counter.pending().values()) < 5
+        assert _downloads(app, produto_id) + sum(counter.pending().values()) == i
+
+    assert _downloads(app, produto_id) == 10
+    assert _downloads(app, outro_id) == 0
+
+
+def test_failed_flush_keeps_counts_and_does_not_raise(app, make_user, monkeypatch):
+    autor_id, _ = make_user()
+    produto_id = _produto(app, autor_id)
+    counter = _counter(app, monkeypatch, max_events=2)
+
+    def locked():
+        raise RuntimeError("database is locked")
+
+    with monkeypatch.context() as m:
+        m.setattr(db.session, "commit", locked)
+        counter.incr(produto_id)
+        counter.incr(produto_id)
+    assert counter.pending() == {("produto", produto_id): 2}
+    assert counter.flush() == 2
+    assert _downloads(app, produto_id) == 2
+
+
+def test_full_batch_is_flushed_by_the_thread(app, make_user, monkeypatch):
+    autor_id, _ = make_user()
+    produto_id = _produto(app, autor_id)
+    counter = _counter(app, monkeypatch, max_events=3, interval=60)
+    try:
+        for _ in range(3):
+            counter.incr(produto_id)
+        deadline = time.monotonic() + 5
+        while _downloads(app, produto_id) < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert _downloads(app, produto_id) == 3
+    finally:
+        counter.shutdown()
@@ -0,0 +1,76 @@
+# test_downloads.py - arquivos de produto só saem por link assinado
+import io
+from urllib.parse import urlsplit
+
+from extensions import db
+from models import Produto, Purchase
+
+
+def _upload_produto(client, autor_id):
+    data = {"arquivo": (io.BytesIO(b"%PDF conteudo pago " + str(autor_id).encode()), "livro.pdf"),
+            "titulo": "Livro", "descricao": "d", "preco": "9.9", "autor_id": str(autor_id)}
+    response = client.post("/api/produtos/upload", data=data, content_type="multipart/form-data")
+    assert response.status_code == 201
+    return response.json["id"]
+
+
+def test_download_link_requires_owner_or_buyer(app, client, make_user):
+    autor_id, autor = make_user()
+    comprador_id, comprador = make_user()
+    _, estranho = make_user()
+    produto_id = _upload_produto(client, autor_id)
+    with app.app_context():
+        db.session.add(Purchase(comprador_id=comprador_id, produto_id=produto_id, price_paid=9.9))
+        db.session.commit()
+
+    url = f"/api/produtos/{produto_id}/download-link"
+    assert client.get(url).status_code == 401
+    assert client.get(url, headers=estranho).status_code == 403
+    assert client.get(url, headers=autor).status_code == 200
+    link = client.get(url, headers=comprador).json["url"]
+    parts = urlsplit(link)
+    assert client.get(f"{parts.path}?{parts.query}").status_code == 200
+
+
+def test_product_file_is_not_public(app, client, make_user):
+    autor_id, _ = make_user()
+    produto_id = _upload_produto(client, autor_id)
+    with app.app_context():
+        file_path = db.session.get(Produto, produto_id).file_path
+
+    assert "file_path" not in client.get(f"/api/produtos/{produto_id}").json
+    assert client.get(f"/uploads/{file_path}").status_code == 404
+    assert client.get(f"/api/produtos/download/{file_path}").status_code == 403
+
+
+def test_post_purchase_link_credits_the_post(app, client, make_user):
+    from models import Post
+    from utils.download_counter import download_counter
+
+    autor_id, _ = make_user()
+    comprador_id, comprador = make_user()
+    produto_id = _upload_produto(client, autor_id)
+    with app.app_context():
+        file_path = db.session.get(Produto, produto_id).file_path
+        post = Post(tipo="product", titulo="Livro", preco=5, file_path=file_path, autor_id=autor_id)
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+
+    download_counter.flush()
+    response = client.post(f"/api/produtos/purchase/{post_id}", headers=comprador)
+    link = urlsplit(response.json["download"]["url"])
+    assert f"post={post_id}" in link.query and "produto=" not in link.query
+    # trocar o tipo do id invalida a assinatura
+    forged = link.query.replace(f"post={post_id}", f"produto={post_id}")
+    assert client.get(f"{link.path}?{forged}").status_code == 403
+
+    assert client.get(f"{link.path}?{link.query}").status_code == 200
+    assert download_counter.pending() == {("post", post_id): 1}
+    download_counter.flush()
+    with app.app_context():
+        assert db.session.get(Post, post_id).downloads == 1
+        assert db.session.get(Produto, produto_id).downloads == 0
+
+    again = client.get(f"/api/produtos/purchase/{post_id}/download-link", headers=comprador).json["url"]
+    assert f"post={post_id}" in urlsplit(again).query
@@ -0,0 +1,58 @@
+# test_export.py - exportações em streaming de /api/admin/export
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from extensions import db
+from models import Post, Purchase
+
+
+def _add_purchases(app, post_id, buyer_id, count):
+    base = datetime(2025, 1, 1)
+    with app.app_context():
+        db.session.execute(insert(Purchase), [
+            {"comprador_id": buyer_id, "produto_id": post_id, "price_paid": 1.5,
+             "created_at": base + timedelta(seconds=i)}
+            for i in range(count)
+        ])
+        db.session.commit()
+
+
+def _peak_while_streaming(client, headers):
+    """(bytes recebidos, pico de memória alocada) ao consumir a exportação inteira."""
+    tracemalloc.start()
+    try:
+        response = client.get("/api/admin/export/purchases?format=csv", headers=headers, buffered=False)
+        assert response.status_code == 200
+        received = sum(len(chunk) for chunk in response.response)
+        response.close()
+        return received, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_export_requires_admin(client, make_user):
+    _, headers = make_user()
+    assert client.get("/api/admin/export/users").status_code == 401
+    assert client.get("/api/admin/export/users", headers=headers).status_code == 403
+
+
+def test_export_memory_stays_flat(app, client, make_user):
+    seller_id, _ = make_user()
+    buyer_id, _ = make_user()
+    _, admin = make_user(is_admin=True)
+    with app.app_context():
+        post = Post(autor_id=seller_id, tipo="product", titulo="P", descricao="d", preco=1.5)
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+
+    _add_purchases(app, post_id, buyer_id, 5_000)
+    small_bytes, small_peak = _peak_while_streaming(client, admin)
+    _add_purchases(app, post_id, buyer_id, 45_000)
+    large_bytes, large_peak = _peak_while_streaming(client, admin)
+
+    # 10x mais linhas na resposta, mas o pico de memória não acompanha
+    assert large_bytes > 9 * small_bytes
+    assert large_peak < small_peak * 1.5
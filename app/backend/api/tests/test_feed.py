@@ -0,0 +1,24 @@
+# test_feed.py - o feed não faz uma consulta por post (N+1)
+from extensions import db
+from models import Post
+
+
+def _feed_statements(app, client, make_user, sql_statements, authors):
+    for _ in range(authors):
+        autor_id, _ = make_user()
+        with app.app_context():
+            db.session.add(Post(tipo="social", conteudo="oi", autor_id=autor_id))
+            db.session.commit()
+    with sql_statements() as statements:
+        # os posts recém-criados são a primeira página inteira
+        response = client.get(f"/api/posts?limit={authors}")
+    assert response.status_code == 200
+    assert len(response.json["posts"]) == authors
+    assert all(p["author"] for p in response.json["posts"])
+    return len(statements)
+
+
+def test_feed_statement_count_is_constant(app, client, make_user, sql_statements):
+    small = _feed_statements(app, client, make_user, sql_statements, 2)
+    large = _feed_statements(app, client, make_user, sql_statements, 20)
+    assert large == small
@@ -0,0 +1,36 @@
+# test_http_cache.py - ETags invalidados por toda escrita que muda a resposta
+from extensions import db
+from models import Produto
+from utils.download_counter import DownloadCounter
+
+
+def _etag(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return response.headers["ETag"]
+
+
+def test_download_flush_and_product_changes_bump_produtos(app, client, make_user, monkeypatch):
+    autor_id, _ = make_user()
+    with app.app_context():
+        produto = Produto(titulo="P", preco=1, file_path="x.pdf", autor_id=autor_id, downloads=0)
+        db.session.add(produto)
+        db.session.commit()
+        produto_id = produto.id
+    url = "/api/produtos/?sort=downloads"
+
+    etag = _etag(client, url)
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    monkeypatch.setitem(app.config, "DOWNLOAD_FLUSH_INTERVAL", 0)
+    counter = DownloadCounter()
+    counter.init_app(app)
+    counter.incr(produto_id)
+    assert counter.flush() == 1
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+    etag = _etag(client, url)
+    with app.app_context():
+        db.session.delete(db.session.get(Produto, produto_id))
+        db.session.commit()
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,96 @@
+# test_images.py - variantes reduzidas: após o upload, ?w=, lock e backfill
+import io
+import os
+import random
+import threading
+import time
+
+from PIL import Image
+
+from utils import images
+
+
+def _png(width=900, height=300):
+    # cor aleatória: o nome é o hash do conteúdo, cada teste tem a sua imagem
+    color = tuple(random.randrange(256) for _ in range(3))
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _upload(client, data):
+    response = client.post("/api/upload", data={"file": (io.BytesIO(data), "foto.png")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 201
+    return response.json["filename"]
+
+
+def _variant(app, filename, width, fmt="png"):
+    return os.path.join(app.config["UPLOAD_FOLDER"], images.variant_name(filename, width, fmt))
+
+
+def test_variants_generated_after_upload(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, "IMAGE_WORKERS", 1)
+    monkeypatch.setattr(images, "_pool", None)
+    filename = _upload(client, _png())
+    images._pool.shutdown(wait=True)
+    # geradas com antecedência no formato que o pool escolhe (WebP se houver)
+    fmt = images._format(filename, accept_webp=True)
+    for width in images.VARIANTS.values():
+        with Image.open(_variant(app, filename, width, fmt)) as im:
+            assert im.width == min(width, 900)
+
+
+def test_nearest_variant_for_w(app, client):
+    assert images.nearest_width("100") == 160
+    assert images.nearest_width("160") == 160
+    assert images.nearest_width("161") == 640
+    assert images.nearest_width("5000") == 1280
+    assert images.nearest_width("card") == 640
+
+    filename = _upload(client, _png())
+    assert not os.path.exists(_variant(app, filename, 640))
+    response = client.get(f"/uploads/{filename}?w=300")
+    assert response.status_code == 200
+    assert response.headers["Vary"] == "Accept"
+    with Image.open(io.BytesIO(response.data)) as im:
+        assert im.size == (640, 213)
+    assert os.path.exists(_variant(app, filename, 640))
+    assert client.get(f"/uploads/{filename}?w=-1").status_code == 400
+
+
+def test_concurrent_requests_render_once(app, client, monkeypatch):
+    filename = _upload(client, _png())
+    calls = []
+    render = images._render
+
+    def slow_render(*args):
+        calls.append(args)
+        time.sleep(0.2)
+        render(*args)
+
+    monkeypatch.setattr(images, "_render", slow_render)
+    results = []
+
+    def get():
+        with app.app_context():
+            results.append(images.ensure_variant(app.config["UPLOAD_FOLDER"], filename, 160, "png"))
+
+    threads = [threading.Thread(target=get) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == [images.variant_name(filename, 160, "png")] * 5
+    assert images.variant_name(filename, 160, "png") not in images._locks
+
+
+def test_backfill_command(app, client):
+    filename = _upload(client, _png(200, 100))
+    result = app.test_cli_runner().invoke(args=["backfill-image-variants"])
+    assert result.exit_code == 0
+    assert "imagens processadas, 0 falhas" in result.output
+    fmt = images._format(filename, accept_webp=True)
+    for width in images.VARIANTS.values():
+        assert os.path.exists(_variant(app, filename, width, fmt))
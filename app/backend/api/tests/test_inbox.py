@@ -0,0 +1,78 @@
+# test_inbox.py - caixa de entrada: ordem, não lidas, páginas e backfill
+from extensions import db
+from models import Chat, Message
+from utils import inbox
+
+
+def _chat(client, a, b):
+    return client.post("/api/chat/iniciar", json={"user1_id": a, "user2_id": b}).json["chat_id"]
+
+
+def _send(client, chat_id, remetente_id, texto):
+    response = client.post("/api/chat/mensagem",
+                           json={"chat_id": chat_id, "remetente_id": remetente_id, "conteudo": texto})
+    assert response.status_code == 200
+
+
+def _inbox(client, headers, **params):
+    response = client.get("/api/chat/inbox", query_string=params, headers=headers)
+    assert response.status_code == 200
+    return response.json
+
+
+def test_inbox_order_unread_and_pages(app, client, make_user):
+    eu, headers = make_user()
+    b, _ = make_user()
+    c, _ = make_user()
+    d, _ = make_user()
+    com_b = _chat(client, eu, b)
+    com_c = _chat(client, c, eu)   # aqui eu sou o participante b
+    com_d = _chat(client, eu, d)
+    _send(client, com_b, b, "b1")
+    _send(client, com_c, c, "c1")
+    _send(client, com_c, c, "c2")
+    _send(client, com_d, eu, "minha")
+    _send(client, com_b, b, "b2")
+
+    chats = _inbox(client, headers)["chats"]
+    assert [item["chat_id"] for item in chats] == [com_b, com_d, com_c]
+    assert [item["last_message"]["conteudo"] for item in chats] == ["b2", "minha", "c2"]
+    # a própria mensagem não conta como não lida
+    assert [item["unread"] for item in chats] == [2, 0, 2]
+    assert chats[0]["other"]["id"] == b
+
+    # ler o histórico zera as não lidas só desse chat
+    client.get(f"/api/chat/{com_c}", headers=headers)
+    assert [item["unread"] for item in _inbox(client, headers)["chats"]] == [2, 0, 0]
+
+    first = _inbox(client, headers, limit=2)
+    assert [item["chat_id"] for item in first["chats"]] == [com_b, com_d]
+    second = _inbox(client, headers, limit=2, cursor=first["next_cursor"])
+    assert [item["chat_id"] for item in second["chats"]] == [com_c]
+    assert second["next_cursor"] is None
+    assert client.get("/api/chat/inbox", query_string={"cursor": "x"}, headers=headers).status_code == 400
+
+
+def test_backfill_fills_last_message(app, make_user):
+    a, _ = make_user()
+    b, _ = make_user()
+    with app.app_context():
+        # banco anterior à caixa de entrada: mensagens gravadas sem on_message
+        chat = Chat(participant_a=a, participant_b=b)
+        db.session.add(chat)
+        db.session.flush()
+        msgs = [Message(chat_id=chat.id, remetente_id=b, conteudo=f"m{i}") for i in range(3)]
+        db.session.add_all(msgs)
+        db.session.commit()
+        assert chat.last_message_id is None
+
+        inbox.backfill()
+        db.session.commit()
+        db.session.refresh(chat)
+        assert chat.last_message_id == msgs[-1].id
+        assert (chat.last_read_a, chat.unread_a, chat.unread_b) == (msgs[-1].id, 0, 0)
+
+        items, _ = inbox.inbox_page(a)
+        item = next(i for i in items if i["chat_id"] == chat.id)
+        assert item["last_message"]["conteudo"] == "m2"
+        assert item["unread"] == 0
@@ -0,0 +1,71 @@
+# test_leaderboard.py - ETag do ranking e usuários apagados por outro processo
+from sqlalchemy import delete
+
+from extensions import db
+from models import User, UserWeeklyPoints
+from utils.leaderboard import leaderboard
+
+
+def test_ranking_etag_follows_points(app, client, make_user):
+    user_id, _ = make_user(points=5)
+    etag = client.get("/api/gamification/ranking").headers["ETag"]
+    assert client.get("/api/gamification/ranking", headers={"If-None-Match": etag}).status_code == 304
+
+    with app.app_context():
+        db.session.get(User, user_id).points = 10_000
+        db.session.commit()
+    response = client.get("/api/gamification/ranking", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json[0]["user_id"] == user_id
+
+
+def test_sync_drops_users_deleted_elsewhere(app, client, make_user):
+    user_id, _ = make_user(points=7)
+    assert leaderboard.all.rank(user_id)
+    assert leaderboard.board(None).rank(user_id)
+    with app.app_context():
+        # apagado por outro processo: nenhum evento chega a este ranking
+        db.session.execute(delete(UserWeeklyPoints).where(UserWeeklyPoints.user_id == user_id))
+        db.session.execute(delete(User).where(User.id == user_id))
+        db.session.commit()
+    assert leaderboard.all.rank(user_id)
+
+    leaderboard.sync()
+    assert leaderboard.all.rank(user_id) is None
+    assert leaderboard.weekly.rank(user_id) is None
+    assert client.get(f"/api/gamification/rank/{user_id}").status_code == 404
+
+
+
+def test_sync_drops_deleted_user_even_if_count_unchanged(app, make_user):
+    gone_id, _ = make_user(points=3)
+    make_user(points=2)
+    with app.app_context():
+        # outro processo apaga um e cria outro: a contagem de users não muda
+        db.session.execute(delete(UserWeeklyPoints).where(UserWeeklyPoints.user_id == gone_id))
+        db.session.execute(delete(User).where(User.id == gone_id))
+        db.session.commit()
+    new_id, _ = make_user(points=4)
+    assert new_id != gone_id
+
+    leaderboard.sync()
+    assert leaderboard.all.rank(gone_id) is None
+    assert leaderboard.all.rank(new_id)
+
+
+def test_ranking_etag_follows_the_board(app, client, make_user):
+    user_id, _ = make_user(points=11)
+    etag = client.get("/api/gamification/ranking").headers["ETag"]
+    week = client.get("/api/gamification/ranking?period=week").headers["ETag"]
+    assert week != etag
+    leaderboard.sync()
+    # nada mudou: a sincronização não troca o ETag
+    assert client.get("/api/gamification/ranking", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/gamification/ranking?period=week", headers={"If-None-Match": week}).status_code == 304
+
+    # mudança que só este processo viu (sem bump em USERS)
+    leaderboard.all.put(user_id, 123_456)
+    response = client.get("/api/gamification/ranking", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json[0]["user_id"] == user_id
+    leaderboard.all.put(user_id, 11)
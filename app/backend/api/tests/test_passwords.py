@@ -0,0 +1,55 @@
+# test_passwords.py - regravação de hash e limite de espera do pool
+import time
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from utils import passwords
+from utils.passwords import HashingBusy, needs_rehash
+
+
+def test_rehash_only_toward_stronger_method(app, monkeypatch):
+    scrypt = generate_password_hash("x", method="scrypt:32768:8:1")
+    pbkdf2 = generate_password_hash("x", method="pbkdf2:sha256:600000")
+    with app.app_context():
+        monkeypatch.setitem(app.config, "PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+        assert not needs_rehash(scrypt)
+        assert needs_rehash(pbkdf2)
+        monkeypatch.setitem(app.config, "PASSWORD_HASH_METHOD", "pbkdf2:sha256:600000")
+        assert not needs_rehash(scrypt)
+        assert not needs_rehash(pbkdf2)
+        monkeypatch.setitem(app.config, "PASSWORD_HASH_METHOD", "scrypt:65536:8:1")
+        assert needs_rehash(scrypt)
+
+
+def test_stuck_worker_times_out(app, monkeypatch):
+    with app.app_context():
+        monkeypatch.setitem(app.config, "PASSWORD_HASH_WORKERS", 1)
+        monkeypatch.setitem(app.config, "PASSWORD_HASH_TIMEOUT", 0.001)
+        monkeypatch.setitem(app.config, "PASSWORD_HASH_METHOD", "scrypt:262144:8:1")
+        monkeypatch.setattr(passwords, "_pool", None)
+        with pytest.raises(HashingBusy):
+            passwords.hash_password("senha")
+        passwords._pool.shutdown(wait=False, cancel_futures=True)
+        monkeypatch.setattr(passwords, "_pool", None)
+
+
+def test_slot_is_held_until_the_hash_finishes(app, monkeypatch):
+    with app.app_context():
+        monkeypatch.setitem(app.config, "PASSWORD_HASH_WORKERS", 1)
+        monkeypatch.setitem(app.config, "PASSWORD_HASH_MAX_PENDING", 1)
+        monkeypatch.setitem(app.config, "PASSWORD_HASH_TIMEOUT", 0.05)
+        monkeypatch.setitem(app.config, "PASSWORD_HASH_QUEUE_TIMEOUT", 0.01)
+        monkeypatch.setattr(passwords, "_pool", None)
+        try:
+            with pytest.raises(HashingBusy):
+                passwords._run(time.sleep, 1)
+            # o primeiro estourou o tempo mas segue rodando: a fila continua cheia
+            monkeypatch.setitem(app.config, "PASSWORD_HASH_TIMEOUT", 30)
+            with pytest.raises(HashingBusy):
+                passwords._run(pow, 2, 3)
+            monkeypatch.setitem(app.config, "PASSWORD_HASH_QUEUE_TIMEOUT", 30)
+            assert passwords._run(pow, 2, 3) == 8
+        finally:
+            passwords._pool.shutdown(wait=False, cancel_futures=True)
+            monkeypatch.setattr(passwords, "_pool", None)
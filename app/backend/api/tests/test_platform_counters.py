@@ -0,0 +1,38 @@
+# test_platform_counters.py - totais de /admin/stats: eventos e conferência com COUNT(*)
+from sqlalchemy import delete, func, select, update
+
+from extensions import db
+from models import PlatformCounter, Post, Produto, User
+from utils.platform_counters import platform_counters
+
+
+def _actual(app):
+    with app.app_context():
+        return {name: db.session.execute(select(func.count()).select_from(model)).scalar()
+                for name, model in (("usuarios", User), ("produtos", Produto), ("posts", Post))}
+
+
+def test_reconcile_corrects_drift(app, client, make_user):
+    platform_counters.reconcile()
+    assert client.get("/api/admin/stats").json == _actual(app)
+
+    # escritas pelo ORM movem os contadores sozinhas
+    _, autor = make_user()
+    post_id = client.post("/api/posts", json={"conteudo": "x"}, headers=autor).json["post"]["id"]
+    assert client.get("/api/admin/stats").json == _actual(app)
+
+    with app.app_context():
+        # delete em massa (sem eventos), valor corrompido e linha perdida
+        db.session.execute(delete(Post).where(Post.id == post_id))
+        db.session.execute(update(PlatformCounter).where(PlatformCounter.name == "usuarios")
+                           .values(value=PlatformCounter.value + 5))
+        db.session.execute(delete(PlatformCounter).where(PlatformCounter.name == "produtos"))
+        db.session.commit()
+    assert client.get("/api/admin/stats").json != _actual(app)
+
+    corrections = platform_counters.corrections
+    run = platform_counters.reconcile()
+    assert run["drift"] == {"usuarios": -5, "posts": -1}
+    assert platform_counters.corrections == corrections + 2
+    assert client.get("/api/admin/stats").json == _actual(app)
+    assert platform_counters.reconcile()["drift"] == {}
@@ -0,0 +1,28 @@
+# test_search.py - busca textual de usuários só pelo username
+from extensions import db
+from utils import search_index
+
+
+def _usernames(client, q):
+    return [u["username"] for u in client.get("/api/search", query_string={"q": q}).json["usuarios"]]
+
+
+def test_users_found_by_username_not_by_name(app, client, make_user):
+    make_user(username="zorrobusca", nome="Fulana Secretissima")
+    assert _usernames(client, "zorrobusca") == ["zorrobusca"]
+    assert _usernames(client, "Secretissima") == []
+
+
+def test_index_with_names_is_rebuilt(app, make_user):
+    user_id, _ = make_user()
+    if not search_index.is_enabled():
+        return
+    with app.app_context():
+        # documento no formato antigo, com o nome no corpo
+        db.session.execute(db.text("UPDATE search_index SET body = 'Nome Antigo' WHERE rowid = :r"),
+                           {"r": user_id * 4 + search_index.USER})
+        db.session.commit()
+        assert search_index.ensure_index()
+        search_index.rebuild()
+        db.session.commit()
+        assert not search_index.ensure_index()
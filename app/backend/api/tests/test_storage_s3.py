@@ -0,0 +1,72 @@
+# test_storage_s3.py - backend S3 contra o S3 simulado do moto
+import io
+
+import pytest
+
+moto = pytest.importorskip("moto")
+boto3 = pytest.importorskip("boto3")
+
+from utils.storage import LocalStorage, S3Storage, storage  # noqa: E402
+
+BUCKET = "test-bucket"
+
+
+@pytest.fixture()
+def s3(tmp_path, monkeypatch):
+    for name, value in (("AWS_ACCESS_KEY_ID", "test"), ("AWS_SECRET_ACCESS_KEY", "test"),
+                        ("AWS_DEFAULT_REGION", "us-east-1")):
+        monkeypatch.setenv(name, value)
+    # como no create_app, UPLOAD_FOLDER já existe
+    (tmp_path / "local").mkdir()
+    with moto.mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        yield S3Storage(BUCKET, prefix="uploads/", region="us-east-1",
+                        fallback=LocalStorage(str(tmp_path / "local")))
+
+
+def _file(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_put_read_move_delete(s3, tmp_path):
+    s3.put(_file(tmp_path, "a", b"conteudo"), "abc.pdf")
+    assert s3.exists("abc.pdf")
+    assert s3.stat("abc.pdf")[0] == len(b"conteudo")
+    assert s3.open("abc.pdf").read() == b"conteudo"
+    assert s3.location("abc.pdf") == f"s3://{BUCKET}/uploads/abc.pdf"
+    assert list(s3.names()) == ["abc.pdf"]
+
+    s3.move("abc.pdf", "def.pdf")
+    assert not s3.exists("abc.pdf") and s3.open("def.pdf").read() == b"conteudo"
+    s3.delete("def.pdf")
+    assert not s3.exists("def.pdf")
+    assert not s3.exists("../fora.pdf")
+
+
+def test_migrate_from_local_fallback(s3, tmp_path):
+    s3.fallback.put(_file(tmp_path, "a", b"antigo"), "velho.zip")
+    assert s3.exists("velho.zip") and s3.location("velho.zip").endswith("velho.zip")
+    assert s3.open("velho.zip").read() == b"antigo"
+
+    assert s3.migrate() == (1, 0)
+    assert not s3.fallback.exists("velho.zip")
+    assert s3.location("velho.zip") == f"s3://{BUCKET}/uploads/velho.zip"
+    assert s3.migrate() == (0, 0)
+
+
+def test_upload_route_and_presigned_redirect(app, client, s3, monkeypatch):
+    monkeypatch.setattr(storage, "backend", s3)
+    response = client.post("/api/upload", data={"file": (io.BytesIO(b"PK zip falso"), "pacote.zip")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 201
+    name = response.json["filename"]
+    assert s3.location(name).startswith(f"s3://{BUCKET}/")
+
+    response = client.get(f"/uploads/{name}")
+    assert response.status_code == 302
+    location = response.headers["Location"]
+    assert f"/{BUCKET}/uploads/{name}" in location or f"{BUCKET}.s3" in location
+    assert "Signature" in location or "X-Amz-Signature" in location
+    assert client.get("/uploads/nao-existe.zip").status_code == 404
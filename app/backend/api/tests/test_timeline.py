@@ -0,0 +1,72 @@
+# test_timeline.py - timeline materializada: corte no fan-out e rebuild
+from extensions import db
+from models import Follow, Post, TimelineEntry
+from utils import timeline
+
+
+def _post(client, headers, texto):
+    response = client.post("/api/posts", json={"conteudo": texto}, headers=headers)
+    assert response.status_code == 201
+    return response.json
+
+
+def _entries(app, user_id):
+    with app.app_context():
+        return TimelineEntry.query.filter_by(user_id=user_id).count()
+
+
+def test_fan_out_trims_and_read_does_not_write(app, client, make_user, monkeypatch, sql_statements):
+    monkeypatch.setitem(app.config, "TIMELINE_MAX_ENTRIES", 3)
+    autor_id, autor = make_user()
+    leitor_id, leitor = make_user()
+    with app.app_context():
+        db.session.add(Follow(follower_id=leitor_id, followed_id=autor_id))
+        db.session.commit()
+
+    for i in range(5):
+        _post(client, autor, f"post {i}")
+    assert _entries(app, leitor_id) == 3
+    assert _entries(app, autor_id) == 3
+
+    with sql_statements() as statements:
+        response = client.get("/api/posts/timeline", headers=leitor)
+    assert response.status_code == 200
+    assert [p["content"] for p in response.json["posts"]] == ["post 4", "post 3", "post 2"]
+    assert not {"INSERT", "UPDATE", "DELETE"} & {s.split()[0].upper() for s in statements}
+
+
+def test_rebuild_from_existing_follows(app, make_user):
+    autor_id, _ = make_user()
+    leitor_id, _ = make_user()
+    with app.app_context():
+        post = Post(tipo="social", conteudo="antigo", autor_id=autor_id)
+        db.session.add_all([post, Follow(follower_id=leitor_id, followed_id=autor_id)])
+        db.session.commit()
+        assert not TimelineEntry.query.filter_by(user_id=leitor_id).count()
+
+        timeline.rebuild()
+        db.session.commit()
+        posts, _ = timeline.timeline_page(leitor_id)
+        assert [p.id for p in posts] == [post.id]
+        assert [p.id for p in timeline.timeline_page(autor_id)[0]] == [post.id]
+
+
+def test_big_author_is_merged_at_read_time(app, client, make_user, monkeypatch, sql_statements):
+    monkeypatch.setitem(app.config, "TIMELINE_FANOUT_LIMIT", 1)
+    autor_id, autor = make_user()
+    leitor_id, leitor = make_user()
+    outro_id, _ = make_user()
+    with app.app_context():
+        db.session.add_all([Follow(follower_id=leitor_id, followed_id=autor_id),
+                            Follow(follower_id=outro_id, followed_id=autor_id)])
+        db.session.commit()
+        assert timeline.follower_count(autor_id) == 2
+
+    _post(client, autor, "de muitos")
+    assert _entries(app, leitor_id) == 0
+
+    with sql_statements() as statements:
+        response = client.get("/api/posts/timeline", headers=leitor)
+    assert [p["content"] for p in response.json["posts"]] == ["de muitos"]
+    # os seguidores vêm de user_stats, sem contar follows na leitura
+    assert not any("GROUP BY" in s.upper() for s in statements)
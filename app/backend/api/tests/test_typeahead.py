@@ -0,0 +1,53 @@
+# test_typeahead.py - sugestões acompanham downloads e produtos apagados
+from sqlalchemy import update
+
+from extensions import db
+from models import Produto
+from utils import typeahead
+from utils.download_counter import DownloadCounter
+
+
+def _sugestoes(client, q):
+    return {p["id"]: p["downloads"] for p in client.get("/api/search/suggest", query_string={"q": q}).json["produtos"]}
+
+
+def test_downloads_and_deletes_reach_the_index(app, client, make_user, monkeypatch):
+    autor_id, _ = make_user()
+    with app.app_context():
+        produto = Produto(titulo="Zebralivro", preco=1, file_path="z.pdf", autor_id=autor_id, downloads=0)
+        db.session.add(produto)
+        db.session.commit()
+        produto_id = produto.id
+    assert _sugestoes(client, "zebral") == {produto_id: 0}
+
+    monkeypatch.setitem(app.config, "DOWNLOAD_FLUSH_INTERVAL", 0)
+    counter = DownloadCounter()
+    counter.init_app(app)
+    counter.incr(produto_id, 3)
+    counter.flush()
+    assert _sugestoes(client, "zebral") == {produto_id: 3}
+
+    with app.app_context():
+        db.session.delete(db.session.get(Produto, produto_id))
+        db.session.commit()
+    assert _sugestoes(client, "zebral") == {}
+
+
+def test_refresh_picks_up_other_processes(app, client, make_user):
+    autor_id, _ = make_user()
+    with app.app_context():
+        produto = Produto(titulo="Quokkalivro", preco=1, file_path="q.pdf", autor_id=autor_id, downloads=0)
+        db.session.add(produto)
+        db.session.commit()
+        produto_id = produto.id
+        # escritas fora do ORM (como as de outro processo) só chegam na releitura
+        db.session.execute(update(Produto).where(Produto.id == produto_id).values(downloads=7))
+        db.session.commit()
+        assert _sugestoes(client, "quokka") == {produto_id: 0}
+        typeahead.build()
+        assert _sugestoes(client, "quokka") == {produto_id: 7}
+
+        db.session.execute(db.delete(Produto).where(Produto.id == produto_id))
+        db.session.commit()
+        typeahead.build()
+    assert _sugestoes(client, "quokka") == {}
@@ -0,0 +1,169 @@
+# analytics.py - métricas da plataforma em intervalos de hora e de dia
+# Compras, receita, likes, posts e cadastros são somados em analytics_buckets
+# (uma linha por período+início+métrica) pelos eventos de mapper, na mesma
+# transação da escrita. /api/admin/analytics só lê os intervalos pedidos pela
+# chave primária: o custo depende do número de intervalos, não do tamanho das
+# tabelas. Semanas e meses são somas dos dias. Deletes em massa chamam
+# release_bulk(); backfill() refaz tudo a partir das tabelas.
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, select, update, insert, delete, and_
+from extensions import db
+from models import Purchase, Like, Post, User, AnalyticsBucket
+
+# métrica -> (modelo, coluna somada; None conta as linhas)
+METRICS = {
+    "purchases": (Purchase, None),
+    "revenue": (Purchase, Purchase.price_paid),
+    "likes": (Like, None),
+    "posts": (Post, None),
+    "registrations": (User, None),
+}
+GRANULARITIES = ("hour", "day", "week", "month")
+
+
+class TooManyBuckets(ValueError):
+    pass
+
+
+def _floor(ts, period):
+    if period == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _key(ts, granularity):
+    """Início do intervalo de `granularity` que contém ts."""
+    if granularity == "week":
+        day = _floor(ts, "day")
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return _floor(ts, "day").replace(day=1)
+    return _floor(ts, granularity)
+
+
+def _next(ts, granularity):
+    if granularity == "hour":
+        return ts + timedelta(hours=1)
+    if granularity == "day":
+        return ts + timedelta(days=1)
+    if granularity == "week":
+        return ts + timedelta(weeks=1)
+    return ts.replace(year=ts.year + 1, month=1) if ts.month == 12 else ts.replace(month=ts.month + 1)
+
+
+# ---- atualização incremental ----
+
+def _bump(connection, period, start, metric, delta):
+    where = and_(AnalyticsBucket.period == period, AnalyticsBucket.start == start,
+                 AnalyticsBucket.metric == metric)
+    result = connection.execute(
+        update(AnalyticsBucket).where(where).values(value=AnalyticsBucket.value + delta)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(AnalyticsBucket).values(period=period, start=start, metric=metric, value=delta))
+
+
+def _record(connection, metric, ts, delta):
+    for period in ("hour", "day"):
+        _bump(connection, period, _floor(ts, period), metric, delta)
+
+
+def _changed(connection, target, sign):
+    ts = target.created_at or datetime.utcnow()
+    for metric, (model, column) in METRICS.items():
+        if isinstance(target, model):
+            value = 1 if column is None else (getattr(target, column.key) or 0.0)
+            _record(connection, metric, ts, value * sign)
+
+
+def _after_insert(mapper, connection, target):
+    _changed(connection, target, 1)
+
+
+def _after_delete(mapper, connection, target):
+    _changed(connection, target, -1)
+
+
+for _model in {model for model, _ in METRICS.values()}:
+    event.listen(_model, "after_insert", _after_insert)
+    event.listen(_model, "after_delete", _after_delete)
+
+
+def _hourly(model, column, condition=None):
+    """[(hora, valor)] das linhas de model agrupadas por hora de created_at."""
+    parts = [func.extract(p, model.created_at) for p in ("year", "month", "day", "hour")]
+    value = func.count() if column is None else func.coalesce(func.sum(column), 0.0)
+    query = select(*parts, value).where(model.created_at.isnot(None)).group_by(*parts)
+    if condition is not None:
+        query = query.where(condition)
+    return [(datetime(int(y), int(m), int(d), int(h)), v) for y, m, d, h, v in db.session.execute(query)]
+
+
+def release_bulk(model, condition):
+    """
+    Desconta das métricas as linhas de model que casam com condition, antes
+    de um delete em massa (que não dispara os eventos de mapper).
+    """
+    connection = db.session.connection()
+    for metric, (source, column) in METRICS.items():
+        if source is model:
+            for hour, value in _hourly(model, column, condition):
+                _record(connection, metric, hour, -value)
+
+
+# ---- leitura ----
+
+def series(start, end, granularity="day", metrics=None, max_buckets=None):
+    """
+    Intervalos de `granularity` cobrindo [start, end): lista de
+    {"start", <métrica>: valor, ...} em ordem, incluindo os vazios, e os
+    totais. TooManyBuckets se passar de max_buckets intervalos.
+    """
+    metrics = list(metrics or METRICS)
+    period = "hour" if granularity == "hour" else "day"
+    keys = []
+    cursor = _key(start, granularity)
+    while cursor < end:
+        if max_buckets and len(keys) >= max_buckets:
+            raise TooManyBuckets(max_buckets)
+        keys.append(cursor)
+        cursor = _next(cursor, granularity)
+
+    buckets = {k: dict.fromkeys(metrics, 0) for k in keys}
+    rows = AnalyticsBucket.query.filter(
+        AnalyticsBucket.period == period,
+        AnalyticsBucket.start >= _floor(start, period),
+        AnalyticsBucket.start < end,
+        AnalyticsBucket.metric.in_(metrics),
+    ).all()
+    for row in rows:
+        bucket = buckets.get(_key(row.start, granularity))
+        if bucket is not None:
+            bucket[row.metric] += row.value
+
+    totals = dict.fromkeys(metrics, 0)
+    result = []
+    for k in keys:
+        values = {m: (round(v, 2) if METRICS[m][1] is not None else int(v)) for m, v in buckets[k].items()}
+        for m, v in values.items():
+            totals[m] += v
+        result.append({"start": k.isoformat(), **values})
+    return result, {m: round(v, 2) for m, v in totals.items()}
+
+
+# ---- reconstrução ----
+
+def backfill():
+    """Recalcula todos os intervalos a partir das tabelas. Retorna o número de linhas."""
+    db.session.execute(delete(AnalyticsBucket))
+    rows = []
+    for metric, (model, column) in METRICS.items():
+        days = {}
+        for hour, value in _hourly(model, column):
+            rows.append({"period": "hour", "start": hour, "metric": metric, "value": value})
+            day = _floor(hour, "day")
+            days[day] = days.get(day, 0) + value
+        rows += [{"period": "day", "start": d, "metric": metric, "value": v} for d, v in days.items()]
+    if rows:
+        db.session.execute(insert(AnalyticsBucket), rows)
+    return len(rows)
@@ -0,0 +1,173 @@
+# auth.py - usuário autenticado da requisição (JWT) com cache de tokens/usuários
+# Cada requisição resolve o usuário uma vez (flask.g). Entre requisições, o
+# token decodificado e a linha do usuário ficam num cache LRU com TTL, então
+# a maioria das chamadas não decodifica o JWT nem vai ao banco.
+# O cache é por processo: invalidate_user() vale para o processo atual e os
+# demais enxergam a mudança em até AUTH_CACHE_TTL segundos. Esse TTL é o
+# limite entre workers: uma conta apagada, bloqueada ou alterada em outro
+# processo ainda pode ser vista com os dados antigos por até esse tempo.
+# O hash da senha não entra no cache; check_password o carrega do banco.
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, jsonify, request
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from extensions import db
+from models import User
+from utils.jwt_utils import decode_jwt
+
+
+class TTLCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+_tokens = None
+_users = None
+
+
+def _caches():
+    global _tokens, _users
+    if _tokens is None:
+        size = current_app.config["AUTH_CACHE_SIZE"]
+        ttl = current_app.config["AUTH_CACHE_TTL"]
+        _tokens = TTLCache(size, ttl)
+        _users = TTLCache(size, ttl)
+    return _tokens, _users
+
+
+def _token_from(req):
+    auth = req.headers.get("Authorization", "")
+    return auth.replace("Bearer ", "").strip()
+
+
+def _user_id_for(token):
+    tokens, _ = _caches()
+    cached = tokens.get(token)
+    if cached is not None:
+        return cached
+    payload = decode_jwt(token)
+    if not payload or payload.get("user_id") is None:
+        return None
+    user_id = payload["user_id"]
+    exp = payload.get("exp")
+    tokens.set(token, user_id, ttl=(exp - time.time()) if exp else None)
+    return user_id
+
+
+_NOT_CACHED = {"senha_hash"}
+
+
+def _snapshot(user):
+    return {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs
+            if attr.key not in _NOT_CACHED}
+
+
+def _load_user(user_id):
+    _, users = _caches()
+    snapshot = users.get(user_id)
+    if snapshot is None:
+        user = db.session.get(User, user_id)
+        if user:
+            users.set(user_id, _snapshot(user))
+        return user
+    # reconstrói a instância a partir do snapshot e a anexa à sessão sem SELECT
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def get_current_user_from_header(req=None):
+    req = req or request
+    if "principal" in g:
+        return g.principal
+    user = None
+    token = _token_from(req)
+    if token:
+        user_id = _user_id_for(token)
+        if user_id is not None:
+            user = _load_user(user_id)
+    g.principal = user
+    return user
+
+
+def user_from_token(token):
+    """Usuário de um JWT recebido fora do header (ex.: conexão Socket.IO)."""
+    user_id = _user_id_for(token) if token else None
+    return _load_user(user_id) if user_id is not None else None
+
+
+def invalidate_user(user_id):
+    """Chamar após alterar ou remover o usuário (perfil, username, conta)."""
+    _, users = _caches()
+    users.pop(user_id)
+    g.pop("principal", None)
+
+
+def login_required(view):
+    """Rota só para usuários autenticados (401 sem login)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not get_current_user_from_header(request):
+            return jsonify({"error": "not authenticated"}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def admin_required(view):
+    """Rota só para usuários com is_admin (401 sem login, 403 sem permissão)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user = get_current_user_from_header(request)
+        if not user:
+            return jsonify({"error": "not authenticated"}), 401
+        if not user.is_admin:
+            return jsonify({"error": "not authorized"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def cache_stats():
+    tokens, users = _caches()
+    return {"tokens": tokens.stats(), "users": users.stats()}
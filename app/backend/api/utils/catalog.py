@@ -0,0 +1,64 @@
+# catalog.py - filtros, ordenação e tags normalizadas do catálogo de produtos
+from sqlalchemy import func
+from extensions import db
+from models import Produto, ProductTag
+
+# sort -> (coluna, decrescente)
+SORTS = {
+    "newest": (Produto.created_at, True),
+    "price": (Produto.preco, False),
+    "price_desc": (Produto.preco, True),
+    "downloads": (Produto.downloads, True),
+}
+
+MAX_TAG_LEN = 60
+
+
+def split_tags(raw):
+    """'Trap, 808 ,trap' -> ['trap', '808']"""
+    tags = []
+    for tag in (raw or "").split(","):
+        tag = tag.strip().lower()[:MAX_TAG_LEN]
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def set_tags(produto, raw):
+    # Produto.tags guarda o que foi digitado; a busca por tag usa product_tags
+    produto.tags = raw or None
+    produto.tag_rows = [ProductTag(tag=t) for t in split_tags(raw)]
+
+
+def filtered_query(categoria=None, tags=None, preco_min=None, preco_max=None):
+    query = Produto.query
+    if categoria:
+        query = query.filter(Produto.categoria == categoria)
+    if preco_min is not None:
+        query = query.filter(Produto.preco >= preco_min)
+    if preco_max is not None:
+        query = query.filter(Produto.preco <= preco_max)
+    if tags:
+        # produto precisa ter todas as tags pedidas
+        matching = (
+            db.session.query(ProductTag.produto_id)
+            .filter(ProductTag.tag.in_(tags))
+            .group_by(ProductTag.produto_id)
+            .having(func.count(ProductTag.tag) == len(tags))
+        )
+        query = query.filter(Produto.id.in_(matching))
+    return query
+
+
+def migrate_tags():
+    """
+    Preenche product_tags a partir das strings Produto.tags e zera downloads
+    nulos (a ordenação por downloads pagina por chave). Retorna o número de
+    produtos migrados.
+    """
+    Produto.query.filter(Produto.downloads.is_(None)).update({Produto.downloads: 0}, synchronize_session=False)
+    migrated = 0
+    for produto in Produto.query.filter(Produto.tags.isnot(None)).all():
+        set_tags(produto, produto.tags)
+        migrated += 1
+    return migrated
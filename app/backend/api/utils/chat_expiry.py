@@ -0,0 +1,106 @@
+# chat_expiry.py - remoção periódica dos chats temporários expirados
+# Uma thread por processo roda a cada CHAT_EXPIRY_INTERVAL segundos e apaga
+# chats temporários sem atividade há mais de CHAT_TEMP_TTL segundos, com as
+# mensagens, em lotes de CHAT_EXPIRY_BATCH chats: cada lote lê uma vez os
+# ids dos chats (índice is_temp, last_activity) e usa a mesma lista no
+# desconto dos arquivos e nos DELETE ... WHERE chat_id IN (:ids) de
+# mensagens e chats, numa transação curta. Rodar em mais de um processo ao
+# mesmo tempo é seguro (o segundo só não acha nada).
+import atexit
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+from extensions import db
+from models import Chat, Message
+from utils import content_store
+
+
+class ChatExpiry:
+    def __init__(self):
+        self.app = None
+        self.ttl = 48 * 3600
+        self.batch = 500
+        self.interval = 600.0
+        self.runs = 0
+        self.total_chats = 0
+        self.total_messages = 0
+        self.last_run = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        self.ttl = app.config["CHAT_TEMP_TTL"]
+        self.batch = app.config["CHAT_EXPIRY_BATCH"]
+        self.interval = app.config["CHAT_EXPIRY_INTERVAL"]
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="chat-expiry", daemon=True)
+            self._thread.start()
+            atexit.register(self._stop.set)
+
+    def _expired(self, limite):
+        return (
+            select(Chat.id)
+            .where(Chat.is_temp == True, Chat.last_activity < limite)
+            .order_by(Chat.last_activity, Chat.id)
+            .limit(self.batch)
+        )
+
+    def purge(self):
+        """Apaga os chats expirados em lotes. Retorna as métricas da execução."""
+        with self._lock:
+            inicio = time.monotonic()
+            limite = datetime.utcnow() - timedelta(seconds=self.ttl)
+            chats = messages = batches = 0
+            with self.app.app_context():
+                while True:
+                    ids = list(db.session.execute(self._expired(limite)).scalars())
+                    if not ids:
+                        db.session.rollback()
+                        break
+                    # delete em massa não dispara os eventos de mapper
+                    content_store.release_bulk(Message.imagem, Message.chat_id.in_(ids))
+                    messages += db.session.execute(
+                        delete(Message).where(Message.chat_id.in_(ids))
+                    ).rowcount
+                    removed = db.session.execute(
+                        delete(Chat).where(Chat.id.in_(ids))
+                    ).rowcount
+                    db.session.commit()
+                    chats += removed
+                    batches += 1
+                    if len(ids) < self.batch:
+                        break
+            self.runs += 1
+            self.total_chats += chats
+            self.total_messages += messages
+            self.last_run = {
+                "at": datetime.utcnow().isoformat(),
+                "chats": chats,
+                "messages": messages,
+                "batches": batches,
+                "seconds": round(time.monotonic() - inicio, 3),
+            }
+            return self.last_run
+
+    def stats(self):
+        return {
+            "ttl": self.ttl,
+            "interval": self.interval,
+            "runs": self.runs,
+            "total_chats": self.total_chats,
+            "total_messages": self.total_messages,
+            "last_run": self.last_run,
+        }
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.purge()
+            except Exception as e:
+                print(f"Aviso: falha ao expirar chats temporários: {e}")
+
+
+chat_expiry = ChatExpiry()
@@ -0,0 +1,265 @@
+# chunked_upload.py - upload em partes (init / PUT com offset / finalize)
+# Cada sessão é um par <id>.part (bytes recebidos) + <id>.json (metadados) em
+# UPLOAD_TMP_FOLDER, então ela sobrevive a reconexões e reinícios: o cliente
+# pergunta o offset atual e continua dali. O SHA-256 é calculado conforme os
+# bytes chegam; se o processo não tiver o estado (outro worker, reinício), ele
+# é refeito lendo o .part uma vez. A sessão pertence a quem a criou (user_id
+# no .json) e cada usuário tem no máximo UPLOAD_MAX_SESSIONS abertas.
+# append/finish/abort seguram um flock no .json da sessão, que vale entre
+# threads e entre workers. Sessões sem atividade há UPLOAD_SESSION_TTL
+# segundos são removidas por uma thread a cada UPLOAD_CLEANUP_INTERVAL
+# segundos (e no início de cada upload); a que estiver travada é pulada.
+import atexit
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from flask import current_app
+from utils import content_store
+
+BLOCK_SIZE = 64 * 1024
+
+_hashers = {}   # upload_id -> (sha256, bytes já hasheados)
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.extra = extra
+
+
+def _folder():
+    folder = current_app.config["UPLOAD_TMP_FOLDER"]
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _paths(upload_id):
+    if not upload_id or not all(c in "0123456789abcdef" for c in upload_id):
+        raise UploadError("Upload não encontrado", 404)
+    base = os.path.join(_folder(), upload_id)
+    return base + ".part", base + ".json"
+
+
+@contextmanager
+def _lock(upload_id, wait=True):
+    """
+    flock exclusivo no .json da sessão. Sem wait, levanta BlockingIOError se
+    outro já segura. Quem pega o lock depois de um _discard não acha mais o
+    .json e recebe 404 em _read_meta.
+    """
+    _, meta_path = _paths(upload_id)
+    try:
+        f = open(meta_path, "rb")
+    except FileNotFoundError:
+        raise UploadError("Upload não encontrado", 404)
+    with f:
+        fcntl.flock(f, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        yield
+
+
+def _read_meta(upload_id, user_id=None):
+    part, meta_path = _paths(upload_id)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        raise UploadError("Upload não encontrado", 404)
+    if user_id is not None and meta.get("user_id") != user_id:
+        # sessão de outro usuário: nem confirma que existe
+        raise UploadError("Upload não encontrado", 404)
+    meta["offset"] = os.path.getsize(part) if os.path.exists(part) else 0
+    return meta
+
+
+def _open_sessions(user_id):
+    count = 0
+    for name in os.listdir(_folder()):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(_folder(), name)) as f:
+                count += json.load(f).get("user_id") == user_id
+        except (OSError, ValueError):
+            continue
+    return count
+
+
+def _touch(upload_id):
+    _, meta_path = _paths(upload_id)
+    os.utime(meta_path)
+
+
+def _hasher(upload_id, part, offset):
+    state = _hashers.get(upload_id)
+    if state and state[1] == offset:
+        return state[0]
+    sha = hashlib.sha256()
+    with open(part, "rb") as f:
+        remaining = offset
+        while remaining:
+            block = f.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            sha.update(block)
+            remaining -= len(block)
+    return sha
+
+
+def start(user_id, filename, ext, size):
+    if size is None or size < 0:
+        raise UploadError("Tamanho inválido")
+    if size > current_app.config["UPLOAD_MAX_FILE_SIZE"]:
+        raise UploadError("Arquivo muito grande", 413)
+    cleanup_abandoned()
+    if _open_sessions(user_id) >= current_app.config["UPLOAD_MAX_SESSIONS"]:
+        raise UploadError("Muitos uploads em andamento", 429)
+    upload_id = uuid.uuid4().hex
+    part, meta_path = _paths(upload_id)
+    open(part, "wb").close()
+    with open(meta_path, "w") as f:
+        json.dump({"user_id": user_id, "filename": filename, "ext": ext, "size": size, "created": time.time()}, f)
+    _hashers[upload_id] = (hashlib.sha256(), 0)
+    return {"upload_id": upload_id, "offset": 0, "size": size,
+            "chunk_size": current_app.config["UPLOAD_CHUNK_SIZE"]}
+
+
+def status(user_id, upload_id):
+    meta = _read_meta(upload_id, user_id)
+    return {"upload_id": upload_id, "offset": meta["offset"], "size": meta["size"]}
+
+
+def append(user_id, upload_id, offset, stream):
+    """
+    Grava o corpo da requisição a partir de `offset`. O offset tem que ser
+    exatamente o tamanho já recebido; senão devolve 409 com o offset certo.
+    """
+    part, _ = _paths(upload_id)
+    with _lock(upload_id):
+        meta = _read_meta(upload_id, user_id)
+        if offset != meta["offset"]:
+            raise UploadError("Offset incorreto", 409, offset=meta["offset"])
+        sha = _hasher(upload_id, part, offset)
+        written = 0
+        try:
+            with open(part, "ab") as f:
+                while True:
+                    block = stream.read(BLOCK_SIZE)
+                    if not block:
+                        break
+                    if offset + written + len(block) > meta["size"]:
+                        f.truncate(offset)
+                        written = 0
+                        sha = None
+                        raise UploadError("Parte excede o tamanho declarado", 413)
+                    f.write(block)
+                    sha.update(block)
+                    written += len(block)
+        finally:
+            # conexão caída no meio da parte: o que foi gravado vale como progresso
+            if sha is None:
+                _hashers.pop(upload_id, None)
+            else:
+                _hashers[upload_id] = (sha, offset + written)
+            _touch(upload_id)
+        return {"upload_id": upload_id, "offset": offset + written, "size": meta["size"]}
+
+
+def finish(user_id, upload_id, expected_sha256=None):
+    """
+    Move o arquivo completo para o storage (nome pelo hash, ver
+    content_store) e devolve (filename, sha256). O registro em stored_files
+    fica na sessão; o chamador faz o commit.
+    """
+    part, _ = _paths(upload_id)
+    with _lock(upload_id):
+        meta = _read_meta(upload_id, user_id)
+        if meta["offset"] != meta["size"]:
+            raise UploadError("Upload incompleto", 409, offset=meta["offset"])
+        digest = _hasher(upload_id, part, meta["offset"]).hexdigest()
+        if expected_sha256 and expected_sha256.lower() != digest:
+            raise UploadError("SHA-256 não confere", 422, sha256=digest)
+        new_filename = content_store.adopt(part, meta["ext"], digest)
+        _discard(upload_id)
+    return new_filename, digest
+
+
+def abort(user_id, upload_id):
+    """Cancela a sessão (libera a vaga do usuário em UPLOAD_MAX_SESSIONS)."""
+    with _lock(upload_id):
+        _read_meta(upload_id, user_id)
+        _discard(upload_id)
+
+
+def _discard(upload_id):
+    part, meta_path = _paths(upload_id)
+    for path in (part, meta_path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    _hashers.pop(upload_id, None)
+
+
+def cleanup_abandoned(max_age=None):
+    """Remove sessões sem atividade há mais de UPLOAD_SESSION_TTL segundos."""
+    max_age = current_app.config["UPLOAD_SESSION_TTL"] if max_age is None else max_age
+    limite = time.time() - max_age
+    removed = 0
+    for name in os.listdir(_folder()):
+        if not name.endswith(".json"):
+            continue
+        upload_id = name[:-5]
+        meta_path = os.path.join(_folder(), name)
+        try:
+            if os.path.getmtime(meta_path) >= limite:
+                continue
+            # sessão recebendo uma parte agora: fica para a próxima vez
+            with _lock(upload_id, wait=False):
+                if os.path.getmtime(meta_path) < limite:
+                    _discard(upload_id)
+                    removed += 1
+        except (OSError, UploadError):
+            continue
+    return removed
+
+
+class UploadCleanup:
+    def __init__(self):
+        self.app = None
+        self.interval = 3600.0
+        self.runs = 0
+        self.removed = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config["UPLOAD_CLEANUP_INTERVAL"]
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="upload-cleanup", daemon=True)
+            self._thread.start()
+            atexit.register(self._stop.set)
+
+    def run(self):
+        with self.app.app_context():
+            removed = cleanup_abandoned()
+        self.runs += 1
+        self.removed += removed
+        return removed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run()
+            except Exception as e:
+                print(f"Aviso: falha ao limpar uploads abandonados: {e}")
+
+
+upload_cleanup = UploadCleanup()
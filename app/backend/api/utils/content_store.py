@@ -0,0 +1,253 @@
+# content_store.py - armazenamento de uploads endereçado por conteúdo
+# Todo arquivo é gravado como <sha256>.<ext>: o mesmo conteúdo enviado duas
+# vezes vira o mesmo arquivo e nunca é sobrescrito (imutável pelo hash).
+# A tabela stored_files conta quantas colunas (Produto.file_path,
+# Post.imagem, Post.file_path, User.avatar, Message.imagem) apontam para
+# cada arquivo; a contagem é mantida pelos eventos de mapper e arquivos sem
+# referência podem ser apagados por gc(). Os bytes ficam no backend de
+# utils/storage.py.
+import hashlib
+import os
+import re
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, func, inspect, select, update, delete
+from extensions import db
+from models import StoredFile, Produto, Post, User, Message
+from utils.storage import storage
+from utils import http_cache
+
+BLOCK_SIZE = 64 * 1024
+ADDRESSED = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]+)?$")
+
+REFERENCES = {
+    Produto: ("file_path",),
+    Post: ("imagem", "file_path"),
+    User: ("avatar",),
+    Message: ("imagem",),
+}
+
+
+def is_addressed(filename):
+    return bool(filename and ADDRESSED.match(filename))
+
+
+def addressed_name(digest, ext):
+    return f"{digest}.{ext}" if ext else digest
+
+
+def _sha256(f):
+    sha = hashlib.sha256()
+    for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+        sha.update(block)
+    return sha.hexdigest()
+
+
+def _register(filename, digest, size):
+    stored = db.session.get(StoredFile, filename)
+    now = datetime.utcnow()
+    if stored:
+        # upload novo com o mesmo conteúdo: renova o prazo do gc até ganhar referência
+        stored.last_adopted_at = now
+    else:
+        db.session.add(StoredFile(filename=filename, sha256=digest, size=size, last_adopted_at=now))
+    # grava já: a referência criada no mesmo flush precisa achar a linha
+    db.session.flush()
+
+
+def adopt(path, ext, digest=None):
+    """
+    Move um arquivo local já gravado (ex.: upload em partes) para o storage
+    com o nome pelo hash. Se o conteúdo já existe, o arquivo novo é
+    descartado. Retorna o nome.
+    """
+    if digest is None:
+        with open(path, "rb") as f:
+            digest = _sha256(f)
+    filename = addressed_name(digest, ext)
+    size = os.path.getsize(path)
+    # registra antes de olhar o storage: um gc concorrente vê o prazo renovado
+    _register(filename, digest, size)
+    if storage.exists(filename):
+        os.remove(path)
+    else:
+        storage.put(path, filename)
+    return filename
+
+
+def store(file_storage, ext):
+    """
+    Grava um FileStorage calculando o SHA-256 durante a escrita e devolve o
+    nome endereçado. O registro em stored_files fica na sessão (commit do chamador).
+    """
+    folder = current_app.config["UPLOAD_TMP_FOLDER"]
+    os.makedirs(folder, exist_ok=True)
+    tmp = os.path.join(folder, f".tmp-{uuid.uuid4().hex}")
+    sha = hashlib.sha256()
+    try:
+        with open(tmp, "wb") as out:
+            for block in iter(lambda: file_storage.stream.read(BLOCK_SIZE), b""):
+                sha.update(block)
+                out.write(block)
+        return adopt(tmp, ext, sha.hexdigest())
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+# ---- contagem de referências ----
+
+def _bump(connection, filename, delta):
+    if filename:
+        connection.execute(
+            update(StoredFile).where(StoredFile.filename == filename)
+            .values(refcount=StoredFile.refcount + delta)
+        )
+
+
+def _after_insert(mapper, connection, target):
+    for attr in REFERENCES[type(target)]:
+        _bump(connection, getattr(target, attr), 1)
+
+
+def _after_update(mapper, connection, target):
+    state = inspect(target)
+    for attr in REFERENCES[type(target)]:
+        history = state.attrs[attr].history
+        if not history.has_changes():
+            continue
+        for old in history.deleted or ():
+            _bump(connection, old, -1)
+        for new in history.added or ():
+            _bump(connection, new, 1)
+
+
+def _after_delete(mapper, connection, target):
+    for attr in REFERENCES[type(target)]:
+        _bump(connection, getattr(target, attr), -1)
+
+
+for _model in REFERENCES:
+    event.listen(_model, "after_insert", _after_insert)
+    event.listen(_model, "after_update", _after_update)
+    event.listen(_model, "after_delete", _after_delete)
+
+
+def release_bulk(column, condition):
+    """
+    Desconta as referências de `column` nas linhas que casam com `condition`,
+    para chamar antes de um DELETE em massa (que não passa pelos eventos).
+    """
+    model = column.class_
+    count = (
+        select(func.count()).select_from(model)
+        .where(condition, column == StoredFile.filename)
+        .scalar_subquery()
+    )
+    return StoredFile.query.filter(
+        StoredFile.filename.in_(select(column).where(condition))
+    ).update({StoredFile.refcount: StoredFile.refcount - count}, synchronize_session=False)
+
+
+def recount_refs():
+    """Recalcula refcount de todos os arquivos a partir das tabelas."""
+    total = None
+    for model, attrs in REFERENCES.items():
+        for attr in attrs:
+            column = getattr(model, attr)
+            count = select(func.count()).select_from(model).where(column == StoredFile.filename).scalar_subquery()
+            total = count if total is None else total + count
+    return StoredFile.query.update({StoredFile.refcount: total}, synchronize_session=False)
+
+
+def gc(grace):
+    """
+    Apaga arquivos sem referência cujo último upload (last_adopted_at) tem
+    mais de `grace` segundos (o prazo cobre o intervalo entre o upload e o
+    post/produto que vai usá-lo). Cada linha sai com um DELETE condicional,
+    que confere refcount e prazo de novo, e os bytes só depois do commit.
+    """
+    limite = datetime.utcnow() - timedelta(seconds=grace)
+    adopted = func.coalesce(StoredFile.last_adopted_at, StoredFile.created_at)
+    expired = (StoredFile.refcount <= 0, adopted < limite)
+    names = [name for (name,) in db.session.query(StoredFile.filename).filter(*expired)]
+    removed = 0
+    for name in names:
+        deleted = db.session.execute(
+            delete(StoredFile).where(StoredFile.filename == name, *expired)
+        ).rowcount
+        db.session.commit()
+        if not deleted:
+            # ganhou referência ou upload novo desde a listagem
+            continue
+        if db.session.get(StoredFile, name) is None and storage.exists(name):
+            storage.delete(name)
+        removed += 1
+    return removed
+
+
+# ---- migração dos nomes antigos (uuid4) ----
+
+def _copy_addressed(name, ext):
+    """
+    Copia o arquivo `name` do storage para <sha256>.<ext> (se o conteúdo
+    ainda não existe), sem tocar no original. Retorna (novo nome, duplicado?).
+    """
+    folder = current_app.config["UPLOAD_TMP_FOLDER"]
+    os.makedirs(folder, exist_ok=True)
+    tmp = os.path.join(folder, f".tmp-{uuid.uuid4().hex}")
+    sha = hashlib.sha256()
+    try:
+        with storage.open(name) as src, open(tmp, "wb") as out:
+            for block in iter(lambda: src.read(BLOCK_SIZE), b""):
+                sha.update(block)
+                out.write(block)
+        new_name = addressed_name(sha.hexdigest(), ext)
+        if storage.exists(new_name):
+            return new_name, True
+        storage.put(tmp, new_name)
+        return new_name, False
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def migrate_names():
+    """
+    Migra os arquivos do storage para <sha256>.<ext> (pode rodar com a
+    aplicação no ar): copia cada um para o nome novo, reescreve as referências
+    no banco, recalcula refcount e faz commit; só então apaga os nomes
+    antigos. Uma falha antes do commit deixa o banco e os arquivos antigos
+    intactos (as cópias já feitas são reaproveitadas na próxima execução).
+    Retorna (arquivos migrados, duplicados removidos).
+    """
+    renames = {}
+    duplicates = 0
+    for name in sorted(storage.names()):
+        if is_addressed(name):
+            continue
+        ext = name.rsplit(".", 1)[1].lower() if "." in name else ""
+        new_name, duplicate = _copy_addressed(name, ext)
+        duplicates += duplicate
+        renames[name] = new_name
+
+    for model, attrs in REFERENCES.items():
+        for attr in attrs:
+            column = getattr(model, attr)
+            for old, new in renames.items():
+                model.query.filter(column == old).update({column: new}, synchronize_session=False)
+    if renames:
+        # posts, produtos e avatares passam a apontar para outros nomes
+        http_cache.bump(*http_cache.SCOPES)
+
+    known = {name for (name,) in db.session.query(StoredFile.filename)}
+    for name in storage.names():
+        if is_addressed(name) and name not in known:
+            _register(name, name.split(".", 1)[0], storage.stat(name)[0])
+    recount_refs()
+    db.session.commit()
+
+    for old in renames:
+        storage.delete(old)
+    return len(renames), duplicates
@@ -0,0 +1,39 @@
+# counters.py - contadores desnormalizados de likes/comentários em Post
+from sqlalchemy import func, select
+from extensions import db
+from models import Post, Like, Comment
+
+_COLUMNS = {
+    "likes": Post.likes_count,
+    "comments": Post.comments_count,
+}
+
+
+def bump_post_counter(post_id, counter, delta):
+    """
+    Soma `delta` ao contador no próprio UPDATE (sem ler o valor antes), dentro
+    da transação corrente: o contador só é gravado junto com o Like/Comment.
+    """
+    column = _COLUMNS[counter]
+    Post.query.filter(Post.id == post_id).update(
+        {column: column + delta},
+        synchronize_session=False,
+    )
+
+
+def recount_post_counters(post_ids=None):
+    """
+    Recalcula likes_count/comments_count a partir das tabelas likes e comments
+    num único UPDATE. Sem post_ids, corrige todos os posts.
+    """
+    likes = select(func.count(Like.id)).where(Like.post_id == Post.id).scalar_subquery()
+    comments = select(func.count(Comment.id)).where(Comment.post_id == Post.id).scalar_subquery()
+    query = Post.query
+    if post_ids is not None:
+        if not post_ids:
+            return 0
+        query = query.filter(Post.id.in_(post_ids))
+    return query.update(
+        {Post.likes_count: likes, Post.comments_count: comments},
+        synchronize_session=False,
+    )
@@ -0,0 +1,246 @@
+# dashboard.py - agregados por usuário para /api/user/dashboard
+# user_stats (totais), user_monthly_sales (vendas e ganhos por ano+mês) e
+# user_daily_likes (likes recebidos por dia) são atualizados pelos eventos de
+# mapper de Post, Purchase, Like e Follow, na mesma transação da escrita, com
+# UPDATE ... = coluna + delta (e INSERT quando a linha ainda não existe).
+# Deletes em massa (query.delete()) não disparam eventos: quem os usa chama
+# rebuild(user_ids) para os usuários afetados. check() compara os agregados
+# com as tabelas originais e rebuild() refaz tudo a partir delas.
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, select, update, insert, delete, and_
+from extensions import db
+from models import Post, Purchase, Like, Follow, User, UserStats, UserMonthlySales, UserDailyLikes
+
+STATS_COLUMNS = ("posts_count", "products_count", "sales_count", "earned", "purchases_count",
+                 "likes_received", "followers_count", "following_count")
+
+
+# ---- atualização incremental ----
+
+def _bump(connection, model, key, **deltas):
+    """Soma os deltas na linha `key` (dict de chave primária), criando se preciso."""
+    where = and_(*(getattr(model, k) == v for k, v in key.items()))
+    result = connection.execute(
+        update(model).where(where).values({getattr(model, c): getattr(model, c) + d for c, d in deltas.items()})
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(model).values(**key, **deltas))
+
+
+def _bump_stats(connection, user_id, **deltas):
+    if user_id is not None:
+        _bump(connection, UserStats, {"user_id": user_id}, **deltas)
+
+
+def _post_author(connection, post_id):
+    """(autor_id, tipo) do post, lido na conexão do flush."""
+    return connection.execute(select(Post.autor_id, Post.tipo).where(Post.id == post_id)).first()
+
+
+def _post_changed(connection, target, sign):
+    deltas = {"posts_count": sign}
+    if target.tipo == "product":
+        deltas["products_count"] = sign
+    _bump_stats(connection, target.autor_id, **deltas)
+    if target.tipo == "product":
+        # compras não são apagadas com o post: deixam de contar como vendas
+        # (e voltam a contar se o SQLite reaproveitar o id)
+        _post_sales(connection, target, sign)
+
+
+def _post_sales(connection, post, sign):
+    year = func.extract("year", Purchase.created_at)
+    month = func.extract("month", Purchase.created_at)
+    rows = connection.execute(
+        select(year, month, func.count(Purchase.id), func.sum(Purchase.price_paid))
+        .where(Purchase.produto_id == post.id).group_by(year, month)
+    ).all()
+    for y, m, sales, earned in rows:
+        earned = (earned or 0.0) * sign
+        _bump_stats(connection, post.autor_id, sales_count=sales * sign, earned=earned)
+        _bump(connection, UserMonthlySales, {"user_id": post.autor_id, "year": int(y), "month": int(m)},
+              sales=sales * sign, earned=earned)
+
+
+def _purchase_changed(connection, target, sign):
+    _bump_stats(connection, target.comprador_id, purchases_count=sign)
+    post = _post_author(connection, target.produto_id)
+    if not post or post.tipo != "product":
+        return
+    price = (target.price_paid or 0.0) * sign
+    _bump_stats(connection, post.autor_id, sales_count=sign, earned=price)
+    when = target.created_at or datetime.utcnow()
+    _bump(connection, UserMonthlySales, {"user_id": post.autor_id, "year": when.year, "month": when.month},
+          sales=sign, earned=price)
+
+
+def _like_changed(connection, target, sign):
+    post = _post_author(connection, target.post_id)
+    if not post:
+        return
+    _bump_stats(connection, post.autor_id, likes_received=sign)
+    day = (target.created_at or datetime.utcnow()).date()
+    _bump(connection, UserDailyLikes, {"user_id": post.autor_id, "day": day}, likes=sign)
+
+
+def _follow_changed(connection, target, sign):
+    _bump_stats(connection, target.followed_id, followers_count=sign)
+    _bump_stats(connection, target.follower_id, following_count=sign)
+
+
+_HANDLERS = {Post: _post_changed, Purchase: _purchase_changed, Like: _like_changed, Follow: _follow_changed}
+
+
+def _after_insert(mapper, connection, target):
+    _HANDLERS[type(target)](connection, target, 1)
+
+
+def _after_delete(mapper, connection, target):
+    _HANDLERS[type(target)](connection, target, -1)
+
+
+for _model in _HANDLERS:
+    event.listen(_model, "after_insert", _after_insert)
+    event.listen(_model, "after_delete", _after_delete)
+
+
+# ---- leitura ----
+
+def stats_for(user_id):
+    row = db.session.get(UserStats, user_id)
+    return {c: (getattr(row, c) or 0) if row else 0 for c in STATS_COLUMNS}
+
+
+def weekly_likes(user_id):
+    """Likes recebidos nos últimos 7 dias (contando hoje), somando os dias."""
+    desde = datetime.utcnow().date() - timedelta(days=6)
+    return db.session.query(func.coalesce(func.sum(UserDailyLikes.likes), 0)).filter(
+        UserDailyLikes.user_id == user_id, UserDailyLikes.day >= desde
+    ).scalar()
+
+
+def monthly_sales(user_id, months=12):
+    """Lista [{ano, mes, vendas, ganho}] dos últimos `months` meses, do mais antigo ao atual."""
+    hoje = datetime.utcnow()
+    keys = []
+    year, month = hoje.year, hoje.month
+    for _ in range(months):
+        keys.append((year, month))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    keys.reverse()
+    first = keys[0][0] * 100 + keys[0][1]
+    rows = UserMonthlySales.query.filter(
+        UserMonthlySales.user_id == user_id,
+        UserMonthlySales.year * 100 + UserMonthlySales.month >= first,
+    ).all()
+    by_key = {(r.year, r.month): r for r in rows}
+    return [
+        {"ano": y, "mes": m,
+         "vendas": by_key[(y, m)].sales if (y, m) in by_key else 0,
+         "ganho": float(by_key[(y, m)].earned) if (y, m) in by_key else 0.0}
+        for y, m in keys
+    ]
+
+
+# ---- reconstrução e verificação ----
+
+def _expected_stats(user_ids=None):
+    def count(*where):
+        return select(func.count()).where(*where).scalar_subquery()
+
+    sales = and_(Purchase.produto_id == Post.id, Post.tipo == "product", Post.autor_id == User.id)
+    query = select(
+        User.id,
+        count(Post.autor_id == User.id),
+        count(Post.autor_id == User.id, Post.tipo == "product"),
+        select(func.count(Purchase.id)).where(sales).scalar_subquery(),
+        select(func.coalesce(func.sum(Purchase.price_paid), 0.0)).where(sales).scalar_subquery(),
+        count(Purchase.comprador_id == User.id),
+        select(func.count(Like.id)).where(Like.post_id == Post.id, Post.autor_id == User.id).scalar_subquery(),
+        count(Follow.followed_id == User.id),
+        count(Follow.follower_id == User.id),
+    )
+    if user_ids is not None:
+        query = query.where(User.id.in_(user_ids))
+    return query
+
+
+def _expected_monthly(user_ids=None):
+    year = func.extract("year", Purchase.created_at)
+    month = func.extract("month", Purchase.created_at)
+    query = (
+        select(Post.autor_id, year, month, func.count(Purchase.id), func.sum(Purchase.price_paid))
+        .select_from(Purchase)
+        .join(Post, and_(Purchase.produto_id == Post.id, Post.tipo == "product"))
+        .group_by(Post.autor_id, year, month)
+    )
+    if user_ids is not None:
+        query = query.where(Post.autor_id.in_(user_ids))
+    return query
+
+
+def _expected_daily(user_ids=None):
+    day = func.date(Like.created_at)
+    query = (
+        select(Post.autor_id, day, func.count(Like.id))
+        .select_from(Like)
+        .join(Post, Like.post_id == Post.id)
+        .group_by(Post.autor_id, day)
+    )
+    if user_ids is not None:
+        query = query.where(Post.autor_id.in_(user_ids))
+    return query
+
+
+def _scoped(model, user_ids):
+    stmt = delete(model)
+    return stmt.where(model.user_id.in_(user_ids)) if user_ids is not None else stmt
+
+
+def rebuild(user_ids=None):
+    """
+    Recalcula os agregados (de todos os usuários ou só de user_ids) a partir
+    das tabelas, na transação da sessão. Retorna o número de usuários.
+    """
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return 0
+    db.session.execute(_scoped(UserStats, user_ids))
+    db.session.execute(_scoped(UserMonthlySales, user_ids))
+    db.session.execute(_scoped(UserDailyLikes, user_ids))
+    result = db.session.execute(
+        insert(UserStats).from_select(["user_id", *STATS_COLUMNS], _expected_stats(user_ids))
+    )
+    db.session.execute(insert(UserMonthlySales).from_select(
+        ["user_id", "year", "month", "sales", "earned"], _expected_monthly(user_ids)))
+    db.session.execute(insert(UserDailyLikes).from_select(
+        ["user_id", "day", "likes"], _expected_daily(user_ids)))
+    return result.rowcount
+
+
+def check():
+    """
+    Compara os agregados com o que rebuild() gravaria. Retorna a lista de
+    divergências [(tabela, chave, gravado, esperado)].
+    """
+    problems = []
+
+    def compare(table, stored, expected, zero):
+        for key in stored.keys() | expected.keys():
+            got, want = stored.get(key, zero), expected.get(key, zero)
+            if any(abs((g or 0) - (w or 0)) > 1e-6 for g, w in zip(got, want)):
+                problems.append((table, key, got, want))
+
+    stored = {r.user_id: tuple(getattr(r, c) for c in STATS_COLUMNS) for r in UserStats.query.all()}
+    expected = {r[0]: tuple(r[1:]) for r in db.session.execute(_expected_stats())}
+    compare("user_stats", stored, expected, (0,) * len(STATS_COLUMNS))
+
+    stored = {(r.user_id, r.year, r.month): (r.sales, r.earned) for r in UserMonthlySales.query.all()}
+    expected = {(r[0], int(r[1]), int(r[2])): (r[3], r[4]) for r in db.session.execute(_expected_monthly())}
+    compare("user_monthly_sales", stored, expected, (0, 0.0))
+
+    stored = {(r.user_id, r.day.isoformat()): (r.likes,) for r in UserDailyLikes.query.all()}
+    expected = {(r[0], str(r[1])): (r[2],) for r in db.session.execute(_expected_daily())}
+    compare("user_daily_likes", stored, expected, (0,))
+    return problems
@@ -0,0 +1,138 @@
+# download_counter.py - contagem de downloads agregada em memória
+# Cada download só incrementa um dicionário por (tipo, id): "produto" conta em
+# produtos.downloads e "post" (post de produto) em posts.downloads; depois da
+# deduplicação vários produtos podem ter o mesmo arquivo, então a chave não é
+# o arquivo. Os totais vão para o banco num UPDATE por tabela a cada
+# DOWNLOAD_FLUSH_EVENTS downloads ou a cada
+# DOWNLOAD_FLUSH_INTERVAL segundos (o que vier primeiro) e no encerramento
+# do processo. A gravação é feita pela thread de fundo: o download só a
+# acorda. Com DOWNLOAD_FLUSH_INTERVAL=0 não há thread e o lote cheio é
+# gravado na própria requisição (erros só vão para o log).
+#
+# Perda em caso de queda: um processo morto sem passar pelo atexit (kill -9,
+# falta de energia) perde no máximo os downloads ainda pendentes, ou seja,
+# DOWNLOAD_FLUSH_EVENTS contagens (mais as que chegarem enquanto a thread
+# acorda) e no máximo DOWNLOAD_FLUSH_INTERVAL segundos de downloads, por processo.
+# Se o UPDATE falhar, as contagens voltam para o buffer.
+import atexit
+import threading
+from sqlalchemy import case
+from extensions import db
+from models import Produto, Post
+from utils import http_cache, typeahead
+
+# tipo -> (modelo, escopo do http_cache invalidado)
+KINDS = {
+    "produto": (Produto, http_cache.PRODUTOS),
+    "post": (Post, http_cache.POSTS),
+}
+
+
+class DownloadCounter:
+    def __init__(self):
+        self.app = None
+        self.max_events = 100
+        self.interval = 10.0
+        self._pending = {}
+        self._events = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._registered = False
+
+    def init_app(self, app):
+        self.app = app
+        self.max_events = app.config["DOWNLOAD_FLUSH_EVENTS"]
+        self.interval = app.config["DOWNLOAD_FLUSH_INTERVAL"]
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="download-counter", daemon=True)
+            self._thread.start()
+        if not self._registered:
+            # grava o que estiver pendente no encerramento, com ou sem thread
+            atexit.register(self.shutdown)
+            self._registered = True
+
+    def incr(self, target_id, amount=1, kind="produto"):
+        """Conta downloads de target_id; kind é uma chave de KINDS."""
+        if kind not in KINDS:
+            raise ValueError(kind)
+        key = (kind, target_id)
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + amount
+            self._events += amount
+            full = self._events >= self.max_events
+        if not full:
+            return
+        if self._thread is not None:
+            self._wake.set()
+        else:
+            self._flush_logged()
+
+    def pending(self):
+        with self._lock:
+            return dict(self._pending)
+
+    def _take(self):
+        with self._lock:
+            batch, self._pending, self._events = self._pending, {}, 0
+        return batch
+
+    def _restore(self, batch):
+        with self._lock:
+            for key, amount in batch.items():
+                self._pending[key] = self._pending.get(key, 0) + amount
+                self._events += amount
+
+    def flush(self):
+        """Grava os incrementos pendentes (um UPDATE por tabela). Retorna quantos."""
+        with self._flush_lock:
+            batch = self._take()
+            if not batch:
+                return 0
+            by_kind = {}
+            for (kind, target_id), amount in batch.items():
+                by_kind.setdefault(kind, {})[target_id] = amount
+            try:
+                with self.app.app_context():
+                    for kind, counts in by_kind.items():
+                        model, scope = KINDS[kind]
+                        increment = case(counts, value=model.id, else_=0)
+                        model.query.filter(model.id.in_(list(counts))).update(
+                            {model.downloads: db.func.coalesce(model.downloads, 0) + increment},
+                            synchronize_session=False,
+                        )
+                        # UPDATE em massa não passa pelos eventos: ?sort=downloads muda
+                        http_cache.bump(scope)
+                    db.session.commit()
+            except Exception:
+                self._restore(batch)
+                raise
+            typeahead.add_downloads(by_kind.get("produto", {}))
+            return sum(batch.values())
+
+    def _flush_logged(self):
+        try:
+            self.flush()
+        except Exception as e:
+            # as contagens voltaram para o buffer; a próxima gravação tenta de novo
+            print(f"Aviso: falha ao gravar contagem de downloads: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self._stop.is_set():
+                self._flush_logged()
+
+    def shutdown(self):
+        self._stop.set()
+        self._wake.set()
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Aviso: contagem de downloads perdida no encerramento: {e}")
+
+
+download_counter = DownloadCounter()
@@ -0,0 +1,127 @@
+# export.py - exportação em streaming (NDJSON ou CSV)
+# A consulta roda com yield_per (cursor do lado do servidor onde o driver
+# suporta) e a resposta é um gerador: cada lote de EXPORT_BATCH linhas vira
+# um pedaço da resposta e é descartado, então a memória não cresce com o
+# número de linhas. As linhas são tuplas de colunas, sem objetos do ORM.
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from extensions import db
+from models import User, Post, Purchase
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def parse_when(value, end=False):
+    """Data (YYYY-MM-DD) ou data e hora ISO; uma data final inclui o dia inteiro."""
+    when = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        when += timedelta(days=1)
+    if when.tzinfo:
+        when = when.astimezone(timezone.utc).replace(tzinfo=None)
+    return when
+
+
+def date_range(column, args):
+    """Condições de ?from=&to= sobre column (ValueError se a data for inválida)."""
+    where = []
+    if args.get("from"):
+        where.append(column >= parse_when(args["from"]))
+    if args.get("to"):
+        where.append(column < parse_when(args["to"], end=True))
+    return where
+
+
+# ---- conjuntos exportáveis ----
+
+def purchases(*where):
+    comprador = aliased(User)
+    vendedor = aliased(User)
+    return (
+        select(
+            Purchase.id, Purchase.created_at, Purchase.price_paid,
+            Purchase.produto_id, Post.titulo.label("produto_titulo"),
+            Purchase.comprador_id, comprador.username.label("comprador_username"),
+            Post.autor_id.label("vendedor_id"), vendedor.username.label("vendedor_username"),
+        )
+        .select_from(Purchase)
+        .outerjoin(Post, Purchase.produto_id == Post.id)
+        .outerjoin(comprador, Purchase.comprador_id == comprador.id)
+        .outerjoin(vendedor, Post.autor_id == vendedor.id)
+        .where(*where)
+        .order_by(Purchase.created_at, Purchase.id)
+    )
+
+
+def products(*where):
+    return (
+        select(Post.id, Post.created_at, Post.autor_id, Post.titulo, Post.categoria,
+               Post.preco, Post.likes_count, Post.comments_count)
+        .where(Post.tipo == "product", *where)
+        .order_by(Post.created_at, Post.id)
+    )
+
+
+def users(*where):
+    return (
+        select(User.id, User.created_at, User.username, User.nome, User.email,
+               User.is_verified, User.points)
+        .where(*where)
+        .order_by(User.id)
+    )
+
+
+# conjunto -> (consulta, coluna de data dos filtros)
+DATASETS = {
+    "purchases": (purchases, Purchase.created_at),
+    "products": (products, Post.created_at),
+    "users": (users, User.created_at),
+}
+
+
+# ---- resposta ----
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _batches(stmt):
+    result = db.session.execute(stmt.execution_options(yield_per=current_app.config["EXPORT_BATCH"]))
+    for batch in result.partitions():
+        yield [[_value(v) for v in row] for row in batch]
+
+
+def _ndjson(columns, stmt):
+    for batch in _batches(stmt):
+        yield "".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in batch)
+
+
+def _csv(columns, stmt):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    for batch in _batches(stmt):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def stream(stmt, filename, fmt="ndjson"):
+    """Resposta em streaming com as linhas de stmt no formato fmt (ndjson ou csv)."""
+    columns = [c.name for c in stmt.selected_columns]
+    generate = _csv if fmt == "csv" else _ndjson
+    return Response(
+        stream_with_context(generate(columns, stmt)),
+        mimetype=FORMATS[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{fmt}"',
+            # sem buffer no proxy (nginx), para o cliente receber os lotes conforme saem
+            "X-Accel-Buffering": "no",
+        },
+    )
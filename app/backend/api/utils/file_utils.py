@@ -1,9 +1,14 @@
 # file_utils.py - funções para salvar arquivos com nomes seguros e gerar links temporários
 
-import os
-import uuid
+import base64
+import hashlib
+import hmac
+import time
+from flask import current_app, url_for
 from werkzeug.utils import secure_filename
-from config import Config
+from extensions import db
+from utils import content_store
+from utils.storage import storage
 
 ALLOWED = {"pdf", "zip", "png", "jpeg", "jpg", "mp3"}
 
@@ -13,12 +18,60 @@ def allowed_file(filename):
 
 def save_upload(file_storage):
     """
-    Salva o arquivo dentro de UPLOAD_FOLDER e retorna o caminho relativo.
+    Salva o arquivo no storage (nome = sha256 do conteúdo, ver
+    content_store) e retorna (nome, local, mimetype).
     """
     filename = secure_filename(file_storage.filename)
     ext = filename.rsplit('.', 1)[-1].lower()
-    uid = str(uuid.uuid4())
-    new_name = f"{uid}.{ext}"
-    dest = os.path.join(Config.UPLOAD_FOLDER, new_name)
-    file_storage.save(dest)
-    return new_name, dest, file_storage.mimetype
+    new_name = content_store.store(file_storage, ext)
+    return new_name, storage.location(new_name), file_storage.mimetype
+
+def _signature(filename, expires, produto_id=None, post_id=None):
+    key = current_app.config["SECRET_KEY"].encode()
+    message = f"{filename}:{expires}" if produto_id is None else f"{filename}:{expires}:{produto_id}"
+    if post_id is not None:
+        # o tipo entra na assinatura: id de post não vale como id de produto
+        message += f":post:{post_id}"
+    digest = hmac.new(key, message.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+def sign_download(filename, expires_in=None, produto_id=None, post_id=None):
+    """
+    Gera um link temporário para download: a assinatura HMAC cobre o nome do
+    arquivo, o instante de expiração e o produto ou post de produto (a quem o
+    download é creditado), então a verificação não consulta o banco.
+    """
+    expires_in = expires_in or current_app.config["DOWNLOAD_LINK_TTL"]
+    expires = int(time.time()) + expires_in
+    url = url_for("produtos.download_produto", filename=filename, expires=expires,
+                  produto=produto_id, post=post_id,
+                  sig=_signature(filename, expires, produto_id, post_id), _external=True)
+    return {"url": url, "expires": expires}
+
+def verify_download(filename, expires, sig, produto_id=None, post_id=None):
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if not sig or expires < time.time():
+        return False
+    return hmac.compare_digest(sig, _signature(filename, expires, produto_id, post_id))
+
+def is_product_file(filename):
+    """O arquivo é de um produto (pago): só sai por link assinado, nunca por /uploads."""
+    from models import Produto, Post
+    return db.session.query(
+        Produto.query.filter(Produto.file_path == filename).exists()
+        | Post.query.filter(Post.file_path == filename).exists()
+    ).scalar()
+
+def send_upload(filename, as_attachment=False):
+    """
+    Envia um upload pelo backend de storage (utils/storage.py): disco local
+    com Range/If-None-Match ou offload para o proxy, ou redirect para o S3.
+    """
+    response = storage.send(filename, as_attachment)
+    if response.status_code == 200 and content_store.is_addressed(filename):
+        # o nome é o hash do conteúdo: o arquivo nunca muda
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
@@ -0,0 +1,92 @@
+# http_cache.py - ETag + GET condicional para rotas de leitura
+# O ETag vem de um contador de versão por escopo (tabela cache_versions),
+# incrementado na mesma transação de cada escrita. Se o cliente mandar
+# If-None-Match com o ETag atual, responde 304 sem executar a view.
+# As linhas são criadas no start (seed), então bump é só um UPDATE. Qualquer
+# Produto inserido, alterado ou apagado pelo ORM invalida PRODUTOS sozinho
+# (evento after_flush); UPDATEs em massa chamam bump explicitamente.
+# Rotas cujo corpo depende também de estado do processo passam key=, uma
+# função cujo retorno entra no ETag junto com as versões.
+import hashlib
+from functools import wraps
+from flask import current_app, make_response, request
+from sqlalchemy import event, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from extensions import db
+from models import CacheVersion, Produto
+
+POSTS = "posts"
+PRODUTOS = "produtos"
+USERS = "users"
+SCOPES = (POSTS, PRODUTOS, USERS)
+
+
+def seed():
+    """Cria as linhas de cache_versions que faltarem (chamado no start)."""
+    known = {scope for (scope,) in db.session.query(CacheVersion.scope)}
+    missing = [scope for scope in SCOPES if scope not in known]
+    if not missing:
+        return
+    db.session.add_all(CacheVersion(scope=scope, version=0) for scope in missing)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # outro worker criou ao mesmo tempo
+        db.session.rollback()
+
+
+def _bump_statement(scopes):
+    return (update(CacheVersion).where(CacheVersion.scope.in_(scopes))
+            .values(version=CacheVersion.version + 1))
+
+
+def bump(*scopes):
+    """Invalida os escopos; chamar antes do commit da escrita."""
+    db.session.execute(_bump_statement(scopes))
+
+
+def bump_in(connection, *scopes):
+    """bump de dentro de um evento de flush, na conexão da transação."""
+    connection.execute(_bump_statement(scopes))
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    changed = any(isinstance(o, Produto) for o in session.new) \
+        or any(isinstance(o, Produto) for o in session.deleted) \
+        or any(isinstance(o, Produto) and session.is_modified(o) for o in session.dirty)
+    if changed:
+        bump_in(session.connection(), PRODUTOS)
+
+
+def current_versions(scopes):
+    rows = CacheVersion.query.filter(CacheVersion.scope.in_(scopes)).all()
+    versions = {r.scope: r.version for r in rows}
+    return [(scope, versions.get(scope, 0)) for scope in sorted(scopes)]
+
+
+def compute_etag(scopes, key=None):
+    stamp = f"{request.full_path}|{current_versions(scopes)}"
+    if key is not None:
+        stamp += f"|{key()}"
+    return hashlib.sha256(stamp.encode()).hexdigest()[:32]
+
+
+def conditional(*scopes, key=None):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = compute_etag(scopes, key)
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            max_age = current_app.config.get("HTTP_CACHE_MAX_AGE", 0)
+            response.headers["Cache-Control"] = f"public, max-age={max_age}, must-revalidate" if max_age else "no-cache"
+            return response
+        return wrapper
+    return decorator
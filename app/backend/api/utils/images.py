@@ -0,0 +1,203 @@
+# images.py - versões reduzidas das imagens enviadas (thumb, card, full)
+# Cada variante fica em UPLOAD_FOLDER/variants/<nome>.w<largura>.<formato>
+# (cache local, mesmo com o storage no S3: pode ser apagado e é refeito),
+# gerada por um pool de threads logo após o upload ou, se ainda não existir,
+# na primeira requisição /uploads/<nome>?w=. Um lock por variante faz com que
+# várias requisições simultâneas esperem uma única geração em vez de cada uma
+# decodificar a original. Entre processos a escrita é atômica (tmp + rename):
+# no pior caso dois workers geram o mesmo arquivo, nunca um arquivo parcial.
+# WebP é usado quando o Pillow suporta e o navegador aceita (Accept).
+import atexit
+import io
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, request, jsonify
+from config import Config
+from utils import content_store
+from utils.storage import storage, send_path
+
+try:
+    from PIL import Image, ImageOps, features
+    WEBP = features.check("webp")
+except ImportError:
+    print("Aviso: Pillow não disponível. Instale com: pip install Pillow")
+    Image = None
+    WEBP = False
+
+VARIANTS = {"thumb": 160, "card": 640, "full": 1280}
+IMAGE_EXTS = {"png", "jpg", "jpeg", "webp"}
+SUBFOLDER = "variants"
+
+_pool = None
+_pool_lock = threading.Lock()
+_locks = {}
+_guard = threading.Lock()
+
+
+def _setting(name):
+    try:
+        return current_app.config.get(name, getattr(Config, name))
+    except RuntimeError:
+        # fora de app context (threads do pool, scripts)
+        return getattr(Config, name)
+
+
+def is_image(filename):
+    return bool(Image) and "." in filename and filename.rsplit(".", 1)[1].lower() in IMAGE_EXTS
+
+
+def nearest_width(w):
+    """Largura da menor variante >= w ("thumb"/"card"/"full" também valem)."""
+    if w in VARIANTS:
+        return VARIANTS[w]
+    w = int(w)
+    if w <= 0:
+        raise ValueError(w)
+    widths = sorted(VARIANTS.values())
+    return next((v for v in widths if v >= w), widths[-1])
+
+
+def _format(filename, accept_webp):
+    if WEBP and accept_webp:
+        return "webp"
+    return "png" if filename.rsplit(".", 1)[1].lower() == "png" else "jpeg"
+
+
+def variant_name(filename, width, fmt):
+    stem = filename.rsplit(".", 1)[0]
+    return f"{SUBFOLDER}/{stem}.w{width}.{fmt}"
+
+
+def _render(src, dest, width, fmt, quality):
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im)
+        # só reduz: imagem menor que a variante é apenas recomprimida
+        im.thumbnail((width, im.height), Image.LANCZOS)
+        if fmt == "jpeg" and im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+        elif im.mode == "P":
+            im = im.convert("RGBA")
+        tmp = f"{dest}.tmp-{uuid.uuid4().hex}"
+        try:
+            im.save(tmp, fmt.upper(), quality=quality, optimize=fmt != "webp")
+            os.replace(tmp, dest)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+def _lock(key):
+    with _guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def ensure_variant(folder, filename, width, fmt):
+    """Gera a variante se ainda não existir. Retorna o nome relativo a folder."""
+    name = variant_name(filename, width, fmt)
+    dest = os.path.join(folder, name)
+    if os.path.exists(dest):
+        return name
+    lock = _lock(name)
+    with lock:
+        # outra requisição pode ter gerado enquanto esperávamos o lock
+        if not os.path.exists(dest):
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            with storage.open(filename) as f:
+                src = f if f.seekable() else io.BytesIO(f.read())
+                _render(src, dest, width, fmt, _setting("IMAGE_QUALITY"))
+    with _guard:
+        if _locks.get(name) is lock:
+            del _locks[name]
+    return name
+
+
+def generate_all(folder, filename):
+    """Gera todas as variantes padrão de uma imagem. Retorna quantas."""
+    fmt = _format(filename, accept_webp=True)
+    for width in VARIANTS.values():
+        ensure_variant(folder, filename, width, fmt)
+    return len(VARIANTS)
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=_setting("IMAGE_WORKERS"), thread_name_prefix="images")
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+    return _pool
+
+
+def _generate_quietly(folder, filename):
+    try:
+        generate_all(folder, filename)
+    except Exception as e:
+        print(f"Aviso: falha ao gerar variantes de {filename}: {e}")
+
+
+def schedule(filename, folder=None):
+    """Enfileira a geração das variantes logo após o upload (sem bloquear)."""
+    if not is_image(filename):
+        return
+    folder = folder or _setting("UPLOAD_FOLDER")
+    if not _setting("IMAGE_WORKERS"):
+        return
+    _executor().submit(_generate_quietly, folder, filename)
+
+
+def send_variant(filename, w):
+    """
+    Resposta de /uploads/<filename>?w=: envia a variante mais próxima,
+    gerando-a na hora se preciso. Arquivos que não são imagem saem inteiros.
+    """
+    from utils.file_utils import send_upload
+    try:
+        width = nearest_width(w)
+    except ValueError:
+        return jsonify({"error": "Largura inválida"}), 400
+    if not is_image(filename):
+        return send_upload(filename)
+    folder = current_app.config["UPLOAD_FOLDER"]
+    fmt = _format(filename, "image/webp" in request.headers.get("Accept", ""))
+    try:
+        name = ensure_variant(folder, filename, width, fmt)
+    except Exception as e:
+        # imagem corrompida/formato não suportado: entrega a original
+        print(f"Aviso: falha ao gerar variante de {filename}: {e}")
+        return send_upload(filename)
+    response = send_path(folder, name)
+    response.headers["Vary"] = "Accept"
+    if content_store.is_addressed(filename):
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
+def backfill(folder):
+    """Gera as variantes que faltam para todas as imagens do storage. Retorna (imagens, falhas)."""
+    done = failed = 0
+    for name in sorted(storage.names()):
+        if not is_image(name):
+            continue
+        try:
+            generate_all(folder, name)
+            done += 1
+        except Exception as e:
+            print(f"Aviso: {name}: {e}")
+            failed += 1
+    return done, failed
+
+
+def purge_orphans(folder):
+    """Apaga variantes cuja original não existe mais (após gc-files)."""
+    variants = os.path.join(folder, SUBFOLDER)
+    if not os.path.isdir(variants):
+        return 0
+    originals = {name.rsplit(".", 1)[0] for name in storage.names()}
+    removed = 0
+    for name in os.listdir(variants):
+        if name.split(".w", 1)[0] not in originals:
+            os.remove(os.path.join(variants, name))
+            removed += 1
+    return removed
@@ -0,0 +1,107 @@
+# inbox.py - caixa de entrada do chat (conversas por atividade recente)
+# Chat guarda last_message_id e, para cada participante (a/b), o id da última
+# mensagem lida e o número de não lidas, atualizados ao enviar e ao buscar
+# mensagens. Assim uma página da caixa de entrada são sempre as mesmas
+# poucas consultas: chats (uma por coluna de participante, pelo índice),
+# últimas mensagens e usuários, sem contar mensagens por chat.
+from sqlalchemy import func, select, update
+from extensions import db
+from models import Chat, Message
+from utils.pagination import keyset_page, encode_cursor
+from utils.serializers import load_users, author_dict
+
+
+def _side(chat, user_id):
+    if chat.participant_a == user_id:
+        return "a"
+    if chat.participant_b == user_id:
+        return "b"
+    return None
+
+
+def on_message(chat, msg):
+    """Na transação do envio: última mensagem e não lidas do outro lado."""
+    chat.last_message_id = msg.id
+    for side in ("a", "b"):
+        if getattr(chat, f"participant_{side}") == msg.remetente_id:
+            # quem envia já viu a própria mensagem
+            setattr(chat, f"last_read_{side}", msg.id)
+        else:
+            setattr(chat, f"unread_{side}", getattr(Chat, f"unread_{side}") + 1)
+
+
+def mark_read(chat, user_id, msgs):
+    """
+    Avança o cursor de leitura de user_id até a mensagem mais nova de `msgs`
+    (as que acabaram de ser entregues a ele). Retorna True se mudou algo.
+    """
+    side = _side(chat, user_id)
+    if not side or not msgs:
+        return False
+    newest = max(m.id for m in msgs)
+    if newest <= (getattr(chat, f"last_read_{side}") or 0):
+        return False
+    setattr(chat, f"last_read_{side}", newest)
+    if newest >= (chat.last_message_id or 0):
+        unread = 0
+    else:
+        # página antiga: ainda há mensagens depois da que foi lida
+        unread = Message.query.filter(
+            Message.chat_id == chat.id, Message.id > newest, Message.remetente_id != user_id
+        ).count()
+    setattr(chat, f"unread_{side}", unread)
+    return True
+
+
+def inbox_page(user_id, cursor=None, limit=20):
+    """
+    Chats de user_id por last_activity (mais recentes primeiro). Cada coluna
+    de participante é paginada pelo seu índice e as duas listas são mescladas.
+    Retorna (itens, next_cursor).
+    """
+    chats = {}
+    more = False
+    for column in (Chat.participant_a, Chat.participant_b):
+        rows, next_cursor = keyset_page(Chat.query.filter(column == user_id),
+                                        Chat.last_activity, Chat.id, cursor, limit)
+        chats.update((c.id, c) for c in rows)
+        more = more or next_cursor is not None
+    merged = sorted(chats.values(), key=lambda c: (c.last_activity, c.id), reverse=True)
+    page = merged[:limit]
+    next_cursor = None
+    if page and (more or len(merged) > limit):
+        next_cursor = encode_cursor(page[-1].last_activity, page[-1].id)
+
+    last_ids = [c.last_message_id for c in page if c.last_message_id]
+    last = {m.id: m for m in Message.query.filter(Message.id.in_(last_ids)).all()} if last_ids else {}
+    others = {c.id: c.participant_b if _side(c, user_id) == "a" else c.participant_a for c in page}
+    users = load_users(others.values())
+
+    items = []
+    for chat in page:
+        side = _side(chat, user_id)
+        msg = last.get(chat.last_message_id)
+        items.append({
+            "chat_id": chat.id,
+            "is_temp": chat.is_temp,
+            "last_activity": chat.last_activity.isoformat(),
+            "other": author_dict(users.get(others[chat.id])),
+            "last_message": msg.to_dict(compact=True) if msg else None,
+            "unread": getattr(chat, f"unread_{side}") or 0,
+        })
+    return items, next_cursor
+
+
+def backfill():
+    """
+    Preenche last_message_id dos chats existentes (banco anterior à caixa de
+    entrada) e considera tudo lido até ali.
+    """
+    last = (
+        select(func.max(Message.id)).where(Message.chat_id == Chat.id)
+        .correlate(Chat).scalar_subquery()
+    )
+    db.session.execute(update(Chat).values(last_message_id=last))
+    db.session.execute(update(Chat).values(
+        last_read_a=Chat.last_message_id, last_read_b=Chat.last_message_id, unread_a=0, unread_b=0
+    ))
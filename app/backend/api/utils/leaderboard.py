@@ -0,0 +1,393 @@
+# leaderboard.py - ranking por pontos em memória (geral e semanal)
+# Cada ranking é uma SortedList de (-pontos, user_id) (sortedcontainers):
+# inserir e tirar custam O(log n), o top-N é uma fatia, e a posição de um
+# usuário e seus vizinhos saem por busca binária (empates dividem a
+# posição). Eventos de sessão acompanham as mudanças de
+# User.points: no flush gravam points_updated_at e somam a diferença em
+# user_weekly_points (mesma transação); no commit aplicam o novo valor aqui.
+# Como o ranking é por processo, uma thread relê a cada
+# LEADERBOARD_SYNC_INTERVAL segundos os usuários alterados desde a última
+# leitura (índice em points_updated_at) e a semana atual, tira quem foi
+# apagado por outro processo (diferença entre os ids do ranking e os de
+# users), e grava a cada
+# LEADERBOARD_SNAPSHOT_INTERVAL segundos uma cópia em leaderboard_snapshots:
+# o start parte dela e só lê o que mudou depois, sem varrer users.
+# Alterações feitas fora do ORM só aparecem após rebuild-leaderboard.
+# Cada Board tem um token e uma versão que muda a cada alteração: o ETag do
+# ranking usa os dois, já que o conteúdo é o deste processo.
+import atexit
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from itertools import chain
+from sortedcontainers import SortedList
+from sqlalchemy import event, select, update, insert, delete, and_
+from sqlalchemy.orm import Session, attributes
+from extensions import db
+from models import User, UserWeeklyPoints, LeaderboardSnapshot
+from utils import http_cache
+from utils.serializers import load_users
+
+# relê também um pouco antes da última sincronização: pega transações que
+# gravaram points_updated_at antes dela mas só fizeram commit depois
+SYNC_OVERLAP = timedelta(seconds=60)
+PAST_WEEKS_CACHED = 8
+
+
+def week_of(when):
+    """Segunda-feira da semana de when (date ou datetime)."""
+    day = when.date() if isinstance(when, datetime) else when
+    return day - timedelta(days=day.weekday())
+
+
+class Board:
+    def __init__(self, pairs=()):
+        self._points = {user_id: points or 0 for user_id, points in pairs}
+        self._keys = SortedList((-p, user_id) for user_id, p in self._points.items())
+        self._lock = threading.Lock()
+        # token + version identificam o conteúdo (ETag do ranking)
+        self.token = uuid.uuid4().hex[:12]
+        self.version = 0
+
+    def __len__(self):
+        return len(self._points)
+
+    def _discard(self, user_id):
+        points = self._points.pop(user_id, None)
+        if points is None:
+            return
+        self._keys.discard((-points, user_id))
+        self.version += 1
+
+    def _put(self, user_id, points):
+        if self._points.get(user_id) == points:
+            return
+        self._discard(user_id)
+        self._points[user_id] = points
+        self._keys.add((-points, user_id))
+        self.version += 1
+
+    def reset(self, pairs):
+        """Troca o conteúdo pelo de pairs; a versão só muda se algo mudou."""
+        points = {user_id: p or 0 for user_id, p in pairs}
+        with self._lock:
+            if points == self._points:
+                return
+            self._points = points
+            self._keys = SortedList((-p, user_id) for user_id, p in points.items())
+            self.version += 1
+
+    def put(self, user_id, points):
+        with self._lock:
+            self._put(user_id, points or 0)
+
+    def add(self, user_id, delta):
+        with self._lock:
+            self._put(user_id, self._points.get(user_id, 0) + delta)
+
+    def remove(self, user_id):
+        with self._lock:
+            self._discard(user_id)
+
+    def items(self):
+        with self._lock:
+            return list(self._points.items())
+
+    def ids(self):
+        with self._lock:
+            return set(self._points)
+
+    def _entries(self, start, stop):
+        # posição = 1 + quantos têm mais pontos
+        return [(user_id, -neg, self._keys.bisect_left((neg,)) + 1)
+                for neg, user_id in self._keys.islice(max(start, 0), max(stop, 0))]
+
+    def top(self, limit, offset=0):
+        """[(user_id, pontos, posição)] a partir da posição offset+1."""
+        with self._lock:
+            return self._entries(offset, offset + limit)
+
+    def rank(self, user_id):
+        """(posição, pontos) do usuário, ou None se ele não está no ranking."""
+        with self._lock:
+            points = self._points.get(user_id)
+            if points is None:
+                return None
+            return self._keys.bisect_left((-points,)) + 1, points
+
+    def around(self, user_id, size=5):
+        """Os `size` acima e abaixo do usuário, com ele no meio."""
+        with self._lock:
+            points = self._points.get(user_id)
+            if points is None:
+                return []
+            i = self._keys.bisect_left((-points, user_id))
+            return self._entries(i - size, i + size + 1)
+
+
+class Leaderboard:
+    def __init__(self):
+        self.app = None
+        self.sync_interval = 60.0
+        self.snapshot_interval = 600.0
+        self.all = Board()
+        self.week = None
+        self.weekly = Board()
+        self.synced_at = None
+        self.snapshot_at = None
+        self.loaded_from = None
+        self._saved = time.monotonic()
+        self._past = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        self.sync_interval = app.config["LEADERBOARD_SYNC_INTERVAL"]
+        self.snapshot_interval = app.config["LEADERBOARD_SNAPSHOT_INTERVAL"]
+        with app.app_context():
+            self.load()
+        if self._thread is None and self.sync_interval > 0:
+            self._thread = threading.Thread(target=self._run, name="leaderboard", daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    # ---- carga e sincronização ----
+
+    def load(self):
+        """
+        Monta o ranking a partir da última cópia gravada mais os usuários
+        alterados depois dela; sem cópia, lê users inteira e grava uma.
+        """
+        now = datetime.utcnow()
+        snapshot = db.session.get(LeaderboardSnapshot, "all")
+        if snapshot:
+            self.all = Board(json.loads(snapshot.data))
+            self.synced_at = snapshot.taken_at
+            self.snapshot_at = snapshot.taken_at
+            self._catch_up()
+            self.loaded_from = "snapshot"
+        else:
+            self.all = Board(db.session.execute(select(User.id, User.points)).all())
+            self.loaded_from = "users"
+        self.synced_at = now
+        self._load_week(now)
+        if not snapshot:
+            self._write_snapshot()
+        return len(self.all)
+
+    def rebuild(self):
+        """Refaz o ranking lendo users inteira e grava uma cópia nova."""
+        now = datetime.utcnow()
+        self.all = Board(db.session.execute(select(User.id, User.points)).all())
+        self.synced_at = now
+        self._load_week(now)
+        self._write_snapshot()
+        return len(self.all)
+
+    def _catch_up(self):
+        changed = db.session.execute(
+            select(User.id, User.points).where(User.points_updated_at >= self.synced_at - SYNC_OVERLAP)
+        ).all()
+        for user_id, points in changed:
+            self.all.put(user_id, points)
+        return len(changed)
+
+    def _load_week(self, now):
+        week = week_of(now)
+        rows = db.session.execute(
+            select(UserWeeklyPoints.user_id, UserWeeklyPoints.points).where(UserWeeklyPoints.week == week)
+        ).all()
+        if week == self.week:
+            # mesma semana: atualiza no lugar (token e versão seguem valendo)
+            self.weekly.reset(rows)
+        else:
+            self.week, self.weekly = week, Board(rows)
+
+    def _drop_deleted(self):
+        """Tira do ranking os usuários apagados por outros processos."""
+        boards = (self.all, self.weekly, *self._past.values())
+        ranked = set().union(*(board.ids() for board in boards))
+        # pelos ids e não pela contagem: um apagado e um criado entre duas
+        # sincronizações deixam a contagem igual
+        gone = ranked - set(db.session.execute(select(User.id)).scalars())
+        for user_id in gone:
+            for board in boards:
+                board.remove(user_id)
+        return len(gone)
+
+    def sync(self):
+        """Traz as alterações de outros processos. Retorna quantos usuários foram relidos."""
+        with self.app.app_context():
+            now = datetime.utcnow()
+            changed = self._catch_up()
+            self.synced_at = now
+            self._load_week(now)
+            self._drop_deleted()
+            return changed
+
+    def _write_snapshot(self):
+        row = db.session.get(LeaderboardSnapshot, "all") or LeaderboardSnapshot(board="all")
+        row.taken_at = self.synced_at
+        row.data = json.dumps(self.all.items(), separators=(",", ":"))
+        db.session.add(row)
+        db.session.commit()
+        self.snapshot_at = row.taken_at
+        self._saved = time.monotonic()
+
+    def save_snapshot(self):
+        with self.app.app_context():
+            self._write_snapshot()
+
+    def shutdown(self):
+        self._stop.set()
+        try:
+            self.save_snapshot()
+        except Exception as e:
+            print(f"Aviso: falha ao gravar a cópia do ranking: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.sync_interval):
+            try:
+                self.sync()
+                if time.monotonic() - self._saved >= self.snapshot_interval:
+                    self.save_snapshot()
+            except Exception as e:
+                print(f"Aviso: falha ao sincronizar o ranking: {e}")
+
+    # ---- alterações vindas dos commits deste processo ----
+
+    def apply(self, changes):
+        """changes: {user_id: (pontos ou None se apagado, diferença na semana)}."""
+        week = week_of(datetime.utcnow())
+        if week != self.week:
+            # virou a semana: o ranking semanal recomeça
+            self.week, self.weekly = week, Board()
+        for user_id, (points, delta) in changes.items():
+            if points is None:
+                self.all.remove(user_id)
+                self.weekly.remove(user_id)
+                continue
+            self.all.put(user_id, points)
+            if delta:
+                self.weekly.add(user_id, delta)
+
+    # ---- consulta ----
+
+    def board(self, week=None):
+        """Ranking geral (week=None) ou da semana que contém a data `week`."""
+        if week is None:
+            return self.all
+        week = week_of(week)
+        current = week_of(datetime.utcnow())
+        if week == current:
+            if self.week != current:
+                self.week, self.weekly = current, Board()
+            return self.weekly
+        if week > current:
+            return Board()
+        with self._lock:
+            board = self._past.get(week)
+            if board is None:
+                # semanas encerradas não mudam: lidas uma vez pelo índice (week, points)
+                board = Board(db.session.execute(
+                    select(UserWeeklyPoints.user_id, UserWeeklyPoints.points)
+                    .where(UserWeeklyPoints.week == week)
+                ).all())
+                if len(self._past) >= PAST_WEEKS_CACHED:
+                    self._past.pop(next(iter(self._past)))
+                self._past[week] = board
+            return board
+
+    def stats(self):
+        return {
+            "users": len(self.all),
+            "week": self.week.isoformat() if self.week else None,
+            "weekly_users": len(self.weekly),
+            "loaded_from": self.loaded_from,
+            "synced_at": self.synced_at.isoformat() if self.synced_at else None,
+            "snapshot_at": self.snapshot_at.isoformat() if self.snapshot_at else None,
+        }
+
+
+leaderboard = Leaderboard()
+
+
+def serialize(board, entries):
+    """[{rank, user_id, username, points}]; quem foi apagado por outro processo sai do ranking."""
+    users = load_users(user_id for user_id, _, _ in entries)
+    result = []
+    for user_id, points, rank in entries:
+        user = users.get(user_id)
+        if user is None:
+            board.remove(user_id)
+            continue
+        result.append({"rank": rank, "user_id": user_id, "username": user.username, "points": points})
+    return result
+
+
+# ---- eventos de sessão ----
+
+def _bump_week(connection, user_id, week, delta):
+    where = and_(UserWeeklyPoints.user_id == user_id, UserWeeklyPoints.week == week)
+    result = connection.execute(
+        update(UserWeeklyPoints).where(where).values(points=UserWeeklyPoints.points + delta)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(UserWeeklyPoints).values(user_id=user_id, week=week, points=delta))
+
+
+def _points_changed(session, user):
+    return user in session.new or attributes.get_history(user, "points").has_changes()
+
+
+@event.listens_for(Session, "before_flush")
+def _before_flush(session, flush_context, instances):
+    now = datetime.utcnow()
+    for obj in chain(session.new, session.dirty):
+        if isinstance(obj, User) and _points_changed(session, obj):
+            obj.points_updated_at = now
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    # no after_flush, new/dirty/deleted e o histórico ainda mostram o que foi gravado
+    week = week_of(datetime.utcnow())
+    touched = False
+    for obj in chain(session.new, session.dirty):
+        if not isinstance(obj, User) or not _points_changed(session, obj):
+            continue
+        touched = True
+        points = obj.points or 0
+        if obj in session.new:
+            delta = points
+        else:
+            history = attributes.get_history(obj, "points")
+            delta = points - ((history.deleted[0] if history.deleted else obj.points) or 0)
+        changes = session.info.setdefault("leaderboard", {})
+        changes[obj.id] = (points, changes.get(obj.id, (0, 0))[1] + delta)
+        if delta:
+            _bump_week(session.connection(), obj.id, week, delta)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            touched = True
+            session.info.setdefault("leaderboard", {})[obj.id] = (None, 0)
+            session.connection().execute(delete(UserWeeklyPoints).where(UserWeeklyPoints.user_id == obj.id))
+    if touched:
+        # o ranking (ETag em USERS) mudou
+        http_cache.bump_in(session.connection(), http_cache.USERS)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    changes = session.info.pop("leaderboard", None)
+    if changes:
+        leaderboard.apply(changes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session, previous_transaction):
+    session.info.pop("leaderboard", None)
@@ -0,0 +1,92 @@
+# pagination.py - paginação por cursor (keyset) para listagens ordenadas
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def parse_limit(value, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    try:
+        limit = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def _to_json(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(*values):
+    raw = json.dumps([_to_json(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Retorna a lista de valores do cursor. Lança InvalidCursor se o cursor
+    não foi gerado por encode_cursor.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return values
+
+
+def _from_json(column, value):
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        return python_type(value)
+    except (TypeError, ValueError):
+        raise InvalidCursor(value)
+
+
+def keyset_page(query, sort_col, id_col, cursor=None, limit=DEFAULT_LIMIT, descending=True):
+    """
+    Pagina `query` por (sort_col, id_col) sem OFFSET: o cursor guarda a chave
+    da última linha entregue e a próxima página começa estritamente depois dela.
+    Retorna (linhas, next_cursor); next_cursor é None na última página.
+    """
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 2:
+            raise InvalidCursor(cursor)
+        last_sort = _from_json(sort_col, values[0])
+        last_id = _from_json(id_col, values[1])
+        if descending:
+            query = query.filter(or_(sort_col < last_sort, and_(sort_col == last_sort, id_col < last_id)))
+        else:
+            query = query.filter(or_(sort_col > last_sort, and_(sort_col == last_sort, id_col > last_id)))
+
+    if descending:
+        query = query.order_by(sort_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(sort_col.asc(), id_col.asc())
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
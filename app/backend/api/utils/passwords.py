@@ -0,0 +1,106 @@
+# passwords.py - hash/verificação de senha fora da thread da requisição
+# scrypt/PBKDF2 custam dezenas de ms de CPU; rodar isso num pool de processos
+# limitado evita travar os workers em picos de login. Se a fila estiver
+# cheia por mais de PASSWORD_HASH_QUEUE_TIMEOUT segundos, ou o hash não sair
+# em PASSWORD_HASH_TIMEOUT segundos, HashingBusy é lançada e a rota responde 503.
+# A vaga na fila só é devolvida quando o hash termina de fato (callback do
+# future): um hash que estourou o tempo ainda ocupa o worker.
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+from config import Config
+
+
+class HashingBusy(Exception):
+    pass
+
+
+_pool = None
+_slots = None
+_lock = threading.Lock()
+
+
+def _setting(name):
+    try:
+        return current_app.config.get(name, getattr(Config, name))
+    except RuntimeError:
+        # fora de app context (scripts)
+        return getattr(Config, name)
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(senha_hash, password):
+    return check_password_hash(senha_hash, password)
+
+
+def _executor():
+    global _pool, _slots
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=_setting("PASSWORD_HASH_WORKERS"))
+            _slots = threading.BoundedSemaphore(_setting("PASSWORD_HASH_MAX_PENDING"))
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+    return _pool, _slots
+
+
+def _run(fn, *args):
+    if not _setting("PASSWORD_HASH_WORKERS"):
+        return fn(*args)
+    pool, slots = _executor()
+    if not slots.acquire(timeout=_setting("PASSWORD_HASH_QUEUE_TIMEOUT")):
+        raise HashingBusy()
+    try:
+        future = pool.submit(fn, *args)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=_setting("PASSWORD_HASH_TIMEOUT"))
+    except FutureTimeout:
+        future.cancel()
+        raise HashingBusy()
+
+
+def hash_password(password):
+    return _run(_hash, password, _setting("PASSWORD_HASH_METHOD"))
+
+
+def verify_password(senha_hash, password):
+    return _run(_verify, senha_hash, password)
+
+
+def _strength(method):
+    """
+    (família, custo) comparáveis de um método do werkzeug: scrypt (memória)
+    vale mais que qualquer PBKDF2; dentro da família compara os parâmetros.
+    None para métodos desconhecidos/legados.
+    """
+    name, *params = method.split(":")
+    try:
+        if name == "scrypt":
+            n, r, p = (int(v) for v in (params + ["32768", "8", "1"][len(params):]))
+            return (2, (n * r, p))
+        if name == "pbkdf2":
+            iterations = int(params[1]) if len(params) > 1 else DEFAULT_PBKDF2_ITERATIONS
+            return (1, (iterations, 0))
+    except ValueError:
+        pass
+    return None
+
+
+def needs_rehash(senha_hash):
+    """
+    Hash gravado com método/custo mais fraco que o configurado. Nunca troca
+    por um mais fraco (ex.: scrypt existente por PBKDF2 configurado).
+    """
+    stored = _strength((senha_hash or "").split("$", 1)[0])
+    wanted = _strength(_setting("PASSWORD_HASH_METHOD"))
+    if wanted is None:
+        return False
+    return stored is None or stored < wanted
@@ -0,0 +1,112 @@
+# platform_counters.py - totais de usuários, produtos e posts sem COUNT(*)
+# platform_counters guarda um valor por tabela. Um evento after_flush de
+# sessão soma as linhas inseridas e apagadas em cada flush (inclusive as
+# removidas em cascata, como no delete_account) com um UPDATE por contador,
+# na mesma transação. Uma thread por processo confere os valores com COUNT(*)
+# a cada COUNTERS_RECONCILE_INTERVAL segundos e corrige a diferença
+# (deletes em massa, escritas fora do ORM).
+import atexit
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event, func, select, update, insert
+from sqlalchemy.orm import Session
+from extensions import db
+from models import User, Produto, Post, PlatformCounter
+
+COUNTERS = {
+    "usuarios": User,
+    "produtos": Produto,
+    "posts": Post,
+}
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    # no after_flush, new/deleted ainda mostram o que acabou de ser gravado
+    deltas = {}
+    for name, model in COUNTERS.items():
+        delta = sum(isinstance(o, model) for o in session.new) - sum(isinstance(o, model) for o in session.deleted)
+        if delta:
+            deltas[name] = delta
+    if deltas:
+        connection = session.connection()
+        for name, delta in deltas.items():
+            connection.execute(
+                update(PlatformCounter).where(PlatformCounter.name == name)
+                .values(value=PlatformCounter.value + delta)
+            )
+
+
+class PlatformCounters:
+    def __init__(self):
+        self.app = None
+        self.interval = 3600.0
+        self.runs = 0
+        self.corrections = 0
+        self.last_run = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config["COUNTERS_RECONCILE_INTERVAL"]
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="platform-counters", daemon=True)
+            self._thread.start()
+            atexit.register(self._stop.set)
+
+    def values(self):
+        stored = dict(db.session.query(PlatformCounter.name, PlatformCounter.value).all())
+        return {name: stored.get(name, 0) for name in COUNTERS}
+
+    def reconcile(self):
+        """
+        Confere cada contador com COUNT(*) da tabela e grava o valor real
+        (criando os que faltam). Retorna as métricas, com as diferenças encontradas.
+        """
+        with self._lock:
+            inicio = time.monotonic()
+            drift = {}
+            with self.app.app_context():
+                stored = dict(db.session.query(PlatformCounter.name, PlatformCounter.value).all())
+                for name, model in COUNTERS.items():
+                    actual = select(func.count()).select_from(model).scalar_subquery()
+                    if name in stored:
+                        db.session.execute(
+                            update(PlatformCounter).where(PlatformCounter.name == name).values(value=actual)
+                        )
+                    else:
+                        db.session.execute(insert(PlatformCounter).from_select(
+                            ["name", "value"], select(db.literal(name), actual)))
+                    value = db.session.get(PlatformCounter, name, populate_existing=True).value
+                    if name in stored and stored[name] != value:
+                        drift[name] = value - stored[name]
+                db.session.commit()
+            self.runs += 1
+            self.corrections += len(drift)
+            self.last_run = {
+                "at": datetime.utcnow().isoformat(),
+                "drift": drift,
+                "seconds": round(time.monotonic() - inicio, 3),
+            }
+            return self.last_run
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "corrections": self.corrections,
+            "last_run": self.last_run,
+        }
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.reconcile()
+            except Exception as e:
+                print(f"Aviso: falha ao conferir os contadores da plataforma: {e}")
+
+
+platform_counters = PlatformCounters()
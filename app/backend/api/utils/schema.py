@@ -0,0 +1,37 @@
+# schema.py - atualização incremental do schema em bancos já existentes
+# db.create_all() só cria tabelas que faltam; colunas e índices novos em
+# tabelas antigas precisam ser adicionados aqui.
+from sqlalchemy import inspect, text
+from extensions import db
+
+
+def _column_ddl(column, dialect):
+    ddl = f"{column.name} {column.type.compile(dialect=dialect)}"
+    if column.server_default is not None:
+        arg = column.server_default.arg
+        ddl += f" DEFAULT {getattr(arg, 'text', arg)}"
+    return ddl
+
+
+def upgrade_schema():
+    """
+    Retorna a lista de (tabela, coluna) adicionadas, para que o chamador possa
+    preencher dados derivados das colunas novas.
+    """
+    added = []
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_cols = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_cols:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {_column_ddl(column, engine.dialect)}"))
+                    added.append((table.name, column.name))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+    return added
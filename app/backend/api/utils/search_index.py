@@ -0,0 +1,166 @@
+# search_index.py - índice de busca textual (SQLite FTS5) de produtos, posts e usuários
+# Cada documento vira uma linha da tabela virtual search_index com
+# rowid = id * 4 + tipo, então inserir/remover um documento é uma busca
+# por chave. O índice é mantido pelos eventos de mapper (mesma transação da
+# escrita). Em bancos sem FTS5 a busca cai para LIKE com limite.
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+from extensions import db
+from models import Produto, Post, User
+
+PRODUTO, POST, USER = 0, 1, 2
+_KINDS = 4
+
+# pesos BM25 por coluna: title, body, tags
+_WEIGHTS = "10.0, 1.0, 4.0"
+
+_enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def _doc_produto(p):
+    return p.titulo, p.descricao, " ".join(filter(None, [p.tags, p.categoria]))
+
+
+def _doc_post(p):
+    return p.titulo, " ".join(filter(None, [p.conteudo, p.descricao])), p.categoria
+
+
+def _doc_user(u):
+    # só o username: o nome não é público e não deve achar a conta
+    return u.username, None, None
+
+
+_DOCS = {Produto: (PRODUTO, _doc_produto), Post: (POST, _doc_post), User: (USER, _doc_user)}
+
+
+def _rowid(kind, ref_id):
+    return ref_id * _KINDS + kind
+
+
+def _delete(conn, kind, ref_id):
+    conn.execute(text("DELETE FROM search_index WHERE rowid = :rowid"), {"rowid": _rowid(kind, ref_id)})
+
+
+def _insert(conn, kind, ref_id, doc):
+    title, body, tags = doc
+    conn.execute(
+        text("INSERT INTO search_index(rowid, title, body, tags) VALUES (:rowid, :title, :body, :tags)"),
+        {"rowid": _rowid(kind, ref_id), "title": title or "", "body": body or "", "tags": tags or ""},
+    )
+
+
+def _after_save(mapper, connection, target):
+    if not _enabled:
+        return
+    kind, doc = _DOCS[type(target)]
+    _delete(connection, kind, target.id)
+    _insert(connection, kind, target.id, doc(target))
+
+
+def _after_delete(mapper, connection, target):
+    if _enabled:
+        _delete(connection, _DOCS[type(target)][0], target.id)
+
+
+for _model in _DOCS:
+    event.listen(_model, "after_insert", _after_save)
+    event.listen(_model, "after_update", _after_save)
+    event.listen(_model, "after_delete", _after_delete)
+
+
+def ensure_index():
+    """
+    Cria a tabela FTS5 se o banco suportar. Retorna True se a tabela acabou
+    de ser criada ou ainda tem nomes de usuário (e precisa de rebuild()).
+    """
+    global _enabled
+    if db.engine.dialect.name != "sqlite":
+        _enabled = False
+        return False
+    with db.engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'")
+        ).first()
+        if not exists:
+            try:
+                conn.execute(text("CREATE VIRTUAL TABLE search_index USING fts5(title, body, tags, tokenize = 'unicode61 remove_diacritics 2')"))
+            except OperationalError:
+                # sqlite sem FTS5
+                _enabled = False
+                return False
+    _enabled = True
+    return not exists or _has_user_names()
+
+
+def _has_user_names():
+    # índice de antes de _doc_user deixar o nome de fora: precisa de rebuild
+    return db.session.execute(
+        text(f"SELECT 1 FROM search_index WHERE rowid % {_KINDS} = :kind AND body != '' LIMIT 1"),
+        {"kind": USER},
+    ).first() is not None
+
+
+def rebuild():
+    """
+    Reindexa tudo a partir das tabelas, na transação da sessão (o chamador
+    faz o commit). Retorna o número de documentos.
+    """
+    conn = db.session.connection()
+    conn.execute(text("DELETE FROM search_index"))
+    total = 0
+    for model, (kind, doc) in _DOCS.items():
+        for row in model.query.all():
+            _insert(conn, kind, row.id, doc(row))
+            total += 1
+    return total
+
+
+def _match_expression(q):
+    # cada palavra vira um termo entre aspas com prefixo (sem operadores do FTS)
+    terms = ['"%s"*' % t.replace('"', '""') for t in q.split() if t.strip('"')]
+    return " ".join(terms)
+
+
+def _ids_fts(kind, q, limit, offset):
+    expr = _match_expression(q)
+    if not expr:
+        return []
+    rows = db.session.execute(
+        text(
+            f"SELECT rowid FROM search_index WHERE search_index MATCH :q AND rowid % {_KINDS} = :kind "
+            f"ORDER BY bm25(search_index, {_WEIGHTS}) LIMIT :limit OFFSET :offset"
+        ),
+        {"q": expr, "kind": kind, "limit": limit, "offset": offset},
+    )
+    return [r.rowid // _KINDS for r in rows]
+
+
+def _ids_like(kind, q, limit, offset):
+    model, column = {
+        PRODUTO: (Produto, Produto.titulo),
+        POST: (Post, Post.conteudo),
+        USER: (User, User.username),
+    }[kind]
+    rows = (
+        db.session.query(model.id)
+        .filter(column.ilike(f"%{q}%"))
+        .order_by(model.id.desc())
+        .limit(limit)
+        .offset(offset)
+        .all()
+    )
+    return [r.id for r in rows]
+
+
+def search(model, q, limit=10, offset=0):
+    """Retorna as instâncias de `model` que casam com q, na ordem do ranking."""
+    kind = _DOCS[model][0]
+    ids = (_ids_fts if _enabled else _ids_like)(kind, q, limit, offset)
+    if not ids:
+        return []
+    rows = {r.id: r for r in model.query.filter(model.id.in_(ids)).all()}
+    return [rows[i] for i in ids if i in rows]
@@ -0,0 +1,56 @@
+# serializers.py - serialização em lote (um único SELECT de usuários por lista)
+from models import User
+
+
+def load_users(user_ids):
+    """Busca todos os usuários referenciados com um único IN (...)."""
+    ids = {uid for uid in user_ids if uid is not None}
+    if not ids:
+        return {}
+    return {u.id: u for u in User.query.filter(User.id.in_(ids)).all()}
+
+
+def author_dict(user):
+    if not user:
+        return None
+    return {
+        "id": user.id,
+        "username": user.username,
+        "name": user.nome,
+        "avatar": user.avatar
+    }
+
+
+def serialize_posts(posts):
+    users = load_users(p.autor_id for p in posts)
+    result = []
+    for post in posts:
+        post_dict = post.to_dict()
+        post_dict["author"] = author_dict(users.get(post.autor_id))
+        result.append(post_dict)
+    return result
+
+
+def serialize_produtos(produtos):
+    users = load_users(p.autor_id for p in produtos)
+    result = []
+    for produto in produtos:
+        produto_dict = produto.to_dict()
+        produto_dict["author"] = author_dict(users.get(produto.autor_id))
+        result.append(produto_dict)
+    return result
+
+
+def serialize_comments(comments):
+    users = load_users(c.user_id for c in comments)
+    return [c.to_dict(users.get(c.user_id)) for c in comments]
+
+
+def serialize_follows(follows, side="followed"):
+    """
+    Converte Follow em dicts de usuário; side="followed" devolve quem é
+    seguido, side="follower" devolve quem segue.
+    """
+    attr = "followed_id" if side == "followed" else "follower_id"
+    users = load_users(getattr(f, attr) for f in follows)
+    return [users[getattr(f, attr)].to_dict() for f in follows if getattr(f, attr) in users]
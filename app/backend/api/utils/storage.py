@@ -0,0 +1,282 @@
+# storage.py - onde ficam os bytes dos uploads (disco local em shards ou S3)
+# O resto do código só conhece nomes de arquivo planos (<sha256>.<ext>); este
+# módulo decide o caminho. STORAGE_BACKEND:
+#   "local": UPLOAD_FOLDER/ab/cd/<nome>, com ab/cd = sha1(nome), para nenhum
+#            diretório passar de alguns milhares de arquivos;
+#   "s3":    bucket S3 (ou compatível: MinIO, moto_server via S3_ENDPOINT_URL),
+#            downloads por redirect para URL pré-assinada.
+# Migração sem parada: o backend local também lê o layout antigo (arquivos
+# soltos em UPLOAD_FOLDER) e o S3 lê o disco local enquanto
+# STORAGE_LOCAL_FALLBACK estiver ligado; `flask --app app migrate-storage`
+# move os arquivos com a aplicação no ar e gravações novas já vão para o
+# layout novo.
+import hashlib
+import mimetypes
+import os
+import shutil
+import uuid
+from flask import current_app, send_from_directory, redirect
+from config import Config
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+
+
+def valid_name(name):
+    return bool(name) and not name.startswith(".") and "/" not in name and "\\" not in name
+
+
+def send_path(root, relpath, as_attachment=False, download_name=None):
+    """
+    Envia root/relpath. Com UPLOAD_OFFLOAD = "x-accel" ou "x-sendfile"
+    (USE_X_SENDFILE do Flask) só os cabeçalhos saem daqui e o proxy
+    (nginx/apache) envia os bytes; senão o Flask envia com suporte a Range
+    (206) e If-None-Match.
+    """
+    download_name = download_name or os.path.basename(relpath)
+    if current_app.config.get("UPLOAD_OFFLOAD") == "x-accel":
+        response = current_app.response_class(status=200)
+        response.headers["X-Accel-Redirect"] = current_app.config["X_ACCEL_PREFIX"].rstrip("/") + "/" + relpath
+        response.headers["Content-Type"] = mimetypes.guess_type(download_name)[0] or "application/octet-stream"
+        if as_attachment:
+            response.headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
+        return response
+    return send_from_directory(root, relpath, as_attachment=as_attachment,
+                               download_name=download_name, conditional=True)
+
+
+class LocalStorage:
+    def __init__(self, root):
+        self.root = root
+
+    def _shard(self, name):
+        h = hashlib.sha1(name.encode()).hexdigest()
+        return os.path.join(h[:2], h[2:4], name)
+
+    def relpath(self, name):
+        """Caminho relativo a root, ou None se não existe."""
+        if not valid_name(name):
+            return None
+        sharded = self._shard(name)
+        # shard, layout plano antigo e shard de novo: migrate() pode mover o
+        # arquivo entre a primeira e a segunda checagem
+        for rel in (sharded, name, sharded):
+            if os.path.isfile(os.path.join(self.root, rel)):
+                return rel
+        return None
+
+    def location(self, name):
+        rel = self.relpath(name)
+        return os.path.join(self.root, rel) if rel else None
+
+    def exists(self, name):
+        return self.relpath(name) is not None
+
+    def stat(self, name):
+        """(tamanho, mtime) ou None."""
+        path = self.location(name)
+        if not path:
+            return None
+        st = os.stat(path)
+        return st.st_size, st.st_mtime
+
+    def open(self, name):
+        path = self.location(name)
+        if not path:
+            raise FileNotFoundError(name)
+        return open(path, "rb")
+
+    def put(self, local_path, name):
+        """Move local_path para o storage com o nome `name` (consome o arquivo)."""
+        if not valid_name(name):
+            raise ValueError(f"nome inválido: {name}")
+        dest = os.path.join(self.root, self._shard(name))
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = os.path.join(os.path.dirname(dest), f".tmp-{uuid.uuid4().hex}")
+        # move para o diretório final e renomeia: leitores nunca veem arquivo parcial
+        shutil.move(local_path, tmp)
+        os.replace(tmp, dest)
+
+    def move(self, old, new):
+        path = self.location(old)
+        if not path:
+            raise FileNotFoundError(old)
+        self.put(path, new)
+
+    def delete(self, name):
+        path = self.location(name)
+        if path:
+            os.remove(path)
+
+    def names(self):
+        for entry in os.scandir(self.root):
+            if entry.name.startswith("."):
+                continue
+            if entry.is_file():
+                yield entry.name
+            elif len(entry.name) == 2 and entry.is_dir():
+                for sub in os.scandir(entry.path):
+                    if len(sub.name) == 2 and sub.is_dir():
+                        for f in os.scandir(sub.path):
+                            if not f.name.startswith(".") and f.is_file():
+                                yield f.name
+
+    def send(self, name, as_attachment=False):
+        return send_path(self.root, self.relpath(name), as_attachment, download_name=name)
+
+    def migrate(self):
+        """Move os arquivos do layout plano para os shards. Retorna (movidos, já existentes)."""
+        moved = skipped = 0
+        for entry in list(os.scandir(self.root)):
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            dest = os.path.join(self.root, self._shard(entry.name))
+            if os.path.exists(dest):
+                os.remove(entry.path)
+                skipped += 1
+            else:
+                self.put(entry.path, entry.name)
+                moved += 1
+        return moved, skipped
+
+
+class S3Storage:
+    def __init__(self, bucket, prefix="", endpoint_url=None, region=None, url_ttl=300, fallback=None):
+        if boto3 is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 requer boto3 (pip install boto3)")
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or None, region_name=region or None)
+        self.bucket = bucket
+        self.prefix = prefix
+        self.url_ttl = url_ttl
+        self.fallback = fallback
+
+    def _key(self, name):
+        return self.prefix + name
+
+    def _head(self, name):
+        if not valid_name(name):
+            return None
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(name))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def location(self, name):
+        if self._head(name):
+            return f"s3://{self.bucket}/{self._key(name)}"
+        return self.fallback.location(name) if self.fallback else None
+
+    def exists(self, name):
+        return self._head(name) is not None or bool(self.fallback and self.fallback.exists(name))
+
+    def stat(self, name):
+        head = self._head(name)
+        if head:
+            return head["ContentLength"], head["LastModified"].timestamp()
+        return self.fallback.stat(name) if self.fallback else None
+
+    def open(self, name):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(name))["Body"]
+        except ClientError:
+            if self.fallback and self.fallback.exists(name):
+                return self.fallback.open(name)
+            raise FileNotFoundError(name)
+
+    def put(self, local_path, name):
+        if not valid_name(name):
+            raise ValueError(f"nome inválido: {name}")
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.client.upload_file(local_path, self.bucket, self._key(name), ExtraArgs={"ContentType": content_type})
+        os.remove(local_path)
+
+    def move(self, old, new):
+        if self._head(old):
+            self.client.copy_object(Bucket=self.bucket, Key=self._key(new),
+                                    CopySource={"Bucket": self.bucket, "Key": self._key(old)})
+            self.client.delete_object(Bucket=self.bucket, Key=self._key(old))
+        elif self.fallback and self.fallback.exists(old):
+            self.fallback.move(old, new)
+        else:
+            raise FileNotFoundError(old)
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(name))
+        if self.fallback:
+            self.fallback.delete(name)
+
+    def names(self):
+        seen = set()
+        for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                name = obj["Key"][len(self.prefix):]
+                if valid_name(name):
+                    seen.add(name)
+                    yield name
+        if self.fallback:
+            for name in self.fallback.names():
+                if name not in seen:
+                    yield name
+
+    def send(self, name, as_attachment=False):
+        if not self._head(name) and self.fallback and self.fallback.exists(name):
+            return self.fallback.send(name, as_attachment)
+        params = {"Bucket": self.bucket, "Key": self._key(name)}
+        if as_attachment:
+            params["ResponseContentDisposition"] = f'attachment; filename="{name}"'
+        url = self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=self.url_ttl)
+        return redirect(url, 302)
+
+    def migrate(self):
+        """Envia para o bucket os arquivos do disco local (fallback). Retorna (movidos, já existentes)."""
+        moved = skipped = 0
+        if not self.fallback:
+            return moved, skipped
+        for name in list(self.fallback.names()):
+            path = self.fallback.location(name)
+            if self._head(name):
+                skipped += 1
+            else:
+                content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                self.client.upload_file(path, self.bucket, self._key(name), ExtraArgs={"ContentType": content_type})
+                moved += 1
+            # só apaga o local depois que o objeto existe no bucket
+            self.fallback.delete(name)
+        return moved, skipped
+
+
+def create_backend(config):
+    local = LocalStorage(config.get("UPLOAD_FOLDER"))
+    if config.get("STORAGE_BACKEND") == "s3":
+        return S3Storage(
+            config.get("S3_BUCKET"),
+            prefix=config.get("S3_PREFIX"),
+            endpoint_url=config.get("S3_ENDPOINT_URL"),
+            region=config.get("S3_REGION"),
+            url_ttl=config.get("S3_URL_TTL"),
+            fallback=local if config.get("STORAGE_LOCAL_FALLBACK") else None,
+        )
+    return local
+
+
+class Storage:
+    """Backend configurado pelo app (init_app); fora dele usa Config."""
+
+    def __init__(self):
+        self.backend = None
+
+    def init_app(self, app):
+        self.backend = create_backend(app.config)
+
+    def __getattr__(self, attr):
+        if self.backend is None:
+            self.backend = create_backend(vars(Config))
+        return getattr(self.backend, attr)
+
+
+storage = Storage()
@@ -0,0 +1,178 @@
+# timeline.py - timeline da home (só quem o usuário segue)
+# Posts são distribuídos na escrita para a timeline materializada de cada
+# seguidor. Autores com mais de TIMELINE_FANOUT_LIMIT seguidores não são
+# distribuídos: seus posts entram na leitura, mesclados com a timeline.
+# O número de seguidores vem de user_stats.followers_count (mantido pelos
+# eventos de Follow em utils/dashboard.py), sem COUNT em follows.
+# A leitura não grava: o corte em TIMELINE_MAX_ENTRIES é feito no fan-out
+# e no backfill de um follow. rebuild() monta as timelines a partir dos
+# follows existentes (bancos anteriores à timeline materializada).
+from flask import current_app
+from sqlalchemy import func, insert, literal, select, union
+from extensions import db
+from models import Follow, Post, TimelineEntry, UserStats
+from utils.pagination import keyset_page, encode_cursor
+
+
+def _max_entries():
+    return current_app.config["TIMELINE_MAX_ENTRIES"]
+
+
+def _fanout_limit():
+    return current_app.config["TIMELINE_FANOUT_LIMIT"]
+
+
+def follower_count(user_id):
+    count = db.session.execute(
+        select(UserStats.followers_count).where(UserStats.user_id == user_id)
+    ).scalar()
+    return count or 0
+
+
+def fan_out_post(post):
+    """
+    Insere o post na timeline do autor e dos seguidores com um único
+    INSERT ... SELECT. Deve rodar na mesma transação da criação do post.
+    """
+    db.session.add(TimelineEntry(user_id=post.autor_id, post_id=post.id,
+                                 autor_id=post.autor_id, created_at=post.created_at))
+    if follower_count(post.autor_id) > _fanout_limit():
+        trim(post.autor_id)
+        return
+    followers = select(
+        Follow.follower_id,
+        literal(post.id),
+        literal(post.autor_id),
+        literal(post.created_at),
+    ).where(Follow.followed_id == post.autor_id)
+    db.session.execute(
+        insert(TimelineEntry).from_select(
+            ["user_id", "post_id", "autor_id", "created_at"], followers
+        )
+    )
+    trim(union(select(literal(post.autor_id)),
+               select(Follow.follower_id).where(Follow.followed_id == post.autor_id)))
+
+
+def backfill(user_id, followed_id):
+    """Copia os posts recentes de quem passou a ser seguido para a timeline."""
+    if follower_count(followed_id) > _fanout_limit():
+        return
+    recent = (
+        select(literal(user_id), Post.id, Post.autor_id, Post.created_at)
+        .where(Post.autor_id == followed_id)
+        .order_by(Post.created_at.desc(), Post.id.desc())
+        .limit(_max_entries())
+    )
+    db.session.execute(
+        insert(TimelineEntry).from_select(
+            ["user_id", "post_id", "autor_id", "created_at"], recent
+        )
+    )
+    trim(user_id)
+
+
+def remove_author(user_id, followed_id):
+    TimelineEntry.query.filter_by(user_id=user_id, autor_id=followed_id).delete(synchronize_session=False)
+
+
+def remove_posts(post_ids):
+    TimelineEntry.query.filter(TimelineEntry.post_id.in_(post_ids)).delete(synchronize_session=False)
+
+
+def trim(user_ids=None):
+    """
+    Mantém só as TIMELINE_MAX_ENTRIES entradas mais novas por usuário.
+    Aceita um id, uma lista ou um SELECT de ids, ou None (todas as timelines).
+    """
+    ranked = select(
+        TimelineEntry.id,
+        func.row_number().over(
+            partition_by=TimelineEntry.user_id,
+            order_by=(TimelineEntry.created_at.desc(), TimelineEntry.post_id.desc()),
+        ).label("rn"),
+    )
+    if isinstance(user_ids, int):
+        user_ids = [user_ids]
+    if user_ids is not None:
+        ranked = ranked.where(TimelineEntry.user_id.in_(user_ids))
+    ranked = ranked.subquery()
+    excess = select(ranked.c.id).where(ranked.c.rn > _max_entries())
+    return TimelineEntry.query.filter(TimelineEntry.id.in_(excess)).delete(synchronize_session=False)
+
+
+def rebuild():
+    """
+    Refaz todas as timelines a partir de follows e posts: os posts do
+    próprio usuário e os dos autores seguidos que recebem fan-out (no
+    máximo TIMELINE_MAX_ENTRIES por autor). O chamador faz o commit.
+    Retorna o número de entradas.
+    """
+    TimelineEntry.query.delete(synchronize_session=False)
+    ranked = select(
+        Post.id, Post.autor_id, Post.created_at,
+        func.row_number().over(
+            partition_by=Post.autor_id,
+            order_by=(Post.created_at.desc(), Post.id.desc()),
+        ).label("rn"),
+    ).subquery()
+    recent = select(ranked.c.id, ranked.c.autor_id, ranked.c.created_at).where(ranked.c.rn <= _max_entries()).subquery()
+    big_authors = (
+        select(Follow.followed_id)
+        .group_by(Follow.followed_id)
+        .having(func.count(Follow.id) > _fanout_limit())
+    )
+    columns = ["user_id", "post_id", "autor_id", "created_at"]
+    own = select(recent.c.autor_id, recent.c.id, recent.c.autor_id, recent.c.created_at)
+    followed = (
+        select(Follow.follower_id, recent.c.id, recent.c.autor_id, recent.c.created_at)
+        .join(recent, recent.c.autor_id == Follow.followed_id)
+        .where(Follow.followed_id.not_in(big_authors))
+    )
+    db.session.execute(insert(TimelineEntry).from_select(columns, own))
+    db.session.execute(insert(TimelineEntry).from_select(columns, followed))
+    trim()
+    return TimelineEntry.query.count()
+
+
+def _read_time_authors(user_id):
+    """Autores seguidos que não recebem fan-out na escrita."""
+    followed = select(Follow.followed_id).where(Follow.follower_id == user_id)
+    return list(db.session.execute(
+        select(UserStats.user_id)
+        .where(UserStats.user_id.in_(followed), UserStats.followers_count > _fanout_limit())
+    ).scalars())
+
+
+def timeline_page(user_id, cursor=None, limit=20):
+    """
+    Retorna (posts, next_cursor). O cursor é o mesmo (created_at, post_id)
+    para as duas fontes, então a mesclagem pagina sem OFFSET.
+    """
+    entries, entries_more = keyset_page(
+        TimelineEntry.query.filter_by(user_id=user_id),
+        TimelineEntry.created_at, TimelineEntry.post_id,
+        cursor=cursor, limit=limit,
+    )
+    keys = {e.post_id: e.created_at for e in entries}
+
+    big_authors = _read_time_authors(user_id)
+    pulled_more = None
+    if big_authors:
+        pulled, pulled_more = keyset_page(
+            Post.query.filter(Post.autor_id.in_(big_authors)),
+            Post.created_at, Post.id,
+            cursor=cursor, limit=limit,
+        )
+        for p in pulled:
+            keys.setdefault(p.id, p.created_at)
+
+    ordered = sorted(keys.items(), key=lambda kv: (kv[1], kv[0]), reverse=True)
+    page = ordered[:limit]
+    next_cursor = None
+    if page and (len(ordered) > limit or entries_more or pulled_more):
+        last_id, last_created = page[-1]
+        next_cursor = encode_cursor(last_created, last_id)
+
+    posts = {p.id: p for p in Post.query.filter(Post.id.in_([pid for pid, _ in page])).all()}
+    return [posts[pid] for pid, _ in page if pid in posts], next_cursor
@@ -0,0 +1,196 @@
+# typeahead.py - sugestões por prefixo (usernames e títulos de produto) em memória
+# Cada índice guarda uma lista ordenada de (palavra, id); o prefixo é achado
+# por busca binária e o intervalo é ranqueado por score (points/downloads).
+# Prefixos curtos, que casam com muita coisa, ficam num cache pequeno que é
+# descartado a cada alteração. O índice é por processo: é construído no
+# start e atualizado pelas rotas que criam/renomeiam usuários, pelos commits
+# de Produto deste processo (eventos de sessão: criado, renomeado, apagado)
+# e pelas contagens de download gravadas aqui (download_counter). O que muda
+# em outros processos chega pela releitura a cada TYPEAHEAD_REFRESH_INTERVAL
+# segundos, que também tira quem foi apagado.
+import atexit
+import heapq
+import threading
+from bisect import bisect_left, insort
+from itertools import chain
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+MAX_LABEL = 80
+CACHED_PREFIX_LEN = 2
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._keys = []    # [(palavra, id)] ordenada
+        self._items = {}   # id -> (label, score, palavras)
+        self._cache = {}   # prefixo curto -> [ids] já ranqueados
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    @staticmethod
+    def _words(label, split_words):
+        label = label.lower()
+        words = {label}
+        if split_words:
+            words.update(w for w in label.split() if len(w) > 1)
+        return words
+
+    def _remove(self, item_id):
+        item = self._items.pop(item_id, None)
+        if item is None:
+            return
+        for word in item[2]:
+            i = bisect_left(self._keys, (word, item_id))
+            if i < len(self._keys) and self._keys[i] == (word, item_id):
+                del self._keys[i]
+
+    def put(self, item_id, label, score, split_words=False):
+        if not label:
+            return
+        label = label[:MAX_LABEL]
+        words = self._words(label, split_words)
+        with self._lock:
+            self._remove(item_id)
+            self._items[item_id] = (label, score or 0, words)
+            for word in words:
+                insort(self._keys, (word, item_id))
+            self._cache.clear()
+
+    def remove(self, item_id):
+        with self._lock:
+            self._remove(item_id)
+            self._cache.clear()
+
+    def add_score(self, item_id, delta):
+        with self._lock:
+            item = self._items.get(item_id)
+            if item is None:
+                return
+            self._items[item_id] = (item[0], item[1] + delta, item[2])
+            self._cache.clear()
+
+    def sync(self, rows, split_words=False):
+        """Iguala o índice a rows [(id, label, score)]: ids ausentes saem."""
+        seen = set()
+        with self._lock:
+            for item_id, label, score in rows:
+                if not label:
+                    continue
+                label = label[:MAX_LABEL]
+                seen.add(item_id)
+                item = self._items.get(item_id)
+                if item is not None and item[0] == label:
+                    self._items[item_id] = (label, score or 0, item[2])
+                    continue
+                self._remove(item_id)
+                words = self._words(label, split_words)
+                self._items[item_id] = (label, score or 0, words)
+                for word in words:
+                    insort(self._keys, (word, item_id))
+            for item_id in [i for i in self._items if i not in seen]:
+                self._remove(item_id)
+            self._cache.clear()
+
+    def _ranked(self, prefix, limit):
+        keys = self._keys
+        ids = set()
+        for i in range(bisect_left(keys, (prefix,)), len(keys)):
+            word, item_id = keys[i]
+            if not word.startswith(prefix):
+                break
+            ids.add(item_id)
+        return heapq.nlargest(limit, ids, key=lambda i: (self._items[i][1], -i))
+
+    def search(self, prefix, limit=5):
+        prefix = prefix.lower()
+        if not prefix:
+            return []
+        with self._lock:
+            if len(prefix) <= CACHED_PREFIX_LEN:
+                ids = self._cache.get(prefix)
+                if ids is None or len(ids) < limit:
+                    ids = self._cache[prefix] = self._ranked(prefix, max(limit, 10))
+            else:
+                ids = self._ranked(prefix, limit)
+            return [(i, self._items[i][0], self._items[i][1]) for i in ids[:limit]]
+
+
+users = PrefixIndex()
+produtos = PrefixIndex()
+
+
+_app = None
+_stop = threading.Event()
+_thread = None
+
+
+def build():
+    """Lê usuários e produtos do banco (no start e em cada releitura)."""
+    from extensions import db
+    from models import User, Produto
+    users.sync(db.session.query(User.id, User.username, User.points))
+    produtos.sync(db.session.query(Produto.id, Produto.titulo, Produto.downloads), split_words=True)
+
+
+def init_app(app):
+    global _app, _thread
+    _app = app
+    with app.app_context():
+        build()
+    interval = app.config["TYPEAHEAD_REFRESH_INTERVAL"]
+    if _thread is None and interval > 0:
+        _thread = threading.Thread(target=_run, args=(interval,), name="typeahead", daemon=True)
+        _thread.start()
+        atexit.register(_stop.set)
+
+
+def _run(interval):
+    while not _stop.wait(interval):
+        try:
+            with _app.app_context():
+                build()
+        except Exception as e:
+            print(f"Aviso: falha ao reler o typeahead: {e}")
+
+
+def put_user(user):
+    users.put(user.id, user.username, user.points)
+
+
+def add_downloads(counts):
+    """counts: {produto_id: downloads gravados} (ver download_counter.flush)."""
+    for produto_id, amount in counts.items():
+        produtos.add_score(produto_id, amount)
+
+
+# ---- eventos de sessão (produtos) ----
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    from models import Produto
+    changes = None
+    for obj in chain(session.new, session.dirty):
+        if isinstance(obj, Produto) and (obj in session.new or session.is_modified(obj)):
+            changes = session.info.setdefault("typeahead", {})
+            changes[obj.id] = (obj.titulo, obj.downloads)
+    for obj in session.deleted:
+        if isinstance(obj, Produto):
+            changes = session.info.setdefault("typeahead", {})
+            changes[obj.id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    for produto_id, item in session.info.pop("typeahead", {}).items():
+        if item is None:
+            produtos.remove(produto_id)
+        else:
+            produtos.put(produto_id, item[0], item[1], split_words=True)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session, previous_transaction):
+    session.info.pop("typeahead", None)
@@ -19,7 +19,34 @@ export default function CreatePostPopup({ onClose }) {
   const [loading, setLoading] = useState(false);
 
   //////////// UPLOAD ////////////
+  // Arquivos grandes vão em partes (/upload/chunked), retomando do offset do servidor
+  const uploadChunked = async (fileToUpload) => {
+    const init = await api.post("/upload/chunked", { filename: fileToUpload.name, size: fileToUpload.size });
+    const { upload_id, chunk_size } = init.data;
+    let offset = init.data.offset;
+    while (offset < fileToUpload.size) {
+      try {
+        const chunk = fileToUpload.slice(offset, offset + chunk_size);
+        const res = await api.put(`/upload/chunked/${upload_id}?offset=${offset}`, chunk, {
+          headers: { "Content-Type": "application/octet-stream" },
+          timeout: 60000,
+        });
+        offset = res.data.offset;
+      } catch (err) {
+        // reconexão: pergunta ao servidor quanto já chegou
+        const st = await api.get(`/upload/chunked/${upload_id}`);
+        if (st.data.offset === offset) throw err;
+        offset = st.data.offset;
+      }
+    }
+    const res = await api.post(`/upload/chunked/${upload_id}/finalize`, {});
+    return res.data.filename;
+  };
+
   const uploadFile = async (fileToUpload) => {
+    if (fileToUpload.size > 8 * 1024 * 1024) {
+      return uploadChunked(fileToUpload);
+    }
     const form = new FormData();
     form.append("file", fileToUpload);
 
@@ -2,10 +2,10 @@ import React from "react";
 import api from "../api/api";
 
 /* Card que mostra produto resumido */
-const getImageUrl = (filename) => {
+const getImageUrl = (filename, size) => {
   if (!filename) return null;
   const base = api.defaults.baseURL ? api.defaults.baseURL.replace(/\/api\/?$/, "") : "";
-  return `${base}/uploads/${filename}`;
+  return `${base}/uploads/${filename}${size ? `?w=${size}` : ""}`;
 };
 
 export default function ProductCard({ product, onBuy }) {
@@ -18,7 +18,7 @@ export default function ProductCard({ product, onBuy }) {
         <span className="product-category">{product.categoria}</span>
       </div>
       {product.image && (
-        <img src={getImageUrl(product.image)} alt="product" className="post-image" />
+        <img src={getImageUrl(product.image, "card")} alt="product" className="post-image" />
       )}
       {product.content && <p className="post-content">{product.content}</p>}
       {onBuy && <button onClick={onBuy} className="buy-btn">Comprar</button>}
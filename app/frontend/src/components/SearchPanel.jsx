@@ -1,11 +1,37 @@
-import React, { useState } from "react";
+import React, { useState, useEffect } from "react";
 import { useNavigate } from "react-router-dom";
+import api from "../api/api";
 import "../styles/SearchPanel.css";
 
 export default function SearchPanel({ isOpen, onClose }) {
   const [query, setQuery] = useState("");
+  const [suggestions, setSuggestions] = useState({ usuarios: [], produtos: [] });
   const navigate = useNavigate();
 
+  // Sugestões por prefixo enquanto digita (a busca completa só no submit)
+  useEffect(() => {
+    const q = query.trim();
+    if (!q) {
+      setSuggestions({ usuarios: [], produtos: [] });
+      return;
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const res = await api.get(`/search/suggest?q=${encodeURIComponent(q)}`);
+        setSuggestions(res.data);
+      } catch (err) {
+        console.error("Error fetching suggestions:", err);
+      }
+    }, 150);
+    return () => clearTimeout(timer);
+  }, [query]);
+
+  const goTo = (path) => {
+    navigate(path);
+    onClose();
+    setQuery("");
+  };
+
   const handleSearch = (e) => {
     e.preventDefault();
     if (query.trim()) {
@@ -31,6 +57,16 @@ export default function SearchPanel({ isOpen, onClose }) {
           />
           <button type="submit">Buscar</button>
         </form>
+        {(suggestions.usuarios.length > 0 || suggestions.produtos.length > 0) && (
+          <ul className="search-suggestions">
+            {suggestions.usuarios.map((u) => (
+              <li key={`u${u.id}`} onClick={() => goTo(`/profile/${u.username}`)}>@{u.username}</li>
+            ))}
+            {suggestions.produtos.map((p) => (
+              <li key={`p${p.id}`} onClick={() => goTo(`/product/${p.id}`)}>{p.titulo}</li>
+            ))}
+          </ul>
+        )}
         <button className="close-btn" onClick={onClose}>Fechar</button>
       </div>
     </div>
@@ -0,0 +1,36 @@
+// src/hooks/usePostPages.js
+// Listas de posts paginadas por cursor (/posts, /posts/user/<id>): a
+// primeira página vem de showFirst(res.data); loadMore() busca a próxima
+// com o next_cursor e acrescenta no fim.
+import { useState, useCallback } from "react";
+import api from "../api/api";
+
+export default function usePostPages(setPosts) {
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const showFirst = useCallback((data) => {
+    setPosts(data.posts);
+    setNextCursor(data.next_cursor || null);
+  }, [setPosts]);
+
+  const loadMore = useCallback(async (url) => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const res = await api.get(url, { params: { cursor: nextCursor } });
+      // um post criado entre as páginas não aparece duas vezes
+      setPosts(prev => {
+        const seen = new Set(prev.map(p => p.id));
+        return [...prev, ...res.data.posts.filter(p => !seen.has(p.id))];
+      });
+      setNextCursor(res.data.next_cursor || null);
+    } catch (err) {
+      console.error("Error loading more posts:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [nextCursor, loadingMore, setPosts]);
+
+  return { hasMore: Boolean(nextCursor), loadingMore, showFirst, loadMore };
+}
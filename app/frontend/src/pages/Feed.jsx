@@ -2,6 +2,7 @@
 import { useState, useEffect } from "react";
 import api from "../api/api";
 import { useAuth } from "../context/AuthContext";
+import usePostPages from "../hooks/usePostPages";
 import "../styles/Feed.css";
 
 export default function Feed() {
@@ -12,12 +13,13 @@ export default function Feed() {
   const [newPostContent, setNewPostContent] = useState("");
   const [newPostImage, setNewPostImage] = useState(null);
   const [isPosting, setIsPosting] = useState(false);
+  const pages = usePostPages(setPosts);
 
   useEffect(() => {
     const fetchPosts = async () => {
       try {
         const res = await api.get("/posts");
-        setPosts(res.data);
+        pages.showFirst(res.data);
       } catch (err) {
         console.error("Error fetching posts:", err);
       }
@@ -45,10 +47,10 @@ export default function Feed() {
     }
   };
 
-  const getImageUrl = (filename) => {
+  const getImageUrl = (filename, size) => {
     if (!filename) return null;
     const base = api.defaults.baseURL ? api.defaults.baseURL.replace(/\/api\/?$/, "") : "";
-    return `${base}/uploads/${filename}`;
+    return `${base}/uploads/${filename}${size ? `?w=${size}` : ""}`;
   };
 
   const toggleComments = async (postId) => {
@@ -135,7 +137,7 @@ export default function Feed() {
       <div className="create-post-section">
         <div className="create-post-card">
           <div className="create-post-header">
-            <img src={getImageUrl(user?.avatar)} alt="" className="avatar-small" />
+            <img src={getImageUrl(user?.avatar, "thumb")} alt="" className="avatar-small" />
             <span>O que está acontecendo?</span>
           </div>
           <textarea
@@ -179,7 +181,7 @@ export default function Feed() {
           posts.map(post => (
             <div key={post.id} className="feed-post">
               <div className="post-header">
-                <img src={getImageUrl(post.author?.avatar)} alt="" className="avatar" />
+                <img src={getImageUrl(post.author?.avatar, "thumb")} alt="" className="avatar" />
                 <div className="user-info">
                   <div className="user-details">
                     <strong className="username">@{post.author?.username}</strong>
@@ -194,7 +196,7 @@ export default function Feed() {
                     <p className="post-content">{post.content}</p>
                     {post.image && (
                       <div className="post-media">
-                        <img src={getImageUrl(post.image)} alt="" className="post-image" />
+                        <img src={getImageUrl(post.image, "card")} alt="" className="post-image" />
                       </div>
                     )}
                   </>
@@ -212,7 +214,7 @@ export default function Feed() {
                     </div>
                     {post.image && (
                       <div className="post-media">
-                        <img src={getImageUrl(post.image)} alt="" className="post-image" />
+                        <img src={getImageUrl(post.image, "card")} alt="" className="post-image" />
                       </div>
                     )}
                     {post.content && <p className="post-content">{post.content}</p>}
@@ -267,7 +269,7 @@ export default function Feed() {
                     ))}
                   </div>
                   <div className="comment-input-section">
-                    <img src={getImageUrl(user?.avatar)} alt="" className="comment-avatar" />
+                    <img src={getImageUrl(user?.avatar, "thumb")} alt="" className="comment-avatar" />
                     <div className="comment-input-wrapper">
                       <input
                         type="text"
@@ -291,6 +293,11 @@ export default function Feed() {
             </div>
           ))
         )}
+        {pages.hasMore && (
+          <button className="btn ghost load-more" onClick={() => pages.loadMore("/posts")} disabled={pages.loadingMore}>
+            {pages.loadingMore ? "Carregando..." : "Carregar mais"}
+          </button>
+        )}
       </div>
     </div>
   );
@@ -3,12 +3,14 @@ import { Link } from "react-router-dom";
 import api from "../api/api";
 import { useAuth } from "../context/AuthContext";
 import ProductCard from "../components/ProductCard";
+import usePostPages from "../hooks/usePostPages";
 import "../styles/Home.css";
 
 export default function Home() {
   const { user } = useAuth();
   const [posts, setPosts] = useState([]);
   const [filteredPosts, setFilteredPosts] = useState([]);
+  const pages = usePostPages(setPosts);
   const [featuredPosts, setFeaturedPosts] = useState([]);
   const [activeFilter, setActiveFilter] = useState("Todos os Posts");
   const [input, setInput] = useState("");
@@ -28,7 +30,7 @@ export default function Home() {
   const fetchPosts = async () => {
     try {
       const res = await api.get("/posts");
-      setPosts(res.data);
+      pages.showFirst(res.data);
     } catch (err) {
       console.error("Error fetching posts:", err);
     } finally {
@@ -81,10 +83,10 @@ export default function Home() {
     }
   };
 
-  const getImageUrl = (filename) => {
+  const getImageUrl = (filename, size) => {
     if (!filename) return null;
     const base = api.defaults.baseURL ? api.defaults.baseURL.replace(/\/api\/?$/, "") : "";
-    return `${base}/uploads/${filename}`;
+    return `${base}/uploads/${filename}${size ? `?w=${size}` : ""}`;
   };
 
   const toggleComments = async (postId) => {
@@ -182,13 +184,13 @@ export default function Home() {
             <div key={post.id} className="featured-card">
               <div className="featured-header">
                 <Link to={`/profile/${post.author?.username}`}>
-                  <img src={getImageUrl(post.author?.avatar)} alt="" className="avatar-small" />
+                  <img src={getImageUrl(post.author?.avatar, "thumb")} alt="" className="avatar-small" />
                   <span>@{post.author?.username}</span>
                 </Link>
               </div>
               <p className="featured-content">{post.content?.substring(0, 100)}...</p>
               {post.image && (
-                <img src={getImageUrl(post.image)} alt="" className="featured-image" />
+                <img src={getImageUrl(post.image, "full")} alt="" className="featured-image" />
               )}
               <div className="featured-stats">
                 <span>👍 {post.likes ?? 0}</span>
@@ -224,7 +226,7 @@ export default function Home() {
             <div key={p.id} className="post">
               <div className="post-header">
                 <Link to={`/profile/${p.author?.username}`}>
-                  <img src={getImageUrl(p.author?.avatar)} alt="" className="avatar" />
+                  <img src={getImageUrl(p.author?.avatar, "thumb")} alt="" className="avatar" />
                   <div>
                     <strong>@{p.author?.username}</strong>
                   </div>
@@ -232,7 +234,7 @@ export default function Home() {
               </div>
               {p.tipo !== "product" && <p className="post-content">{p.content}</p>}
               {p.tipo !== "product" && p.image && (
-                <img src={getImageUrl(p.image)} alt="" className="post-image" />
+                <img src={getImageUrl(p.image, "card")} alt="" className="post-image" />
               )}
               {p.tipo === "product" && (
                 <div className="post-card">
@@ -272,6 +274,11 @@ export default function Home() {
             </div>
           ))
         )}
+        {!loading && pages.hasMore && (
+          <button className="btn ghost load-more" onClick={() => pages.loadMore("/posts")} disabled={pages.loadingMore}>
+            {pages.loadingMore ? "Carregando..." : "Carregar mais"}
+          </button>
+        )}
       </div>
     </div>
   );
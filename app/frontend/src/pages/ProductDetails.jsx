@@ -9,13 +9,23 @@ export default function ProductDetails() {
     api.get(`/produtos/${id}`).then(r => setP(r.data)).catch(()=> {});
   }, [id]);
 
+  // links de download são temporários: pede um novo a cada clique
+  const handleDownload = async () => {
+    try {
+      const r = await api.get(`/produtos/${id}/download-link`);
+      window.location.href = r.data.url;
+    } catch (err) {
+      console.error("Error fetching download link:", err);
+    }
+  };
+
   if (!p) return <div>Carregando...</div>;
   return (
     <div className="product-page card">
       <h1>{p.titulo}</h1>
       <p>{p.descricao}</p>
       <div>Preço: R$ {p.preco?.toFixed(2)}</div>
-      <a className="btn" href={`${import.meta.env.VITE_API_BASE || "http://127.0.0.1:5001/api"}/produtos/download/${p.file_path}`}>Download</a>
+      <button className="btn" onClick={handleDownload}>Download</button>
     </div>
   );
 }
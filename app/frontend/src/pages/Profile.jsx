@@ -2,6 +2,7 @@ import React, { useState, useEffect } from "react";
 import { useAuth } from "../context/AuthContext";
 import { useParams, Link } from "react-router-dom";
 import api from "../api/api";
+import usePostPages from "../hooks/usePostPages";
 import "../styles/Profile.css";
 
 const getImageUrl = (filename) => {
@@ -21,6 +22,7 @@ export default function Profile() {
   const [loading, setLoading] = useState(true);
   const [profileLoaded, setProfileLoaded] = useState(false);
   const [postsLoaded, setPostsLoaded] = useState(false);
+  const pages = usePostPages(setPosts);
   const [stats, setStats] = useState({ posts: 0, followers: 0, following: 0 });
   const [followers, setFollowers] = useState([]);
   const [following, setFollowing] = useState([]);
@@ -71,7 +73,7 @@ export default function Profile() {
       const userId = isOwnProfile ? user.id : profileData?.id;
       if (userId) {
         const res = await api.get(`/posts/user/${userId}`);
-        setPosts(res.data);
+        pages.showFirst(res.data);
       }
     } catch (err) {
       console.error("Error fetching posts:", err);
@@ -254,6 +256,13 @@ export default function Profile() {
 
   const normalPosts = posts.filter(p => p.tipo !== "product");
   const products = posts.filter(p => p.tipo === "product");
+  // posts e produtos saem da mesma lista paginada
+  const loadMoreButton = pages.hasMore && (
+    <button className="btn ghost load-more" disabled={pages.loadingMore}
+      onClick={() => pages.loadMore(`/posts/user/${isOwnProfile ? user.id : profileData?.id}`)}>
+      {pages.loadingMore ? "Carregando..." : "Carregar mais"}
+    </button>
+  );
 
   return (
     <div className="profile-container">
@@ -434,6 +443,7 @@ export default function Profile() {
                 </div>
               ))
             )}
+            {loadMoreButton}
           </div>
         )}
 
@@ -476,6 +486,7 @@ export default function Profile() {
                 </div>
               ))
             )}
+            {loadMoreButton}
           </div>
         )}
 
@@ -4,10 +4,10 @@ import api from "../api/api";
 import ProductCard from "../components/ProductCard";
 import "../styles/SearchResults.css";
 
-const getImageUrl = (filename) => {
+const getImageUrl = (filename, size) => {
   if (!filename) return null;
   const base = api.defaults.baseURL ? api.defaults.baseURL.replace(/\/api\/?$/, "") : "";
-  return `${base}/uploads/${filename}`;
+  return `${base}/uploads/${filename}${size ? `?w=${size}` : ""}`;
 };
 
 export default function SearchResults() {
@@ -66,7 +66,7 @@ export default function SearchResults() {
                 onClick={() => navigate(`/profile/${user.username}`)}
               >
                 <img
-                  src={getImageUrl(user.avatar) || "https://via.placeholder.com/80"}
+                  src={getImageUrl(user.avatar, "thumb") || "https://via.placeholder.com/80"}
                   alt="avatar"
                   className="profile-avatar"
                 />